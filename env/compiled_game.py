@@ -0,0 +1,260 @@
+import numpy as np
+import glob
+import hashlib
+import os
+import pickle
+import shutil
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'results', 'cache')
+
+
+def code_version(*files):
+    """Return the hash of the source files, for the version of a cache which
+    is computed by the code in them."""
+
+    version = hashlib.blake2b(digest_size=8)
+    for file in files:
+        with open(file, 'rb') as f:
+            version.update(f.read())
+
+    return version.hexdigest()
+
+
+def game_version(env):
+    """Return the hashes of the code and of the parameters of an environment.
+
+    The code covers all the modules of the env package, since the environments
+    import the modules of each other, e.g. Kuhn Poker the ranks of Leduc Poker,
+    and the parameters are the public attributes of the environment instance.
+    """
+
+    env_dir = os.path.dirname(__file__)
+    files = sorted(glob.glob(os.path.join(env_dir, '**', '*.py'), recursive=True))
+
+    params = {k: v for k, v in vars(env).items() if not k.startswith('_')}
+    params_version = hashlib.blake2b(repr(sorted(params.items())).encode(),
+                                     digest_size=8)
+
+    return code_version(*files), params_version.hexdigest()
+
+
+def prune_cache(prefix, version, cache_dir):
+    """Remove the entries of the cache named prefix-<version>... of the other
+    versions, which are left behind by the older code."""
+
+    for name in os.listdir(cache_dir):
+        if not name.startswith(prefix + '-') or '.tmp' in name:
+            continue  # the temporary entries are removed by their writers
+        if name[len(prefix) + 1:].split('-')[0].split('.')[0] == version:
+            continue
+        path = os.path.join(cache_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:  # removed by another run
+                pass
+
+
+class CompiledGame(object):
+    """Flat array-backed game tree compiled from a two-player environment.
+
+    The game tree is enumerated once breadth-first from the root histories, and
+    every node is stored as an index into the following arrays:
+
+        parent: index of the parent node, -1 for the roots
+        player: current player, -1 for chance and -2 for terminal nodes
+        action: index of the action in the legal actions of the parent
+        chance_prob: probability of the chance action leading to this node, or
+            the given probability of a root, 1 for the actions of players
+        info_state: id of the info state of the current player, -1 if none
+        public_state: id of the public state
+        utility: return of player 0 on terminal nodes, 0 on the others
+        depth: depth relative to the roots
+
+    The children of node i are the nodes child_offsets[i] to child_offsets[i+1]-1
+    in CSR style, and non-terminal nodes without children are the leaves of a
+    depth-limited subtree. The info state and public state ids index the tables
+    info_state_keys, info_state_player, info_state_num_actions and
+    public_state_keys, where the keys are those of the history module. The legal
+    actions and the strings of the info states are kept in Python lists.
+    """
+
+    NODE_ARRAYS = ['parent', 'player', 'action', 'chance_prob', 'info_state',
+                   'public_state', 'utility', 'depth', 'child_offsets']
+    TABLE_ARRAYS = ['info_state_keys', 'info_state_player',
+                    'info_state_num_actions', 'public_state_keys']
+
+    def __init__(self, env, roots=None, root_probs=None, max_depth=None):
+        """Compile the game tree of env below the roots up to max_depth."""
+
+        self._env = env
+        if roots is None:
+            roots = [env.initial_history()]
+        if root_probs is None:
+            root_probs = [1.0 for _ in roots]
+
+        # Breadth-first to enumerate the nodes, so that the children of a node
+        #   and the nodes of a depth are contiguous
+        histories = list(roots)
+        parent = [-1 for _ in roots]
+        action = [-1 for _ in roots]
+        chance_prob = list(root_probs)
+        depth = [0 for _ in roots]
+        child_offsets = []
+        i = 0
+        while i < len(histories):
+            history = histories[i]
+            child_offsets.append(len(histories))
+            if not history.is_terminal() and \
+                    (max_depth is None or depth[i] < max_depth):
+                if history.is_chance():
+                    legal_actions, prob_list = history.chance_outcomes()
+                else:
+                    legal_actions = history.legal_actions()
+                    prob_list = [1.0 for _ in legal_actions]
+                for a, (legal_action, p) in \
+                        enumerate(zip(legal_actions, prob_list)):
+                    histories.append(history.child(legal_action))
+                    parent.append(i)
+                    action.append(a)
+                    chance_prob.append(p)
+                    depth.append(depth[i] + 1)
+            i += 1
+        child_offsets.append(len(histories))
+
+        # Get the per node info of the players and the tables of the states
+        player = []
+        info_state = []
+        public_state = []
+        utility = []
+        info_state_index = {}
+        public_state_index = {}
+        self.info_state_legal_actions = []
+        self.info_state_strings = []  # only for the debugging output
+        info_state_player = []
+        for history in histories:
+            current_player = history.current_player()
+            player.append(current_player)
+            if current_player >= 0:
+                key = history.get_info_state()[current_player].key
+                if key not in info_state_index:
+                    info_state_index[key] = len(info_state_index)
+                    info_state_player.append(current_player)
+                    self.info_state_legal_actions.append(history.legal_actions())
+                    self.info_state_strings.append(
+                        history.get_info_state()[current_player].to_string())
+                info_state.append(info_state_index[key])
+            else:
+                info_state.append(-1)
+            key = history.get_public_state().key
+            public_state.append(
+                public_state_index.setdefault(key, len(public_state_index)))
+            utility.append(history.get_return() if history.is_terminal() else 0)
+
+        self.histories = histories
+        self.parent = np.array(parent, dtype=np.int32)
+        self.player = np.array(player, dtype=np.int8)
+        self.action = np.array(action, dtype=np.int32)
+        self.chance_prob = np.array(chance_prob, dtype=np.float64)
+        self.info_state = np.array(info_state, dtype=np.int32)
+        self.public_state = np.array(public_state, dtype=np.int32)
+        self.utility = np.array(utility, dtype=np.float64)
+        self.depth = np.array(depth, dtype=np.int32)
+        self.child_offsets = np.array(child_offsets, dtype=np.int32)
+
+        self.info_state_keys = np.array(list(info_state_index), dtype=np.int64)
+        self.info_state_player = np.array(info_state_player, dtype=np.int8)
+        self.info_state_num_actions = np.array(
+            [len(a) for a in self.info_state_legal_actions], dtype=np.int32)
+        self.public_state_keys = np.array(
+            list(public_state_index), dtype=np.int64)
+
+    @property
+    def num_nodes(self):
+        return len(self.parent)
+
+    @property
+    def num_info_states(self):
+        return len(self.info_state_keys)
+
+    @property
+    def num_children(self):
+        """Number of children of every node."""
+
+        return np.diff(self.child_offsets)
+
+    @property
+    def level_offsets(self):
+        """The nodes of depth d are level_offsets[d] to level_offsets[d+1]-1."""
+
+        return np.searchsorted(self.depth, np.arange(self.depth[-1] + 2))
+
+    def is_leaf(self):
+        """Mask of the non-terminal nodes which are not expanded."""
+
+        return (self.player != -2) & (self.num_children == 0)
+
+    def children(self, node):
+        """Return the indices of the children of a node."""
+
+        return np.arange(self.child_offsets[node], self.child_offsets[node + 1])
+
+    def save(self, directory):
+        """Save the arrays as .npy files, which can be memory-mapped on load."""
+
+        os.makedirs(directory, exist_ok=True)
+        for name in CompiledGame.NODE_ARRAYS + CompiledGame.TABLE_ARRAYS:
+            np.save(os.path.join(directory, name + '.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'tables.pkl'), 'wb') as f:
+            pickle.dump((self.info_state_legal_actions,
+                         self.info_state_strings), f)
+
+    @classmethod
+    def load(cls, directory, env=None, mmap_mode='r'):
+        """Load a compiled game saved by 'save' without enumerating the tree.
+
+        The histories are not restored, so 'histories' is None for the loaded
+        compiled game.
+        """
+
+        result = cls.__new__(cls)
+        result._env = env
+        result.histories = None
+        for name in CompiledGame.NODE_ARRAYS + CompiledGame.TABLE_ARRAYS:
+            setattr(result, name, np.load(os.path.join(directory, name + '.npy'),
+                                          mmap_mode=mmap_mode))
+        with open(os.path.join(directory, 'tables.pkl'), 'rb') as f:
+            result.info_state_legal_actions, result.info_state_strings = \
+                pickle.load(f)
+
+        return result
+
+    @classmethod
+    def from_cache(cls, env, cache_dir=None):
+        """Load the compiled game of env from the on-disk cache, or compile and
+        save it if there is none for the current code and parameters. The
+        caches of the env for the other versions of the code are removed when
+        a new one is saved, and cache_dir is CACHE_DIR by default."""
+
+        cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+        name = env.name.replace(' ', '')
+        code_version, params_version = game_version(env)
+        directory = os.path.join(cache_dir, '%s-%s-%s' % (
+            name, code_version, params_version))
+        if os.path.isdir(directory):
+            return cls.load(directory, env)
+
+        compiled_game = cls(env)
+        # Save to a temporary directory first, so that an interrupted or a
+        #   concurrent run never leaves an incomplete cache behind
+        temp_directory = '%s.tmp%d' % (directory, os.getpid())
+        compiled_game.save(temp_directory)
+        try:
+            os.rename(temp_directory, directory)
+        except OSError:  # saved by another run
+            shutil.rmtree(temp_directory, ignore_errors=True)
+        prune_cache(name, code_version, cache_dir)
+
+        return compiled_game
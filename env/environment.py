@@ -1,7 +1,10 @@
 from util.step_record import StepRecord
-from env.history import History
+from env.history import History, hash_key, hash_ints
 from env.public_belief_state import PublicBeliefState
+from env.compiled_game import CompiledGame
+import numpy as np
 import abc
+import collections
 
 
 class Environment(abc.ABC):
@@ -22,6 +25,31 @@ class Environment(abc.ABC):
         """Get the step result given a world state and an action."""
         pass
 
+    def encode_batch(self, states):
+        """Encode a list of world states as an integer array for step_batch."""
+        raise NotImplementedError
+
+    def decode_batch(self, states):
+        """Decode an integer array of world states to a list of world states."""
+        raise NotImplementedError
+
+    def step_batch(self, states, actions):
+        """Get the step results of a batch of world states at once.
+
+        This is optional for the environments. The states are an integer array
+        returned by encode_batch with a world state per row, and the actions are
+        an integer array with the scalar encoding of the action of a player, or
+        the index of the outcome in chance_outcomes for a chance node. Return the
+        arrays of the next states, the observations, the rewards and whether the
+        next states are terminal.
+        """
+        raise NotImplementedError
+
+    def sample_chance_outcome(self, state, rng=None):
+        """Sample an action of the chance on a world state."""
+
+        return state.sample_chance_outcome(rng)
+
     def initial_history(self):
         """Get new initial history with the initial record."""
 
@@ -33,34 +61,96 @@ class Environment(abc.ABC):
 
         return self._initial_history
 
+    def terminal_return(self, history):
+        """Get the return of player 0 of a terminal history."""
+
+        return history.get_return()
+
     def initial_pbs(self):
         """Get new initial public belief state."""
 
         if not hasattr(self, '_initial_pbs'):
             public_state = self.initial_history().get_public_state()
-            prob_dict = {self.initial_history().to_string(): 1.0}
+            prob_dict = {self.initial_history().key: 1.0}
             self._initial_pbs = PublicBeliefState(public_state, prob_dict)
 
         return self._initial_pbs
 
+    def iter_histories(self, max_depth=20, order='bfs', cache=True):
+        """Generate all possible histories in the game no longer than max_depth.
+
+        The game tree is traversed breadth-first if order is 'bfs' and depth-first
+        if order is 'dfs', keeping only the frontier in a deque. If cache is False,
+        the children are not stored in their parent histories, so the histories
+        which are not kept by the caller can be freed while traversing.
+        """
+
+        assert order in ['bfs', 'dfs']
+
+        queue = collections.deque([self.initial_history()])
+        while queue:
+            history = queue.popleft() if order == 'bfs' else queue.pop()
+            if len(history) > max_depth:
+                continue
+            yield history
+            # Only expand the histories shorter than the max depth
+            if not history[-1].is_terminal() and len(history) < max_depth:
+                children = [history.child(action, cache=cache) for action in
+                            history[-1].next_state.legal_actions()]
+                if order == 'dfs':  # visit the first child first
+                    children.reverse()
+                queue.extend(children)
+
     def get_all_histories(self, max_depth=20):
         """Return a list of all possible histories in the game."""
 
         if not hasattr(self, '_history_list'):
-            # Breadth-first to traverse the game tree
-            self._history_list = []
-            bfs_queue = [self.initial_history()]
-            while bfs_queue:
-                history = bfs_queue.pop(0)
-                # Break if reach the max depth
-                if len(history) > max_depth:
-                    break
-                self._history_list.append(history)
-                if not history[-1].is_terminal():
-                    bfs_queue += [history.child(action) for action in
-                                  history[-1].next_state.legal_actions()]
-
-        return self._history_list
+            self._history_list = {}
+
+        # Cache a breadth-first list for each max depth
+        if max_depth not in self._history_list:
+            self._history_list[max_depth] = list(self.iter_histories(max_depth))
+
+        return self._history_list[max_depth]
+
+    def compile(self):
+        """Get the compiled game tree, which is memory-mapped from the on-disk
+        cache under results/ if the code and parameters are unchanged."""
+
+        if not hasattr(self, '_compiled_game'):
+            self._compiled_game = CompiledGame.from_cache(self)
+
+        return self._compiled_game
+
+    def _build_indexes(self):
+        """Index all histories by their public states and information states
+        in a single pass over the game tree."""
+
+        public_state_index = collections.defaultdict(list)
+        info_state_index = collections.defaultdict(list)
+        for history in self.get_all_histories():
+            public_state_index[history.get_public_state().key].append(history)
+            for info_state in history.get_info_state():
+                info_state_index[info_state.key].append(history)
+
+        self._public_state_index = dict(public_state_index)
+        self._info_state_index = dict(info_state_index)
+
+    def public_state_histories(self, public_state):
+        """Return a list of all histories corresponding to a public state."""
+
+        if not hasattr(self, '_public_state_index'):
+            self._build_indexes()
+
+        return self._public_state_index.get(public_state.key, [])
+
+    def info_state_histories(self, info_state):
+        """Return a list of all histories corresponding to an info state."""
+
+        if not hasattr(self, '_info_state_index'):
+            self._build_indexes()
+
+        return self._info_state_index.get(info_state.key, [])
 
     def __str__(self):
         return self.name
@@ -68,9 +158,133 @@ class Environment(abc.ABC):
     __repr__ = __str__
 
 
-class WorldState(abc.ABC):
+def _freeze(encode):
+    """Convert the nested lists of an encoding to hashable tuples."""
+
+    if isinstance(encode, (list, tuple)):
+        return tuple(_freeze(x) for x in encode)
+    return encode
+
+
+# Tokens marking the tuples and None in the tokens of the encodings
+TUPLE_TOKEN = -2 ** 62
+NONE_TOKEN = -2 ** 62 + 1
+
+
+def _encode_tokens(encode):
+    """Return the integer tokens of an encoding, where a tuple is marked by its
+    length before its items, so that the tokens of the different encodings
+    differ, and a string is hashed."""
+
+    if type(encode) is int:
+        return encode,
+    if isinstance(encode, np.ndarray):
+        encode = encode.tolist()
+    if isinstance(encode, (tuple, list)):
+        if all(type(x) is int for x in encode):
+            return (TUPLE_TOKEN, len(encode), *encode)
+        return sum(map(_encode_tokens, encode), (TUPLE_TOKEN, len(encode)))
+    if encode is None:
+        return NONE_TOKEN,
+    if isinstance(encode, str):
+        return hash_key(0, encode),
+    return int(encode),
+
+
+_interned = {}
+
+
+class Immutable(abc.ABC):
+    """Abstract class of the immutable objects hashable on their encodings.
+
+    The attributes are stored in __slots__ and can only be set once, which is
+    done in the __init__ of the subclasses. Two objects of the same class are
+    equal if their encodings are equal, and the hash is cached on first use.
+    The stable integer key of the encoding is cached likewise, which is hashed
+    in the keys of the histories instead of the strings.
+    """
+
+    __slots__ = ('_hash', '_key')
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError("can't set attribute '%s' of immutable %s" %
+                                 (name, type(self).__name__))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("can't delete attribute '%s' of immutable %s" %
+                             (name, type(self).__name__))
+
+    def __getstate__(self):
+        # The cached hash of strings is not the same in other processes
+        return {name: getattr(self, name) for cls in type(self).__mro__
+                for name in getattr(cls, '__slots__', ())
+                if name != '_hash' and hasattr(self, name)}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, self.__class__):
+            return self.encode == other.encode
+        else:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        if not hasattr(self, '_hash'):
+            self._hash = hash(_freeze(self.encode))
+        return self._hash
+
+    @property
+    def key(self):
+        """Stable integer key of the encoding, which is the same in all the
+        processes and runs unlike the hash."""
+
+        try:
+            return self._key
+        except AttributeError:
+            self._key = hash_ints(0, *_encode_tokens(self.encode))
+            return self._key
+
+    @classmethod
+    def interned(cls, *args, **kwargs):
+        """Get the unique instance constructed with the given arguments.
+
+        Interned objects are shared like flyweights, so each distinct object
+        exists only once and the equality is mostly an identity check. They
+        are kept for the life of the process, so that it is only for the
+        objects of a small domain, e.g. the actions and the observations of
+        the bets, and not for the lazily dealt cards of the larger games.
+        """
+
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        try:
+            instance = _interned.get(key)
+        except TypeError:  # the lists in the arguments are not hashable
+            key = (cls, _freeze(args), _freeze(sorted(kwargs.items())))
+            instance = _interned.get(key)
+        if instance is None:
+            instance = _interned[key] = cls(*args, **kwargs)
+        return instance
+
+    def __str__(self):
+        return self.to_string()
+
+    __repr__ = __str__
+
+
+class WorldState(Immutable):
     """Abstract class of all kinds of world states."""
 
+    __slots__ = ()
+
     @abc.abstractmethod
     def legal_actions(self):
         """Return a list of actions are legal on this state."""
@@ -85,6 +299,25 @@ class WorldState(abc.ABC):
     def to_string(self):
         """Return a string representing this world state."""
 
+    def num_chance_outcomes(self):
+        """Return the number of the actions of the chance."""
+        return len(self.chance_outcomes()[0])
+
+    def iter_chance_outcomes(self):
+        """Generate the actions of the chance and the corresponding probs.
+
+        The world states with too many chance outcomes to keep in a list can
+        override this to generate them lazily.
+        """
+        return zip(*self.chance_outcomes())
+
+    def sample_chance_outcome(self, rng=None):
+        """Sample an action of the chance, rng is np.random by default."""
+
+        rng = np.random if rng is None else rng
+        action_list, prob_list = self.chance_outcomes()
+        return action_list[rng.choice(len(action_list), p=prob_list)]
+
     def is_chance(self):
         """Whether is the chance node."""
         return self.player == -1
@@ -97,24 +330,12 @@ class WorldState(abc.ABC):
         """Return the current player."""
         return self.player
 
-    def __eq__(self, other):
-        if isinstance(other, self.__class__):
-            return self.encode == other.encode
-        else:
-            return False
 
-    def __ne__(self, other):
-        return not self == other
-
-    def __str__(self):
-        return self.to_string()
-
-    __repr__ = __str__
-
-
-class Action(abc.ABC):
+class Action(Immutable):
     """Abstract class of all kinds of actions."""
 
+    __slots__ = ()
+
     @abc.abstractmethod
     def to_string(self):
         """Return a string representing this action."""
@@ -124,39 +345,13 @@ class Action(abc.ABC):
         """Whether is the chance action."""
         return self.player == -1
 
-    def __eq__(self, other):
-        if isinstance(other, self.__class__):
-            return self.encode == other.encode
-        else:
-            return False
 
-    def __ne__(self, other):
-        return not self == other
-
-    def __str__(self):
-        return self.to_string()
-
-    __repr__ = __str__
-
-
-class Observation(abc.ABC):
+class Observation(Immutable):
     """Abstract class of all kinds of observations."""
 
+    __slots__ = ()
+
     @abc.abstractmethod
     def to_string(self):
         """Return a string representing this observation."""
         pass
-
-    def __eq__(self, other):
-        if isinstance(other, self.__class__):
-            return self.encode == other.encode
-        else:
-            return False
-
-    def __ne__(self, other):
-        return not self == other
-
-    def __str__(self):
-        return self.to_string()
-
-    __repr__ = __str__
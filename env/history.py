@@ -1,5 +1,117 @@
 from util.step_record import StepRecord
 import numpy as np
+import hashlib
+import struct
+
+
+def hash_key(parent_key, token):
+    """Combine the key of a prefix and a token into a stable 64-bit key.
+
+    Unlike the builtin hash of strings, this does not change between runs, so
+    the keys of histories, information states and public states can be used
+    both as dictionary keys and as persistent identifiers.
+    """
+
+    digest = hashlib.blake2b(('%d|%s' % (parent_key, token)).encode(),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+_int_structs = {}
+
+
+def hash_ints(parent_key, *tokens):
+    """Combine the key of a prefix and the integer tokens into a stable 64-bit
+    key like hash_key, without building a string."""
+
+    if len(tokens) not in _int_structs:
+        _int_structs[len(tokens)] = struct.Struct('<%dq' % (len(tokens) + 1))
+    digest = hashlib.blake2b(_int_structs[len(tokens)].pack(parent_key, *tokens),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+# Keys of the empty sequences of each kind
+HISTORY_ROOT_KEY = hash_key(0, 'history')
+INFO_STATE_ROOT_KEYS = (hash_key(0, 'info_state 0'), hash_key(0, 'info_state 1'))
+PUBLIC_STATE_ROOT_KEY = hash_key(0, 'public_state')
+ACTION_ROOT_KEY = hash_key(0, 'actions')
+
+
+# Token of the chance actions in the key of the actions of the players, and
+#   of None for the actions of the other players in an information state
+SEPARATOR_TOKEN = -2 ** 62 + 2
+
+
+def _record_tokens(record):
+    """Return the integer tokens of a step record in the key of a history."""
+
+    if record.action:
+        return record.action.key, record.next_state.key
+    else:
+        return record.next_state.key,
+
+
+def _action_tokens(record):
+    """Return the integer tokens of a step record in the key of the actions of
+    the players, where a chance action is only a separator."""
+
+    if record.state.is_chance():
+        return SEPARATOR_TOKEN,
+    else:
+        return record.action.key,
+
+
+def _item_tokens(item):
+    """Return the integer tokens of an item in the key of an information
+    state."""
+
+    if isinstance(item, tuple):
+        private_obs, public_obs = item
+        return private_obs.key, public_obs.key
+    elif item is None:
+        return SEPARATOR_TOKEN,
+    else:
+        return item.key,
+
+
+def _item_string(item):
+    """Return the string of an item of an information state."""
+
+    if isinstance(item, tuple):
+        return '; '.join(x.to_string() for x in item)
+    else:
+        return str(item)
+
+
+def _flat_only(name):
+    """Wrap a list method which changes the list, so that it raises on a
+    persistent history, whose records are not stored in the list."""
+
+    method = getattr(list, name)
+
+    def flat_only(self, *args):
+        if getattr(self, '_parent', None) is not None:
+            raise TypeError("'%s' is not supported by a persistent history" % name)
+        return method(self, *args)
+
+    flat_only.__name__ = name
+    return flat_only
+
+
+def _on_records(name):
+    """Wrap a list method which reads the list, so that it reads the records
+    from the root for a persistent history."""
+
+    method = getattr(list, name)
+
+    def on_records(self, *args):
+        if self._parent is not None:
+            return method(self.records(), *args)
+        return method(self, *args)
+
+    on_records.__name__ = name
+    return on_records
 
 
 class History(list):
@@ -8,12 +120,118 @@ class History(list):
     This is a list in order of the step records of any trajectories. In FOGs, this
     represents the perfect game state in a game tree, and avoids calculation of
     observations every time the information state is obtained from the history.
+
+    A history is either flat or persistent. A flat history stores all its step
+    records in the list itself, like the initial history or the trajectories
+    recorded by the online solvers. A persistent history, as returned by 'child',
+    only stores its parent history, the new step record and its depth, so the
+    histories in a game tree share their common prefixes instead of copying them.
+    Both of them can be indexed, iterated and measured like a list, but only a
+    flat history can be changed like a list.
+
+    Every history has a stable integer key, which is used instead of the string
+    returned by 'to_string' to index the histories in the solvers and policies.
+    It is hashed from the integer keys of the encodings of the actions and the
+    world states, so that the strings are only built for the output.
     """
 
-    def __init__(self, a=[], env=None):
+    def __init__(self, a=[], env=None, parent=None, record=None):
         super().__init__(a)
         self._env = env
         self._children = {}
+        self._parent = parent
+        self._record = record
+        self._depth = len(parent) + 1 if parent is not None else None
+        if parent is not None:
+            self._key = hash_ints(parent.key, *_record_tokens(record))
+
+    @property
+    def key(self):
+        """Stable integer key of this history."""
+
+        if self._parent is not None:
+            return self._key
+
+        # A flat history may still be appended, so hash all its records
+        key = HISTORY_ROOT_KEY
+        for record in list.__iter__(self):
+            key = hash_ints(key, *_record_tokens(record))
+        return key
+
+    def action_key(self):
+        """Stable integer key of the actions of the players in this history,
+        where the chance actions are separators, e.g. the betting sequence of
+        the streets of poker. It is extended from the key of the parent."""
+
+        if not hasattr(self, '_action_key'):
+            if self._parent is not None:
+                self._action_key = hash_ints(self._parent.action_key(),
+                                             *_action_tokens(self._record))
+            else:
+                key = ACTION_ROOT_KEY
+                for record in list.__iter__(self):
+                    if record.action:  # not the first record in the history
+                        key = hash_ints(key, *_action_tokens(record))
+                self._action_key = key
+
+        return self._action_key
+
+    def records(self):
+        """Return a plain list of all the step records from the root."""
+
+        records = []
+        history = self
+        # Walk up to the flat root and collect the persistent records
+        while history._parent is not None:
+            records.append(history._record)
+            history = history._parent
+        records.reverse()
+
+        return list.copy(history) + records
+
+    def __len__(self):
+        if self._parent is None:
+            return list.__len__(self)
+        return self._depth
+
+    def __getitem__(self, index):
+        if self._parent is None:
+            return list.__getitem__(self, index)
+        if isinstance(index, slice):
+            return self.records()[index]
+        # The last record is the most frequent query
+        if index == -1:
+            return self._record
+
+        if index < 0:
+            index += self._depth
+        if not 0 <= index < self._depth:
+            raise IndexError('history index out of range')
+        history = self
+        while history._parent is not None:
+            if index == history._depth - 1:
+                return history._record
+            history = history._parent
+        return list.__getitem__(history, index)
+
+    def __iter__(self):
+        if self._parent is None:
+            return list.__iter__(self)
+        return iter(self.records())
+
+    # The list methods which change the list raise on a persistent history,
+    #   and the others read its records
+    append, extend, insert, pop, remove, clear, sort, reverse = map(_flat_only, [
+        'append', 'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'])
+    __setitem__, __delitem__, __iadd__, __imul__ = map(_flat_only, [
+        '__setitem__', '__delitem__', '__iadd__', '__imul__'])
+    __add__, __mul__, __rmul__, __contains__, index, count, copy = map(_on_records, [
+        '__add__', '__mul__', '__rmul__', '__contains__', 'index', 'count', 'copy'])
+
+    def __reversed__(self):
+        if self._parent is None:
+            return list.__reversed__(self)
+        return reversed(self.records())
 
     def is_chance(self):
         """Whether is the chance node."""
@@ -40,6 +258,11 @@ class History(list):
 
         return self[-1].next_state.chance_outcomes()
 
+    def sample_chance_outcome(self, rng=None):
+        """Sample an action of the chance on this history."""
+
+        return self[-1].next_state.sample_chance_outcome(rng)
+
     def get_return(self, discount=1):
         """Get discounted return of this trajectory."""
 
@@ -50,22 +273,40 @@ class History(list):
             factor *= discount
         return get_return
 
-    def child(self, action):
+    def child(self, action, cache=True):
         """Get the child history given an action."""
 
         # Store the children as the values of a dict and the action as the keys
-        if action.to_string() not in self._children.keys():
+        if action not in self._children:
             step_record = self._env.step(self[-1].next_state, action)
-            self._children[action.to_string()] = History(
-                [record for record in self[:]], self._env)
-            self._children[action.to_string()].append(step_record)
+            child = History(env=self._env, parent=self, record=step_record)
+            if not cache:  # a temporary child which is not stored
+                return child
+            self._children[action] = child
 
-        return self._children[action.to_string()]
+        return self._children[action]
 
     def get_info_state(self):
         """Get the info states of two players corresponding to this history."""
 
         if not hasattr(self, '_info_state'):
+            if self._parent is not None:
+                # Extend the info states of the parent by the last record
+                parent_info_state = self._parent.get_info_state()
+                record = self._record
+                info_state = []
+                for player in [0, 1]:
+                    items = [record.action if record.action.player == player
+                             else None, (record.obs[player], record.obs[-1])]
+                    # The action and the observations of a step are hashed at once
+                    key = hash_ints(parent_info_state[player].key,
+                                    *_item_tokens(items[0]), *_item_tokens(items[1]))
+                    info_state.append(InformationState(
+                        parent_info_state[player] + items, player=player,
+                        env=self._env, key=key))
+                self._info_state = tuple(info_state)
+                return self._info_state
+
             self._info_state = (InformationState(player=0, env=self._env),
                                 InformationState(player=1, env=self._env))
 
@@ -86,9 +327,17 @@ class History(list):
         """Get the public state corresponding to this history."""
 
         if not hasattr(self, '_public_state'):
-            # List the public observation
-            self._public_state = PublicState(
-                [record.obs[-1] for record in self], env=self._env)
+            if self._parent is not None:
+                # Extend the public state of the parent by the last record
+                parent_public_state = self._parent.get_public_state()
+                self._public_state = PublicState(
+                    parent_public_state + [self._record.obs[-1]], env=self._env,
+                    key=hash_ints(parent_public_state.key,
+                                  self._record.obs[-1].key))
+            else:
+                # List the public observation
+                self._public_state = PublicState(
+                    [record.obs[-1] for record in self], env=self._env)
 
         return self._public_state
 
@@ -103,7 +352,13 @@ class History(list):
         return string
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, self.__class__) and len(self) == len(other):
+            # Compare the last records first and share the common parent
+            if self._parent is not None and other._parent is not None:
+                return self._record == other._record and \
+                    self._parent == other._parent
             return all([x == y for x, y in zip(self, other)])
         else:
             return False
@@ -124,20 +379,33 @@ class InformationState(list):
     [O_i^0, a_i^0, O_i^1, a_i^1, ..., O_i^t] in FOGs.
     """
 
-    def __init__(self, a=[], player=0, env=None):
+    def __init__(self, a=[], player=0, env=None, key=None):
         super().__init__(a)
         self.player = player
         self._env = env
+        self._key = key
 
-    def get_all_histories(self):
-        """Given a list of all histories, get a list of all possible histories
-        corresponding to this information state."""
+    @property
+    def key(self):
+        """Stable integer key of this information state."""
 
-        if not hasattr(self, '_histories'):
-            self._histories = [h for h in self._env.get_all_histories() if
-                               h.get_info_state()[self.player] == self]
+        if self._key is None:
+            # The first observations, and then the action and the observations
+            #   of each step are hashed
+            key = INFO_STATE_ROOT_KEYS[self.player]
+            if len(self):
+                key = hash_ints(key, *_item_tokens(self[0]))
+            for i in range(1, len(self), 2):
+                key = hash_ints(key, *_item_tokens(self[i]), *_item_tokens(self[i + 1]))
+            self._key = key
+
+        return self._key
+
+    def get_all_histories(self):
+        """Get a list of all possible histories corresponding to this
+        information state from the index of the environment."""
 
-        return self._histories
+        return self._env.info_state_histories(self)
 
     def get_public_state(self):
         """Get the public state corresponding to this information state."""
@@ -153,13 +421,7 @@ class InformationState(list):
         return self[-1][-1].pot
 
     def to_string(self):
-        def str_fun(item):
-            if isinstance(item, tuple):
-                return '; '.join(x.to_string() for x in item)
-            else:
-                return str(item)
-
-        return ' -> '.join(map(str_fun, self))
+        return ' -> '.join(map(_item_string, self))
 
     def __eq__(self, other):
         if isinstance(other, self.__class__) and len(self) == len(other):
@@ -182,19 +444,28 @@ class PublicState(list):
     This is a sequence of public observations like [O_pub^0, O_pub^1, ...,
     O_pub^t] in FOGs."""
 
-    def __init__(self, a=[], env=None):
+    def __init__(self, a=[], env=None, key=None):
         super().__init__(a)
         self._env = env
+        self._key = key
 
-    def get_all_histories(self):
-        """Given a list of all histories, get a list of all possible histories
-        corresponding to this public state."""
+    @property
+    def key(self):
+        """Stable integer key of this public state."""
 
-        if not hasattr(self, '_histories'):
-            self._histories = [h for h in self._env.get_all_histories() if
-                               h.get_public_state() == self]
+        if self._key is None:
+            key = PUBLIC_STATE_ROOT_KEY
+            for obs in self:
+                key = hash_ints(key, obs.key)
+            self._key = key
+
+        return self._key
+
+    def get_all_histories(self):
+        """Get a list of all possible histories corresponding to this public
+        state from the index of the environment."""
 
-        return self._histories
+        return self._env.public_state_histories(self)
 
     # def get_all_infostates(self, infostate_list):
     #     """Given a list of all infostates, get a list of all possible infostates
@@ -1,10 +1,10 @@
 import env.environment as e
 from env.kuhn_poker.kuhn_poker_char import *
 from util.step_record import StepRecord
+from env.payoff_table import PayoffTable
 from env.public_belief_state import PublicBeliefState
 
 import numpy as np
-import copy
 import torch
 
 
@@ -13,24 +13,30 @@ class KuhnPoker(e.Environment):
 
     Define the Kuhn Poker environment as a FOG.
     Replace transition probabilities with chance nodes.
+
+    The number of ranks is a parameter of the generalized Kuhn Poker, and the
+    default is Kuhn Poker with 3 cards.
     """
 
-    def __init__(self):
+    def __init__(self, num_ranks=3):
         """Init Kuhn Poker class."""
 
         self.name = 'KuhnPoker'
         self.num_players = 2
+        self.num_ranks = num_ranks
+        self._rules = DEFAULT_RULES if num_ranks == 3 else Rules(num_ranks)
 
     def initial_state(self):
         """Get a new initial world state."""
 
-        return WorldState([[-1, -1], [1, 1], -1])
+        return WorldState((-1, -1, 1, 1, -1), self._rules)
 
     def initial_obs(self):
         """Get new initial observations."""
 
-        return (PrivateObservation(-1, player=0), PrivateObservation(-1, player=1),
-                PublicObservation([1, 1]))
+        return (PrivateObservation.interned(-1, player=0, rules=self._rules),
+                PrivateObservation.interned(-1, player=1, rules=self._rules),
+                PublicObservation.interned((1, 1)))
 
     def initial_pbs(self):
         """Get new initial public belief state."""
@@ -39,7 +45,7 @@ class KuhnPoker(e.Environment):
             initial_history = self.initial_history()
             public_state = initial_history.child(
                 initial_history.legal_actions()[0]).get_public_state()
-            prob_dict = {initial_history.child(a).to_string(): p for
+            prob_dict = {initial_history.child(a).key: p for
                          a, p in zip(*initial_history.chance_outcomes())}
             self._initial_pbs = PublicBeliefState(public_state, prob_dict)
 
@@ -48,47 +54,117 @@ class KuhnPoker(e.Environment):
     def step(self, world_state, action):
         """Get the step result given a world state and an action."""
 
-        step_record = StepRecord()
-
-        step_record.state = world_state
-        step_record.action = action
-
-        # Get next world state and rewards
-        w_encode = copy.deepcopy(world_state.encode)
+        # Get next world state and rewards, the encodings are flat tuples
+        #   so that the new one is built without copy
+        h1, h2, b1, b2, turn = world_state.encode
         reward = 0
         if world_state.is_chance():  # is chance
-            w_encode[0] = copy.deepcopy(action.encode)
-            w_encode[-1] = 0  # player 1's turn
+            h1, h2 = action.encode
+            turn = 0  # player 1's turn
         else:
             if action.encode == 0:  # pass
                 # The game will not end after 'pass' only if at the beginning
-                if w_encode[1] == [1, 1] and w_encode[-1] == 0:
-                    w_encode[-1] = 1 - w_encode[-1]  # opponent's turn
+                if b1 == b2 == 1 and turn == 0:
+                    turn = 1  # opponent's turn
                 else:  # the game is over
-                    w_encode[-1] = -2  # terminal
-                    if w_encode[1] == [1, 1]:  # all pass
-                        reward = 1 if w_encode[0][0] > w_encode[0][1] else -1
+                    turn = -2  # terminal
+                    if b1 == b2 == 1:  # all pass
+                        reward = 1 if h1 > h2 else -1
                     else:
                         # The player who passes will lose
                         reward = 1 if action.player == 1 else -1
             else:  # bet
-                w_encode[1][action.player] += 1  # the bet of current player +1
+                # The bet of current player +1
+                if action.player == 0:
+                    b1 += 1
+                else:
+                    b2 += 1
                 # The game will end after 'bet' only if all bet
-                if w_encode[1] == [2, 2]:
-                    w_encode[-1] = -2  # terminal
-                    reward = 2 if w_encode[0][0] > w_encode[0][1] else -2
+                if b1 == b2 == 2:
+                    turn = -2  # terminal
+                    reward = 2 if h1 > h2 else -2
                 else:
-                    w_encode[-1] = 1 - w_encode[-1]  # opponent's turn
-        step_record.next_state = WorldState(w_encode)
-        step_record.reward = reward
+                    turn = 1 - turn  # opponent's turn
+        next_world_state = WorldState((h1, h2, b1, b2, turn), self._rules)
 
         # Get observation
         # Observations always match the world state
-        step_record.obs = (PrivateObservation(w_encode[0][0], 0),
-                           PrivateObservation(w_encode[0][1], 1),
-                           PublicObservation(w_encode[1]))
+        obs = (PrivateObservation.interned(h1, 0, self._rules),
+               PrivateObservation.interned(h2, 1, self._rules),
+               PublicObservation.interned((b1, b2)))
+
+        return StepRecord(world_state, action, next_world_state, obs, reward)
+
+    def payoff_table(self):
+        """Get the dense terminal payoff table indexed by (hand0, hand1,
+        betting sequence id)."""
+
+        if not hasattr(self, '_payoff_table'):
+            self._payoff_table = PayoffTable(self, num_cards=self.num_ranks)
+
+        return self._payoff_table
+
+    def terminal_return(self, history):
+        """Get the return of player 0 of a terminal history by the table."""
+
+        return self.payoff_table().value(history)
+
+    def encode_batch(self, states):
+        """Encode world states as rows of [h1, h2, b1, b2, turn]."""
+
+        return np.array([s.encode for s in states], dtype=np.int64)
+
+    def decode_batch(self, states):
+        """Decode rows of [h1, h2, b1, b2, turn] to world states."""
+
+        return [WorldState(tuple(row), self._rules)
+                for row in np.asarray(states).tolist()]
+
+    def step_batch(self, states, actions):
+        """Get the step results of a batch of world states at once.
+
+        The states are rows of [h1, h2, b1, b2, turn], and the actions are 0, 1
+        for pass, bet or the index of the deal for the chance. The observations
+        are rows of [o1, o2, b1, b2] of the private and public observations.
+        """
+
+        states = np.asarray(states)
+        actions = np.asarray(actions)
+        next_states = states.copy()
+        hand, bet, turn = next_states[:, 0:2], next_states[:, 2:4], next_states[:, 4]
+        player = states[:, 4]
+        rewards = np.zeros(len(states))
+        win = np.where(states[:, 0] > states[:, 1], 1, -1)  # 1 if player 1 wins
+        all_pass = (states[:, 2] == 1) & (states[:, 3] == 1)
+
+        # Deal the hands for the chance
+        is_chance = player == -1
+        hand[is_chance] = self._rules.chance_deals[actions[is_chance]]
+        turn[is_chance] = 0  # player 1's turn
+
+        # The game will not end after 'pass' only if at the beginning
+        is_pass = (player >= 0) & (actions == 0)
+        go_on = is_pass & all_pass & (player == 0)
+        turn[go_on] = 1
+        over = is_pass & ~go_on
+        turn[over] = -2  # terminal
+        # Compare the hands if all pass, or the player who passes will lose
+        rewards[over & all_pass] = win[over & all_pass]
+        rewards[over & ~all_pass] = np.where(player == 1, 1, -1)[over & ~all_pass]
+
+        # The game will end after 'bet' only if all bet
+        is_bet = (player >= 0) & (actions == 1)
+        index = np.nonzero(is_bet)[0]
+        bet[index, player[index]] += 1
+        all_bet = is_bet & (bet[:, 0] == 2) & (bet[:, 1] == 2)
+        turn[all_bet] = -2  # terminal
+        rewards[all_bet] = 2 * win[all_bet]
+        turn[is_bet & ~all_bet] = 1 - player[is_bet & ~all_bet]
+
+        # Observations always match the world state
+        obs = np.concatenate([hand, bet], axis=1)
 
-        return step_record
+        return next_states, obs, rewards, turn == -2
 
     def get_tensor(self, pbs):
         """Get the tensor of a public belief state such like
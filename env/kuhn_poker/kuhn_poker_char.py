@@ -1,50 +1,77 @@
 import env.environment as e
+from env.leduc_poker.leduc_poker_char import rank_names
+import numpy as np
+
+
+class Rules(object):
+    """Rules of a game of Kuhn Poker with num_ranks cards, one a rank.
+
+    Kuhn Poker has 3 cards, and the games with more cards are the generalized
+    Kuhn Poker, while the games with suits, raises and rounds are the Leduc
+    Poker family.
+    """
+
+    def __init__(self, num_ranks=3):
+        """Init the rules and the interned actions of the game."""
+
+        assert num_ranks >= 2
+
+        self.num_ranks = num_ranks
+        self.rank_names = rank_names(num_ranks)
+
+        # Interned actions, the legal actions are shared by all the world states
+        self.chance_actions = tuple(Action((i, (i + j) % num_ranks), rules=self)
+                                    for i in range(num_ranks) for j in range(1, num_ranks))
+        self.chance_probs = tuple(1 / len(self.chance_actions)
+                                  for _ in self.chance_actions)
+        self.player_actions = tuple((Action(0, player, self), Action(1, player, self))
+                                    for player in range(2))
+        self.chance_deals = np.array([a.encode for a in self.chance_actions])  # for step_batch
 
 
 class WorldState(e.WorldState):
     """World state object of env: Kuhn Poker.
 
-    A world state of Kuhn Poker is encoded as [[h1, h2], [b1, b2], turn],
-    where h1, h2 represent the hands of two players respectively, and
+    A world state of Kuhn Poker is encoded as a flat tuple (h1, h2, b1, b2,
+    turn), where h1, h2 represent the hands of two players respectively, and
     b1, b2 represent the total bet of two players. 'turn' indicates which
     player is currently playing including the chance as -1, and when turn 
     == -2, it means that the game is over.
     """
 
-    __hand_dict = {0: 'J', 1: 'Q', 2: 'K', -1: '?'}
+    __slots__ = ('encode', 'rules', 'player', 'hand', 'bet')
 
-    def __init__(self, encode):
+    def __init__(self, encode, rules=None):
         """Init the world state instance."""
 
         self.encode = encode
+        self.rules = DEFAULT_RULES if rules is None else rules
         self.player = encode[-1]
+        self.hand = encode[:2]
+        self.bet = encode[2:4]
 
     def legal_actions(self):
         """Return a list of actions that are legal on this state."""
 
         if self.player == -2:  # is terminal
-            return []
+            return ()
         elif self.player == -1:  # is chance
-            return [Action([i, (i + j) % 3])
-                    for i in range(3) for j in range(1, 3)]
+            return self.rules.chance_actions
         else:
-            return [Action(0, self.player), Action(1, self.player)]
+            return self.rules.player_actions[self.player]
 
     def chance_outcomes(self):
         """Return a list of actions and the corresponding probs."""
 
         assert self.player == -1  # is chance
-        action_list = self.legal_actions()
-        prob_list = [1 / len(action_list) for _ in range(len(action_list))]
-        return action_list, prob_list
+        return self.rules.chance_actions, self.rules.chance_probs
 
     def to_string(self):
         """Return a string representing this world state."""
 
-        return '[%s, %s], [%d, %d], %d' % \
-            (WorldState.__hand_dict[self.encode[0][0]],
-             WorldState.__hand_dict[self.encode[0][1]],
-             self.encode[1][0], self.encode[1][1], self.encode[2])
+        return '[%s], [%d, %d], %d' % (
+            ', '.join(self.rules.rank_names[h] if h != -1 else '?' for h in self.hand),
+            self.bet[0], self.bet[1], self.player)
 
 
 class Action(e.Action):
@@ -52,17 +79,19 @@ class Action(e.Action):
 
     A player's action of Kuhn Poker is encoded as a single scalar that
     is 0, 1 when act pass, bet respetively. A chance's action is encoded
-    as [h1, h2] that indicates the deal.
+    as (h1, h2) that indicates the deal.
     """
 
+    __slots__ = ('encode', 'player', 'rules')
+
     __act_dict = {0: 'pass', 1: 'bet'}
-    __hand_dict = {0: 'J', 1: 'Q', 2: 'K'}
 
-    def __init__(self, encode, player=-1):
+    def __init__(self, encode, player=-1, rules=None):
         """Init the action instance."""
 
         self.encode = encode
         self.player = player
+        self.rules = rules
 
     def to_string(self):
         """Return a string representing this action."""
@@ -70,7 +99,7 @@ class Action(e.Action):
         if self.player != -1:  # is not chance
             return Action.__act_dict[self.encode]
         else:  # is chance
-            return ', '.join(Action.__hand_dict[x] for x in self.encode)
+            return ', '.join(self.rules.rank_names[x] for x in self.encode)
 
 
 class PrivateObservation(e.Observation):
@@ -81,27 +110,30 @@ class PrivateObservation(e.Observation):
     means that the hand is unknown.
     """
 
-    __hand_dict = {0: 'J', 1: 'Q', 2: 'K', -1: '?'}
+    __slots__ = ('encode', 'player', 'rules')
 
-    def __init__(self, encode, player):
+    def __init__(self, encode, player, rules=None):
         """Init the private observation instance."""
 
         self.encode = encode
         self.player = player
+        self.rules = DEFAULT_RULES if rules is None else rules
 
     def to_string(self):
         """Return a string representing this private observation."""
 
-        return PrivateObservation.__hand_dict[self.encode]
+        return self.rules.rank_names[self.encode] if self.encode != -1 else '?'
 
 
 class PublicObservation(e.Observation):
     """Public observation object of env: Kuhn Poker.
 
-    A public observations of Kuhn Poker is encoded as [b1, b2], where
+    A public observations of Kuhn Poker is encoded as (b1, b2), where
     b1, b2 represent the total bet of two players at the moment.
     """
 
+    __slots__ = ('encode',)
+
     def __init__(self, encode):
         """Init the public observation instance."""
 
@@ -111,3 +143,6 @@ class PublicObservation(e.Observation):
         """Return a string representing this public observation."""
 
         return ', '.join(str(x) for x in self.encode)
+
+
+DEFAULT_RULES = Rules()
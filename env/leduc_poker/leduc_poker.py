@@ -2,9 +2,9 @@ import env.environment as e
 from env.leduc_poker.leduc_poker_char import *
 from env.public_belief_state import PublicBeliefState
 from util.step_record import StepRecord
+from env.payoff_table import PayoffTable
 
 import numpy as np
-import copy
 import torch
 
 
@@ -13,24 +13,37 @@ class LeducPoker(e.Environment):
 
     Define the Leduc Poker environment as a FOG.
     Replace transition probabilities with chance nodes.
+
+    The game is one of a family with the numbers of ranks, suits, raises per
+    round and rounds as the parameters, so that the game sizes between Leduc
+    Poker and Texas Hold'em can be benchmarked. The default is Leduc Poker.
     """
 
-    def __init__(self):
+    def __init__(self, num_ranks=3, num_suits=2, num_raises=1, num_rounds=2):
         """Init Leduc Poker class."""
 
         self.name = 'LeducPoker'
         self.num_players = 2
+        self.num_ranks = num_ranks
+        self.num_suits = num_suits
+        self.num_raises = num_raises
+        self.num_rounds = num_rounds
+        self._rules = DEFAULT_RULES if (num_ranks, num_suits, num_raises, num_rounds) \
+            == (3, 2, 1, 2) else Rules(num_ranks, num_suits, num_raises, num_rounds)
 
     def initial_state(self):
         """Get a new initial world state."""
 
-        return WorldState([[-1, -1, -1], [1, 1], -1])
+        return WorldState((-1, -1, *[-1] * (self.num_rounds - 1), 1, 1, 0, -1),
+                          self._rules)
 
     def initial_obs(self):
         """Get new initial observations."""
 
-        return (PrivateObservation(-1, player=0), PrivateObservation(-1, player=1),
-                PublicObservation([[1, 1], -1]))
+        return (PrivateObservation.interned(-1, player=0, rules=self._rules),
+                PrivateObservation.interned(-1, player=1, rules=self._rules),
+                PublicObservation.interned((1, 1, *[-1] * (self.num_rounds - 1)),
+                                           rules=self._rules))
 
     def initial_pbs(self):
         """Get new initial public belief state."""
@@ -39,7 +52,7 @@ class LeducPoker(e.Environment):
             initial_history = self.initial_history()
             public_state = initial_history.child(
                 initial_history.legal_actions()[0]).get_public_state()
-            prob_dict = {initial_history.child(a).to_string(): p for
+            prob_dict = {initial_history.child(a).key: p for
                          a, p in zip(*initial_history.chance_outcomes())}
             self._initial_pbs = PublicBeliefState(public_state, prob_dict)
 
@@ -48,67 +61,161 @@ class LeducPoker(e.Environment):
     def step(self, world_state, action):
         """Get the step result given a world state and an action."""
 
-        # Get next world state
-        w_encode = copy.deepcopy(world_state.encode)
+        # Get next world state, the encodings are flat tuples so that the new
+        #   one is built without copy
+        hand, pub, bet = world_state.hand, world_state.pub, world_state.bet
+        raises, turn = world_state.raises, world_state.player
+        phase = world_state.phase
         if world_state.is_chance():  # is chance
-            if world_state.phase == 0:  # private hands chance
-                w_encode[0][0] = action.encode[0]
-                w_encode[0][1] = action.encode[1]
+            if phase == 0:  # private hands chance
+                hand = action.encode
             else:  # public hands chance
-                w_encode[0][2] = action.encode
-            w_encode[-1] = 0  # player 1's turn
+                pub = pub[:phase - 1] + (action.encode,) + pub[phase:]
+            turn = 0  # player 1's turn
         else:
+            player = action.player
+            behind = bet[player] < max(bet)
+            round_over = False
             if action.encode == 0:  # pass
-                # The game will end after 'pass' if one's bet are more
-                #   or player 2 passes in phase 2
-                if world_state.bet[0] != world_state.bet[1] or \
-                        (world_state.player == 1 and world_state.phase == 1):
-                    w_encode[-1] = -2  # terminal
-                # The game will turn to chance when player 2 passes in phase 1
-                elif world_state.player == 1 and world_state.phase == 0:
-                    w_encode[-1] = -1  # chance
-                else:
-                    w_encode[-1] = 1 - w_encode[-1]  # opponent's turn
-            else:  # bet
-                w_encode[1][action.player] *= 2  # the bet of current player *2
-                # The game will end after 'bet' if two players have equal bets in phase 2
-                #   and will turn to chance if in phase 1
-                if w_encode[1][0] == w_encode[1][1]:
-                    if world_state.phase == 1:
-                        w_encode[-1] = -2  # terminal
-                    elif world_state.phase == 0:
-                        w_encode[-1] = -1  # chance
+                # The game will end after 'pass' if one's bet are more, and
+                #   the round will end when player 2 passes
+                if behind:
+                    turn = -2  # terminal
+                elif player == 1:
+                    round_over = True
                 else:
-                    w_encode[-1] = 1 - w_encode[-1]  # opponent's turn
-        next_world_state = WorldState(w_encode)
+                    turn = 1  # opponent's turn
+            elif action.encode == 1 and behind:  # call
+                bet = (max(bet), bet[1]) if player == 0 else (bet[0], max(bet))
+                round_over = True
+            else:  # bet or raise, the bet of current player is double the highest
+                bet = (2 * max(bet), bet[1]) if player == 0 else (bet[0], 2 * max(bet))
+                raises += 1
+                turn = 1 - player  # opponent's turn
+            # The game will end after the last round, or turn to chance
+            if round_over:
+                turn = -2 if phase == self.num_rounds - 1 else -1
+                raises = 0
+        next_world_state = WorldState((*hand, *pub, *bet, raises, turn), self._rules)
 
         # Get observation
         # Observations always match the world state
-        obs = (PrivateObservation(next_world_state.hand[0], 0),
-               PrivateObservation(next_world_state.hand[1], 1),
-               PublicObservation([next_world_state.bet, next_world_state.pub]))
+        obs = (PrivateObservation.interned(hand[0], 0, self._rules),
+               PrivateObservation.interned(hand[1], 1, self._rules),
+               PublicObservation.interned((*bet, *pub), self._rules))
 
         # Get reward
         if not next_world_state.is_terminal():
             reward = 0
         else:
-            if next_world_state.winner == -1:  # draw
+            winner = next_world_state.winner
+            if winner == -1:  # draw
                 reward = 0
-            elif next_world_state.winner == 0:
-                reward = next_world_state.bet[1 - next_world_state.winner]
+            elif winner == 0:
+                reward = bet[1]
             else:
-                reward = -next_world_state.bet[1 - next_world_state.winner]
+                reward = -bet[0]
 
         return StepRecord(world_state, action, next_world_state, obs, reward)
 
+    def payoff_table(self):
+        """Get the dense terminal payoff table indexed by (hand0, hand1,
+        *public cards, betting sequence id)."""
+
+        if not hasattr(self, '_payoff_table'):
+            self._payoff_table = PayoffTable(self, num_cards=self.num_ranks,
+                                             num_public_cards=self.num_rounds - 1)
+
+        return self._payoff_table
+
+    def terminal_return(self, history):
+        """Get the return of player 0 of a terminal history by the table."""
+
+        return self.payoff_table().value(history)
+
+    def encode_batch(self, states):
+        """Encode world states as rows of [h1, h2, *hp, b1, b2, r, turn]."""
+
+        return np.array([s.encode for s in states], dtype=np.int64)
+
+    def decode_batch(self, states):
+        """Decode rows of [h1, h2, *hp, b1, b2, r, turn] to world states."""
+
+        return [WorldState(tuple(row), self._rules)
+                for row in np.asarray(states).tolist()]
+
+    def step_batch(self, states, actions):
+        """Get the step results of a batch of world states at once.
+
+        The states are rows of [h1, h2, *hp, b1, b2, r, turn], and the actions
+        are 0, 1, 2 for pass, bet, raise or the index of the deal for the chance.
+        The observations are rows of [o1, o2, b1, b2, *hp] of the private and
+        public observations.
+        """
+
+        states = np.asarray(states)
+        actions = np.asarray(actions)
+        num_rounds = self.num_rounds
+        next_states = states.copy()
+        hand, pub = next_states[:, 0:2], next_states[:, 2:num_rounds + 1]
+        bet, raises, turn = next_states[:, -4:-2], next_states[:, -2], next_states[:, -1]
+        player = states[:, -1]
+        phase = (states[:, 2:num_rounds + 1] != -1).sum(axis=1) + \
+            ((player == -1) & (states[:, 0] != -1))
+        index = np.arange(len(states))
+
+        # Deal the private hands or the public hand for the chance
+        is_chance = player == -1
+        private = is_chance & (phase == 0)
+        hand[private, 0], hand[private, 1] = np.divmod(actions[private], self.num_ranks)
+        public = np.nonzero(is_chance & (phase > 0))[0]
+        pub[public, phase[public] - 1] = actions[public]
+        turn[is_chance] = 0  # player 1's turn
+
+        # The game will end after 'pass' if one's bet are more, and the round
+        #   will end when player 2 passes or after 'call'
+        is_player = player >= 0
+        highest = states[:, -4:-2].max(axis=1)
+        behind = is_player & (states[index, -4 + np.maximum(player, 0)] < highest)
+        is_pass = is_player & (actions == 0)
+        turn[is_pass & behind] = -2
+        turn[is_pass & ~behind & (player == 0)] = 1
+        is_call = is_player & (actions == 1) & behind
+        bet[is_call, player[is_call]] = highest[is_call]
+        round_over = (is_pass & ~behind & (player == 1)) | is_call
+        turn[round_over] = np.where(phase[round_over] == num_rounds - 1, -2, -1)
+        raises[round_over] = 0
+
+        # The bet of current player is double the highest after 'bet' or 'raise'
+        is_raise = is_player & (actions >= 1) & ~is_call
+        bet[is_raise, player[is_raise]] = 2 * highest[is_raise]
+        raises[is_raise] += 1
+        turn[is_raise] = 1 - player[is_raise]
+
+        # Get the rewards of the winners, the pairs with the public hands are
+        #   stronger and then the higher rank
+        terminal = turn == -2
+        strength = (pub[:, None, :] == hand[:, :, None]).sum(axis=2) * self.num_ranks + hand
+        winner = np.where(
+            bet[:, 0] != bet[:, 1], np.where(bet[:, 0] > bet[:, 1], 0, 1),
+            np.where(strength[:, 0] == strength[:, 1], -1,
+                     np.where(strength[:, 0] > strength[:, 1], 0, 1)))
+        rewards = np.where(terminal & (winner == 0), bet[:, 1], 0) - \
+            np.where(terminal & (winner == 1), bet[:, 0], 0)
+
+        # Observations always match the world state
+        obs = np.concatenate([hand, bet, pub], axis=1)
+
+        return next_states, obs, rewards, terminal
+
     def get_tensor(self, pbs):
         """Get the tensor of a public belief state such like
-        [round, bet1, bet2, pub_hand, turn, *prob_dict]."""
+        [round, bet1, bet2, *pub_hands, turn, *prob_dict]."""
 
         public_state = pbs.public_state
-        # Get tensor such like [round, bet1, bet2, pub_hand, turn, *prob_dict]
+        # Get tensor such like [round, bet1, bet2, *pub_hands, turn, *prob_dict]
         pbs_list = [len(public_state), public_state[-1].bet[0], public_state[-1].bet[1],
-                    public_state[-1].pub, pbs.current_player(),
+                    *public_state[-1].pub, pbs.current_player(),
                     *[prob for prob in pbs.prob_dict.values()]]
         pbs_tensor = torch.tensor(pbs_list)
 
@@ -1,61 +1,128 @@
 import env.environment as e
 import numpy as np
 
+# The names of the ranks from the lowest to the highest, a deck of n ranks
+#   takes the last n names, so that the 3 ranks of Leduc Poker are J, Q, K
+RANK_NAMES = 'A23456789TJQK'
+
+
+def rank_names(num_ranks):
+    """Return the names of the ranks of a deck with num_ranks ranks."""
+
+    if num_ranks <= len(RANK_NAMES):
+        return tuple(RANK_NAMES[len(RANK_NAMES) - num_ranks:])
+    return tuple(str(r) for r in range(num_ranks))
+
+
+class Rules(object):
+    """Rules of a game of the Leduc Poker family.
+
+    The deck has num_suits cards of each of num_ranks ranks, and the suits do
+    not matter. There are num_rounds betting rounds, a private card is dealt to
+    each player before the first round and a public card before each of the
+    others. Each raise doubles the highest bet, and there are at most num_raises
+    raises in a round. Leduc Poker has 3 ranks, 2 suits, 1 raise per round and
+    2 rounds.
+    """
+
+    def __init__(self, num_ranks=3, num_suits=2, num_raises=1, num_rounds=2):
+        """Init the rules and the interned actions of the game."""
+
+        assert num_raises >= 1 and num_rounds >= 1
+        assert num_ranks * num_suits >= num_rounds + 1, 'not enough cards'
+
+        self.num_ranks = num_ranks
+        self.num_suits = num_suits
+        self.num_raises = num_raises
+        self.num_rounds = num_rounds
+        self.rank_names = rank_names(num_ranks)
+
+        # Interned actions, the legal actions are shared by all the world states,
+        #   and all the deals are listed even if some of them have prob 0
+        self.private_chance_actions = tuple(Action((i, j), rules=self)
+                                            for i in range(num_ranks)
+                                            for j in range(num_ranks))
+        self.public_chance_actions = tuple(Action(i, rules=self)
+                                           for i in range(num_ranks))
+        self.player_actions = tuple((Action(0, player, self), Action(1, player, self))
+                                    for player in range(2))
+        # Raise is legal only when the opponent has raised and there are raises left
+        self.player_actions_raise = tuple((*actions, Action(2, player, self))
+                                          for player, actions in enumerate(self.player_actions))
+
 
 class WorldState(e.WorldState):
     """World state object of env: Leduc Poker.
 
-    A world state of Leduc Poker is encoded as [[h1, h2, hp], [b1, b2], turn],
-    where h1, h2, hp represent the hands of two players and public respectively,
-    and b1, b2 represent the total bet of two players. 'turn' indicates which
-    player is currently playing including the chance as -1, and when turn 
-    == -2, it means that the game is over.
+    A world state of Leduc Poker is encoded as a flat tuple (h1, h2, *hp, b1,
+    b2, r, turn), where h1, h2 represent the hands of two players, hp are the
+    public hands of the rounds after the first which are -1 until dealt, b1, b2
+    represent the total bet of two players and r is the number of raises in the
+    current round. 'turn' indicates which player is currently playing including
+    the chance as -1, and when turn == -2, it means that the game is over.
     """
 
-    __hand_dict = {0: 'J', 1: 'Q', 2: 'K', -1: '?'}
+    __slots__ = ('encode', 'rules', 'player', 'hand', 'bet', 'pub', 'raises',
+                 'phase')
 
-    def __init__(self, encode):
+    def __init__(self, encode, rules=None):
         """Init the world state instance."""
 
         self.encode = encode
+        self.rules = DEFAULT_RULES if rules is None else rules
         self.player = encode[-1]
 
-        self.hand = self.encode[0][:2]
-        self.bet = self.encode[1]
-        self.pub = self.encode[0][-1]
-        self.phase = 1 if self.pub != -1 or \
-            (self.player == -1 and self.hand != [-1, -1]) else 0
+        self.hand = encode[:2]
+        self.pub = encode[2:-4]
+        self.bet = encode[-4:-2]
+        self.raises = encode[-2]
+        # The round, which is the next one when the chance deals the public hand
+        self.phase = len(self.pub) - self.pub.count(-1) + \
+            (1 if self.player == -1 and self.hand[0] != -1 else 0)
 
     def legal_actions(self):
         """Return a list of actions that are legal on this state."""
 
         if self.player == -2:  # is terminal
-            return []
+            return ()
         elif self.player == -1:  # is chance
             if self.phase == 0:  # private hands chance
-                return [Action([i, j]) for i in range(3) for j in range(3)]
+                return self.rules.private_chance_actions
             else:  # public hands chance
-                return [Action(i) for i in range(3)]
+                return self.rules.public_chance_actions
+        elif self.bet[self.player] < max(self.bet) and \
+                self.raises < self.rules.num_raises:  # can raise
+            return self.rules.player_actions_raise[self.player]
         else:
-            return [Action(0, self.player), Action(1, self.player)]
+            return self.rules.player_actions[self.player]
 
     def chance_outcomes(self):
         """Return a list of actions and the corresponding probs."""
 
         assert self.is_chance()
 
+        num_suits = self.rules.num_suits
         action_list = self.legal_actions()
         if self.phase == 0:  # private hands chance
-            prob_list = [1 if a.encode[0] == a.encode[1] else 2
+            prob_list = [num_suits * (num_suits - 1) if a.encode[0] == a.encode[1]
+                         else num_suits ** 2 for a in action_list]
+        else:  # the cards left of each rank
+            dealt = [*self.hand, *self.pub]
+            prob_list = [max(0, num_suits - dealt.count(a.encode))
                          for a in action_list]
-        else:
-            prob_list = [2 - int(self.hand[0] == a.encode) -
-                         int(self.hand[1] == a.encode) for a in action_list]
         prob_list = np.array(prob_list)
-        prob_list = prob_list / np.sum(prob_list)
+        if np.sum(prob_list) > 0:
+            prob_list = prob_list / np.sum(prob_list)
 
         return action_list, prob_list
 
+    def strength(self, player):
+        """Return the showdown strength of the hand of a player, the pairs with
+        the public hands are stronger and then the higher rank."""
+
+        return self.pub.count(self.hand[player]) * self.rules.num_ranks + \
+            self.hand[player]
+
     @property
     def winner(self):
         """Return the winner for a terminal world state."""
@@ -65,41 +132,39 @@ class WorldState(e.WorldState):
         if self.bet[0] != self.bet[1]:  # the player who passed will lose
             return 0 if self.bet[0] > self.bet[1] else 1
         else:  # campare the hands
-            if self.hand[0] == self.hand[1]:
+            strength_0, strength_1 = self.strength(0), self.strength(1)
+            if strength_0 == strength_1:
                 return -1  # draw
-            elif self.hand[0] == self.pub:
-                return 0
-            elif self.hand[1] == self.pub:
-                return 1
-            else:
-                return 0 if self.hand[0] > self.hand[1] else 1
+            return 0 if strength_0 > strength_1 else 1
 
     def to_string(self):
         """Return a string representing this world state."""
 
-        return '[%s, %s, %s], [%d, %d], %d' % \
-            (WorldState.__hand_dict[self.hand[0]],
-             WorldState.__hand_dict[self.hand[1]],
-             WorldState.__hand_dict[self.pub],
-             self.bet[0], self.bet[1], self.player)
+        return '[%s], [%d, %d], %d' % (
+            ', '.join(self.rules.rank_names[h] if h != -1 else '?'
+                      for h in (*self.hand, *self.pub)),
+            self.bet[0], self.bet[1], self.player)
 
 
 class Action(e.Action):
     """Action object of env: Leduc Poker.
 
     A player's action of Leduc Poker is encoded as a single scalar that
-    is 0, 1 when act pass, bet respetively. A chance's action is encoded
-    as [h1, h2] or hp that indicates the deal.
+    is 0, 1 when act pass, bet respetively, and 2 when raise after the
+    opponent raised. A chance's action is encoded as (h1, h2) or hp that
+    indicates the deal.
     """
 
-    __act_dict = {0: 'pass', 1: 'bet'}
-    __hand_dict = {0: 'J', 1: 'Q', 2: 'K'}
+    __slots__ = ('encode', 'player', 'rules')
+
+    __act_dict = {0: 'pass', 1: 'bet', 2: 'raise'}
 
-    def __init__(self, encode, player=-1):
+    def __init__(self, encode, player=-1, rules=None):
         """Init the action instance."""
 
         self.encode = encode
         self.player = player
+        self.rules = rules
 
     def to_string(self):
         """Return a string representing this action."""
@@ -107,10 +172,10 @@ class Action(e.Action):
         if self.player != -1:  # is not chance
             return Action.__act_dict[self.encode]
         else:  # is chance
-            if isinstance(self.encode, list):
-                return ', '.join(Action.__hand_dict[x] for x in self.encode)
+            if isinstance(self.encode, tuple):
+                return ', '.join(self.rules.rank_names[x] for x in self.encode)
             else:
-                return Action.__hand_dict[self.encode]
+                return self.rules.rank_names[self.encode]
 
 
 class PrivateObservation(e.Observation):
@@ -121,39 +186,45 @@ class PrivateObservation(e.Observation):
     means that the hand is unknown.
     """
 
-    __hand_dict = {0: 'J', 1: 'Q', 2: 'K', -1: '?'}
+    __slots__ = ('encode', 'player', 'rules')
 
-    def __init__(self, encode, player):
+    def __init__(self, encode, player, rules=None):
         """Init the private observation instance."""
 
         self.encode = encode
         self.player = player
+        self.rules = DEFAULT_RULES if rules is None else rules
 
     def to_string(self):
         """Return a string representing this private observation."""
 
-        return PrivateObservation.__hand_dict[self.encode]
+        return self.rules.rank_names[self.encode] if self.encode != -1 else '?'
 
 
 class PublicObservation(e.Observation):
     """Public observation object of env: Leduc Poker.
 
-    A public observations of Leduc Poker is encoded as [[b1, b2], hp], where
-    b1, b2 represent the total bet of two players at the moment and hp is the
-    public hand which is -1 when it is unknown.
+    A public observations of Leduc Poker is encoded as (b1, b2, *hp), where
+    b1, b2 represent the total bet of two players at the moment and hp are the
+    public hands which are -1 when they are unknown.
     """
 
-    __hand_dict = {0: 'J', 1: 'Q', 2: 'K', -1: '?'}
+    __slots__ = ('encode', 'bet', 'pub', 'rules')
 
-    def __init__(self, encode):
+    def __init__(self, encode, rules=None):
         """Init the public observation instance."""
 
         self.encode = encode
-        self.bet = encode[0]
-        self.pub = encode[1]
+        self.bet = encode[:2]
+        self.pub = encode[2:]
+        self.rules = DEFAULT_RULES if rules is None else rules
 
     def to_string(self):
         """Return a string representing this public observation."""
 
-        return '[%s], %s' % (', '.join(str(x)for x in self.bet),
-                             PublicObservation.__hand_dict[self.pub])
+        return ', '.join(['[%s]' % ', '.join(str(x) for x in self.bet)] +
+                         [self.rules.rank_names[p] if p != -1 else '?'
+                          for p in self.pub])
+
+
+DEFAULT_RULES = Rules()
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class PayoffTable(object):
+    """Dense terminal payoff table of a small poker game such as Kuhn or Leduc.
+
+    payoff[h0, h1, *pub, seq] is the return of player 0 at the terminal with the
+    hands h0, h1, the public cards pub, one an axis, and the betting sequence of
+    id seq. The last index of each public card is for the card not dealt, so
+    that -1 is valid, and the terminals before a public card are copied to all
+    the cards of it. The impossible deals have the payoff 0.
+
+    A betting sequence is the tuple of the encodings of the player actions,
+    and the terminal histories are mapped to the ids of their sequences by the
+    keys of their public states, which are cached along the histories.
+    """
+
+    def __init__(self, env, num_cards, num_public_cards=0):
+        """Enumerate the terminals of the game tree of an environment."""
+
+        self.sequences = []
+        self.sequence_ids = {}
+        self._public_state_ids = {}
+        entries = []
+        for history in env.iter_histories(max_depth=float('inf'), cache=False):
+            if not history.is_terminal():
+                continue
+            sequence = tuple(record.action.encode for record in history[1:]
+                             if record.action.player >= 0)
+            if sequence not in self.sequence_ids:
+                self.sequence_ids[sequence] = len(self.sequences)
+                self.sequences.append(sequence)
+            sequence_id = self.sequence_ids[sequence]
+            self._public_state_ids[history.get_public_state().key] = sequence_id
+            state = history[-1].next_state
+            entries.append((state.hand, getattr(state, 'pub', ()), sequence_id,
+                            history.get_return()))
+
+        self.payoff = np.zeros((num_cards, num_cards,
+                                *[num_cards + 1] * num_public_cards, len(self.sequences)))
+        for hand, pub, sequence_id, value in entries:
+            # The same for all the cards not dealt
+            self.payoff[(*hand, *[slice(None) if p == -1 else p for p in pub],
+                         sequence_id)] = value
+
+    def sequence_id(self, history):
+        """Get the betting sequence id of a terminal history."""
+
+        return self._public_state_ids[history.get_public_state().key]
+
+    def value(self, history):
+        """Get the return of player 0 of a terminal history."""
+
+        state = history[-1].next_state
+        return self.payoff[(*state.hand, *getattr(state, 'pub', ()),
+                            self.sequence_id(history))]
+
+    def values(self, hands, pubs, sequence_ids):
+        """Get the returns of player 0 of the terminals at once, given the rows
+        of the hands, the rows of the public cards and the sequence ids."""
+
+        hands = np.asarray(hands)
+        pubs = np.asarray(pubs).reshape(len(hands), -1)
+        return self.payoff[(*hands.T, *pubs.T, np.asarray(sequence_ids))]
@@ -57,9 +57,9 @@ class PublicBeliefState(object):
         total = 0
         for history in self.history_list:
             child_history = history.child(action)
-            prob_dict[child_history.to_string()] = float(
-                self.prob_dict[history.to_string()] * policy.get_prob(history, action))
-            total += prob_dict[child_history.to_string()]
+            prob_dict[child_history.key] = float(
+                self.prob_dict[history.key] * policy.get_prob(history, action))
+            total += prob_dict[child_history.key]
         if total == 0:
             prob_dict = {k : 1 / len(prob_dict.keys()) for k in prob_dict.keys()}
         else:
@@ -73,3 +73,49 @@ class PublicBeliefState(object):
         if not hasattr(self, '_tensor'):
             self._tensor = self._env.get_tensor(self)
         return self._tensor
+
+
+class RangePublicBeliefState(PublicBeliefState):
+    """Factored public belief state for the games with private hands.
+
+    Instead of the joint probs of all histories, it keeps a range for each
+    player, that is a vector of the probs of all the possible private hands of
+    that player. The history is a public history, in which no private hand is
+    dealt, and the hands blocked by the public cards are masked to zero by the
+    environment with 'blocked_hands'.
+    """
+
+    def __init__(self, history, ranges):
+        self.history = history
+        self.public_state = history.get_public_state()
+        self.ranges = ranges  # array of shape (num_players, num_hands)
+
+        self._env = history._env
+
+    @property
+    def history_list(self):
+        return [self.history]
+
+    def child(self, action, policy=None):
+        """Get the child PBS given the action and the policy, which is an array
+        of the probs of the legal actions for each hand of the current player,
+        of shape (num_hands, num_actions). The policy is not used for chance.
+        """
+
+        history = self.history.child(action)
+        ranges = self.ranges.copy()
+        if self.is_chance():
+            ranges[:, self._env.blocked_hands(history)] = 0
+        else:
+            player = self.current_player()
+            ranges[player] *= policy[:, self.legal_actions().index(action)]
+
+        # Normalize each range, and reset to uniform if it is impossible
+        for player_range in ranges:
+            total = player_range.sum()
+            if total == 0:
+                player_range[~self._env.blocked_hands(history)] = 1
+                total = player_range.sum()
+            player_range /= total
+
+        return RangePublicBeliefState(history, ranges)
@@ -32,7 +32,7 @@ class RockSample(e.Environment):
     def initial_obs(self):
         """Get new initial observations."""
 
-        return Observation(-1)  # none
+        return Observation.interned(-1)  # none
 
     def step(self, world_state, action):
         """Get step result by given world state and action."""
@@ -52,7 +52,7 @@ class RockSample(e.Environment):
                     if action.encode // 2**i % 2 == 1 else 'x'
             map_encode[2][0] = '.p'
             step_record.next_state = WorldState(map_encode)
-            step_record.obs = Observation(-1)  # none
+            step_record.obs = Observation.interned(-1)  # none
             step_record.reward = 0
 
             return step_record
@@ -77,25 +77,25 @@ class RockSample(e.Environment):
 
         # Get observation
         if action.encode == 4:  # sample
-            step_record.obs = Observation(1) if world_state.map[pos[0]][pos[1]] \
-                is 'o' else Observation(0)
+            step_record.obs = Observation.interned(1) if world_state.map[pos[0]][pos[1]] \
+                == 'op' else Observation.interned(0)
         elif action.encode > 4:  # check
             rock_info = world_state.rock_list[action.encode - 5]
             distance = np.abs(rock_info[0][0] - pos[0]) + \
                 np.abs(rock_info[0][1] - pos[1])
-            if np.random.rand() < np.math.pow(2, -distance / 10):
-                step_record.obs = Observation(1) if \
-                    rock_info[1] is 'good' else Observation(0)
+            if np.random.rand() < 2 ** (-distance / 10):
+                step_record.obs = Observation.interned(1) if \
+                    rock_info[1] == 'good' else Observation.interned(0)
             else:
-                step_record.obs = Observation(1) if \
-                    rock_info[1] is 'bad' else Observation(0)
+                step_record.obs = Observation.interned(1) if \
+                    rock_info[1] == 'bad' else Observation.interned(0)
         else:
-            step_record.obs = Observation(-1)  # none
+            step_record.obs = Observation.interned(-1)  # none
 
         # Get reward
         if action.encode == 4:  # sample
             step_record.reward = 20 if world_state.map[pos[0]][pos[1]] \
-                is 'o' else -20
+                == 'op' else -20
         elif action.encode > 4:  # check
             step_record.reward = 0
         else:
@@ -103,6 +103,79 @@ class RockSample(e.Environment):
 
         return step_record
 
+    def encode_batch(self, states):
+        """Encode world states as rows of [row, col, rock_1, ..., rock_n], where
+        the rocks are 1 for good, 0 for bad and -1 for picked, and the position
+        is (-1, -1) for the chance."""
+
+        status = {'good': 1, 'bad': 0, 'picked': -1}
+        return np.array([[*(s.pos if s.pos is not None else (-1, -1)),
+                          *[status[rock_info[1]] for rock_info in s.rock_list]]
+                         for s in states], dtype=np.int64)
+
+    def decode_batch(self, states):
+        """Decode rows of [row, col, rock_1, ..., rock_n] to world states."""
+
+        inital_state = self.initial_state()
+        rock_pos = [rock_info[0] for rock_info in inital_state.rock_list]
+        state_list = []
+        for row, col, *rocks in np.asarray(states).tolist():
+            map_encode = copy.deepcopy(inital_state.encode)
+            for (i, j), rock in zip(rock_pos, rocks):
+                map_encode[i][j] = {1: 'o', 0: 'x', -1: '-'}[rock]
+            if row != -1:
+                map_encode[row][col] += 'p'
+            state_list.append(WorldState(map_encode))
+        return state_list
+
+    def step_batch(self, states, actions):
+        """Get the step results of a batch of world states at once.
+
+        The states are rows encoded by encode_batch, the actions and the
+        observations are arrays of their scalar encodings.
+        """
+
+        states = np.asarray(states)
+        actions = np.asarray(actions)
+        inital_state = self.initial_state()
+        rock_pos = np.array([rock_info[0] for rock_info in inital_state.rock_list])
+        num_rocks = len(rock_pos)
+        next_states = states.copy()
+        row, col, rocks = states[:, 0], states[:, 1], states[:, 2:]
+        obs = np.full(len(states), -1)
+        rewards = np.zeros(len(states))
+
+        # Set the rocks good or bad by the bits of the chance action
+        is_chance = row == -1
+        next_states[is_chance, 2:] = \
+            actions[is_chance, None] // 2 ** np.arange(num_rocks) % 2
+        next_states[is_chance, 0:2] = (2, 0)
+
+        # Move east, south, west or north
+        move = ~is_chance & (actions < 4)
+        next_states[move, 0] += np.array([0, 1, 0, -1])[actions[move]]
+        next_states[move, 1] += np.array([1, 0, -1, 0])[actions[move]]
+
+        # Sample the rock at the position of the player
+        at_rock = (row[:, None] == rock_pos[:, 0]) & (col[:, None] == rock_pos[:, 1])
+        good = (at_rock & (rocks == 1)).any(axis=1)
+        sample = ~is_chance & (actions == 4)
+        next_states[:, 2:][sample[:, None] & at_rock] = -1
+        obs[sample] = good[sample]
+        rewards[sample] = np.where(good, 20, -20)[sample]
+
+        # Check a rock with an accuracy decreasing with the distance
+        check = ~is_chance & (actions > 4)
+        rock = np.clip(actions - 5, 0, num_rocks - 1)
+        distance = np.abs(rock_pos[rock, 0] - row) + np.abs(rock_pos[rock, 1] - col)
+        correct = np.random.rand(len(states)) < 2.0 ** (-distance / 10)
+        status = rocks[np.arange(len(states)), rock]
+        obs[check] = np.where(correct, status == 1, status == 0)[check]
+
+        terminal = next_states[:, 1] == len(inital_state.map[0]) - 1
+
+        return next_states, obs, rewards, terminal
+
     def possible_states(self, obs):
         """Return a list of all possilble states corresponding to current obs."""
 
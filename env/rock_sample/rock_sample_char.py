@@ -9,24 +9,28 @@ class WorldState(e.WorldState):
     which can follow 'o' or 'x', and '.' indicates the empty grid.
     """
 
+    __slots__ = ('encode', 'map', 'pos', 'rock_list', 'player')
+
     def __init__(self, encode):
         """Init the world state instance."""
 
         self.encode = encode
         self.map = encode
-        self.pos = None
-        self.rock_list = []
 
+        pos = None
+        rock_list = []
         for i in range(len(self.map)):
             for j in range(len(self.map[0])):
                 if self.map[i][j][-1] == 'p':
-                    self.pos = (i, j)
+                    pos = (i, j)
                 if self.map[i][j][0] == 'o':
-                    self.rock_list.append(((i, j), 'good'))
+                    rock_list.append(((i, j), 'good'))
                 elif self.map[i][j][0] == 'x':
-                    self.rock_list.append(((i, j), 'bad'))
+                    rock_list.append(((i, j), 'bad'))
                 elif self.map[i][j][0] == '-':
-                    self.rock_list.append(((i, j), 'picked'))
+                    rock_list.append(((i, j), 'picked'))
+        self.pos = pos
+        self.rock_list = rock_list
 
         if self.pos is None:
             self.player = -1  # chance
@@ -39,25 +43,27 @@ class WorldState(e.WorldState):
         """Return a list of actions that are legal on this state."""
 
         if self.player == -2:  # is terminal
-            return []
+            return ()
         elif self.player == -1:  # is chance
             # 2^n_rock actions for all possibilities of rocks for good or bad
-            return [Action(a, -1) for a in range(2 ** len(self.rock_list))]
+            return tuple(Action.interned(a, -1)
+                         for a in range(2 ** len(self.rock_list)))
         else:
             action_list = []
             if self.pos[1] < len(self.map[0]) - 1:
-                action_list.append(Action(0, 0))  # east
+                action_list.append(Action.interned(0, 0))  # east
             if self.pos[0] < len(self.map) - 1:
-                action_list.append(Action(1, 0))  # south
+                action_list.append(Action.interned(1, 0))  # south
             if self.pos[1] > 0:
-                action_list.append(Action(2, 0))  # west
+                action_list.append(Action.interned(2, 0))  # west
             if self.pos[0] > 0:
-                action_list.append(Action(3, 0))  # north
-            if self.map[self.pos[0]][self.pos[1]] is 'op' or self.map[self.pos[0]][self.pos[1]] is 'xp':
-                action_list.append(Action(4, 0))  # sample
-            action_list += [Action(a, 0) for a in range(5, 5 + len(self.rock_list))]
+                action_list.append(Action.interned(3, 0))  # north
+            if self.map[self.pos[0]][self.pos[1]] in ('op', 'xp'):
+                action_list.append(Action.interned(4, 0))  # sample
+            action_list += [Action.interned(a, 0)
+                            for a in range(5, 5 + len(self.rock_list))]
 
-            return action_list
+            return tuple(action_list)
 
     def chance_outcomes(self):
         """Return a list of actions and the corresponding probs."""
@@ -82,6 +88,8 @@ class Action(e.Action):
     beginning chance node.
     """
 
+    __slots__ = ('encode', 'player')
+
     __name_dict = {0: 'east', 1: 'south', 2: 'west', 3: 'north', 4: 'sample'}
 
     def __init__(self, encode, player=-1):
@@ -110,6 +118,8 @@ class Observation(e.Observation):
     no observation.
     """
 
+    __slots__ = ('encode',)
+
     __name_dict = {0: 'bad', 1: 'good', -1: 'none'}
 
     def __init__(self, encode):
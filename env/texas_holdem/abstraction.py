@@ -0,0 +1,297 @@
+import env.compiled_game as compiled_game
+from env.history import hash_ints, INFO_STATE_ROOT_KEYS
+from env.texas_holdem.equity import runouts, _strengths
+from env.texas_holdem.preflop import get_preflop_table
+from env.texas_holdem.texas_holdem_char import *
+import env.texas_holdem.equity as equity
+import env.texas_holdem.hand_evaluator as hand_evaluator
+import env.texas_holdem.preflop as preflop
+import env.texas_holdem.texas_holdem_char as texas_holdem_char
+
+import numpy as np
+import itertools
+import os
+import shutil
+
+NUM_BUCKETS = (8, 50, 50, 50)  # of preflop, flop, turn and river
+NUM_BOARDS = 20  # sampled boards of each street to cluster
+NUM_RUNOUTS = 50  # sampled runouts of the equity distributions
+NUM_BINS = 10  # of the histograms of the equity distributions
+MAX_CACHED_BOARDS = 10000
+PRECOMPUTED_STREETS = (1, 2)  # the buckets of all the flops and turns
+
+# The hand combinations sharing a card with each one, including itself
+_CONFLICTS = np.array([np.nonzero((HAND_COMBO_MASKS & m) != 0)[0]
+                       for m in HAND_COMBO_MASKS.tolist()])
+
+# The cards and the hand combinations mapped by the permutations of the suits
+_PERMUTED_CARDS = np.array([[suits[c // 13] * 13 + c % 13 for c in range(52)]
+                            for suits in itertools.permutations(range(4))])
+_PERMUTED_COMBOS = COMBO_INDEX[_PERMUTED_CARDS[:, HAND_COMBOS[:, 0]],
+                               _PERMUTED_CARDS[:, HAND_COMBOS[:, 1]]]
+
+
+def canonical_board(board):
+    """Get the mask of the representative of the suit-isomorphic boards of a
+    board, the one with the smallest mask, and the index of the permutation of
+    the suits mapping the board to it."""
+
+    masks = (np.int64(1) << _PERMUTED_CARDS[:, list(board)]).sum(axis=1)
+    permutation = int(masks.argmin())
+    return int(masks[permutation]), permutation
+
+
+def river_equities(board):
+    """Get the equities of all the hand combinations against a random hand on
+    a full board, the probability of winning plus half of a draw. They are zero
+    for the hands blocked by the board."""
+
+    strengths = _strengths(list(board))
+    valid = ~blocked_combos(card_mask(board))
+
+    # Count the valid hands below and equal to each hand by sorting, then take
+    #   off the hands sharing a card with it
+    valid_strengths = np.sort(strengths[valid])
+    below = np.searchsorted(valid_strengths, strengths, side='left')
+    equal = np.searchsorted(valid_strengths, strengths, side='right') - below
+    conflicts = valid[_CONFLICTS]
+    conflict_strengths = strengths[_CONFLICTS]
+    below -= (conflicts & (conflict_strengths < strengths[:, None])).sum(axis=1)
+    equal -= (conflicts & (conflict_strengths == strengths[:, None])).sum(axis=1)
+    total = len(valid_strengths) - conflicts.sum(axis=1)
+
+    return np.where(valid, (below + equal / 2) / np.maximum(total, 1), 0)
+
+
+def equity_features(board, num_runouts=NUM_RUNOUTS, rng=None):
+    """Get the features of all the hand combinations on a board, one a row.
+
+    On the river it is the equity, before the river it is the cumulative
+    histogram of the equities over the runouts, so that the Euclidean distance
+    approximates the earth mover's distance of the equity distributions.
+    Preflop it is the strength in the preflop table.
+    """
+
+    board = list(board)
+    if len(board) == 0:
+        return get_preflop_table().strength[HAND_COMBO_CLASSES][:, None]
+    if len(board) == 5:
+        return river_equities(board)[:, None]
+
+    board_mask = card_mask(board)
+    histogram = np.zeros((NUM_HAND_COMBOS, NUM_BINS))
+    count = np.zeros(NUM_HAND_COMBOS)
+    for runout in runouts(board_mask, 5 - len(board), num_runouts, rng):
+        valid = ~blocked_combos(card_mask(runout.tolist()))
+        bins = np.minimum((river_equities(board + runout.tolist()) * NUM_BINS)
+                          .astype(np.int64), NUM_BINS - 1)
+        histogram[np.nonzero(valid)[0], bins[valid]] += 1
+        count += valid
+    histogram /= np.maximum(count, 1)[:, None]
+
+    return np.cumsum(histogram, axis=1)
+
+
+def _mean_equities(features):
+    """Get the mean equities of the features to order the buckets."""
+
+    if features.shape[1] == 1:
+        return features[:, 0]
+    return 1 - features.mean(axis=1)
+
+
+def _kmeans(points, num_clusters, rng, num_iterations=30):
+    """Cluster the points by k-means and return the centroids."""
+
+    num_clusters = min(num_clusters, len(np.unique(points, axis=0)))
+    centroids = points[rng.choice(len(points), num_clusters, replace=False)]
+    for _ in range(num_iterations):
+        distances = ((points[:, None] - centroids) ** 2).sum(axis=-1)
+        labels = distances.argmin(axis=1)
+        for k in range(num_clusters):
+            members = points[labels == k]
+            if len(members):
+                centroids[k] = members.mean(axis=0)
+            else:  # restart an empty cluster at the farthest point
+                centroids[k] = points[distances.min(axis=1).argmax()]
+
+    return centroids
+
+
+class CardAbstraction(object):
+    """Card abstraction of Texas Hold'em by equity distribution clustering.
+
+    The private hand and the board of a street are mapped to one of the
+    num_buckets[street] buckets, which are the k-means clusters of the equity
+    features of the hands on sampled boards, ordered from the weakest to the
+    strongest. The centroids are computed offline and saved as .npy files
+    under results/. The buckets of a board are computed for all the hands at
+    once on the representative of its suit-isomorphic boards, and they are
+    precomputed offline for the flops and the turns, of which there are few
+    representatives.
+
+    An info state is abstracted to the bucket of the current street and the
+    betting sequence, so that a tabular policy has at most the number of
+    buckets times the number of betting sequences rows.
+    """
+
+    def __init__(self, num_buckets=NUM_BUCKETS, num_boards=NUM_BOARDS,
+                 num_runouts=NUM_RUNOUTS, rng=None):
+        """Cluster the hands of each street, which takes about ten seconds
+        with the default arguments."""
+
+        rng = np.random.RandomState(0) if rng is None else rng
+        self.num_buckets = tuple(num_buckets)
+        self.num_runouts = num_runouts
+        self.centroids = []
+        for street, num_cards in enumerate([0, 3, 4, 5]):
+            boards = [[]] if num_cards == 0 else \
+                runouts(0, num_cards, num_boards, rng).tolist()
+            points = np.concatenate([
+                equity_features(board, num_runouts, rng)[
+                    ~blocked_combos(card_mask(board))] for board in boards])
+            centroids = _kmeans(points, self.num_buckets[street], rng)
+            self.centroids.append(centroids[np.argsort(_mean_equities(centroids))])
+        self._canonical_buckets = {}
+
+    def precompute(self, street):
+        """Compute the buckets of the representatives of all the boards of a
+        street, which takes about 3 minutes for the 1755 flops and 20 minutes
+        for the 16432 turns."""
+
+        num_cards = [0, 3, 4, 5][street]
+        boards = np.array(list(itertools.combinations(range(52), num_cards)),
+                          dtype=np.int64).reshape(-1, num_cards)
+        masks = np.full(len(boards), np.iinfo(np.int64).max)
+        for cards in _PERMUTED_CARDS:
+            masks = np.minimum(masks, (np.int64(1) << cards[boards]).sum(axis=1))
+        for mask in np.unique(masks).tolist():
+            self._canonical_board_buckets(mask)
+
+    def save(self, directory):
+        """Save the centroids and the buckets of the representative boards
+        computed so far as .npy files."""
+
+        os.makedirs(directory, exist_ok=True)
+        for street, centroids in enumerate(self.centroids):
+            np.save(os.path.join(directory, 'centroids_%d.npy' % street), centroids)
+        if self._canonical_buckets:
+            masks = np.array(list(self._canonical_buckets), dtype=np.int64)
+            np.save(os.path.join(directory, 'board_masks.npy'), masks)
+            np.save(os.path.join(directory, 'board_buckets.npy'),
+                    np.array(list(self._canonical_buckets.values())))
+
+    @classmethod
+    def load(cls, directory, num_runouts=NUM_RUNOUTS):
+        """Load a card abstraction saved by 'save' without clustering."""
+
+        result = cls.__new__(cls)
+        result.centroids = [np.load(os.path.join(directory, 'centroids_%d.npy' % street))
+                            for street in range(4)]
+        result.num_buckets = tuple(len(c) for c in result.centroids)
+        result.num_runouts = num_runouts
+        result._canonical_buckets = {}
+        if os.path.exists(os.path.join(directory, 'board_masks.npy')):
+            masks = np.load(os.path.join(directory, 'board_masks.npy'))
+            buckets = np.load(os.path.join(directory, 'board_buckets.npy'))
+            result._canonical_buckets = dict(zip(masks.tolist(), buckets))
+
+        return result
+
+    @classmethod
+    def from_cache(cls, num_buckets=NUM_BUCKETS, num_boards=NUM_BOARDS,
+                   num_runouts=NUM_RUNOUTS, cache_dir=None):
+        """Load the card abstraction from the on-disk cache, or cluster and save
+        it if there is none for the current code and arguments, together with
+        the buckets of the boards of PRECOMPUTED_STREETS."""
+
+        cache_dir = compiled_game.CACHE_DIR if cache_dir is None else cache_dir
+        # The buckets are clustered on the preflop table and the equities of
+        #   the runouts of the hand combinations
+        version = compiled_game.code_version(
+            __file__, preflop.__file__, equity.__file__,
+            hand_evaluator.__file__, texas_holdem_char.__file__)
+        directory = os.path.join(cache_dir, 'abstraction-%s-%s-%d-%d' % (
+            version, '_'.join(map(str, num_buckets)), num_boards, num_runouts))
+        if os.path.isdir(directory):
+            return cls.load(directory, num_runouts)
+
+        abstraction = cls(num_buckets, num_boards, num_runouts)
+        for street in PRECOMPUTED_STREETS:
+            abstraction.precompute(street)
+        # Save to a temporary directory first, the same as the compiled games
+        temp_directory = '%s.tmp%d' % (directory, os.getpid())
+        abstraction.save(temp_directory)
+        try:
+            os.rename(temp_directory, directory)
+        except OSError:  # saved by another run
+            shutil.rmtree(temp_directory, ignore_errors=True)
+        compiled_game.prune_cache('abstraction', version, cache_dir)
+
+        return cls.load(directory, num_runouts)
+
+    def _canonical_board_buckets(self, mask):
+        """Get the buckets of all the hand combinations on the representative
+        board of a mask. The ones of the rivers are cheap and not kept."""
+
+        buckets = self._canonical_buckets.get(mask)
+        if buckets is None:
+            board = mask_cards(mask)
+            # Sample the runouts by the board, so that the buckets are the same
+            #   whenever they are computed
+            rng = np.random.RandomState(mask % (1 << 32))
+            features = equity_features(board, self.num_runouts, rng)
+            centroids = self.centroids[len(board) and len(board) - 2]
+            distances = ((features[:, None] - centroids) ** 2).sum(axis=-1)
+            buckets = distances.argmin(axis=1).astype(np.int16)
+            if len(board) < 5:
+                self._canonical_buckets[mask] = buckets
+        return buckets
+
+    def board_buckets(self, board, board_mask=None):
+        """Get the buckets of all the hand combinations on a board, which are
+        those on the representative board with the suits permuted."""
+
+        if not hasattr(self, '_board_buckets'):
+            self._board_buckets = {}
+
+        board_mask = card_mask(board) if board_mask is None else board_mask
+        buckets = self._board_buckets.get(board_mask)
+        if buckets is None:
+            if len(self._board_buckets) >= MAX_CACHED_BOARDS:
+                self._board_buckets.clear()
+            mask, permutation = canonical_board(board)
+            buckets = self._board_buckets[board_mask] = \
+                self._canonical_board_buckets(mask)[_PERMUTED_COMBOS[permutation]]
+
+        return buckets
+
+    def bucket(self, hand, board, board_mask=None):
+        """Get the bucket of a private hand on a board."""
+
+        return int(self.board_buckets(board, board_mask)[COMBO_INDEX[hand[0], hand[1]]])
+
+    def info_state_string(self, history, player):
+        """Get the string of the abstract info state of a player, the street,
+        the bucket and the betting sequence of the streets."""
+
+        state = history[-1].next_state
+        streets = []
+        for record in history[1:]:
+            if record.action.player == CHANCE:
+                streets.append([])
+            else:
+                streets[-1].append(record.action.to_string())
+        return 'player %d, street %d, bucket %d: %s' % (
+            player, state.phase, self.bucket(state.hand[player], state.pub),
+            ' / '.join(' '.join(actions) for actions in streets))
+
+    def info_state_key(self, history, player):
+        """Get the integer key of the abstract info state of a player, which is
+        made of the key of the betting sequence, extended step by step as the
+        key of the history, and the bucket, since the street is given by the
+        betting sequence."""
+
+        state = history[-1].next_state
+        return hash_ints(INFO_STATE_ROOT_KEYS[player], history.action_key(),
+                         self.bucket(state.hand[player], state.pub, state.pub_mask))
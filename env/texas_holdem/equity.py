@@ -0,0 +1,133 @@
+from env.texas_holdem.texas_holdem_char import *
+from env.texas_holdem.hand_evaluator import get_evaluator
+
+import numpy as np
+import itertools
+import math
+
+
+def runouts(dead_mask, num_cards, num_samples=1000, rng=None):
+    """Return an array of the runouts of num_cards public cards, one a row.
+
+    All the runouts of the cards not in the dead mask are enumerated if they
+    are no more than num_samples, otherwise num_samples runouts are sampled
+    uniformly, so that the results are exact or Monte Carlo estimates.
+    """
+
+    remaining_cards = np.array(mask_cards(ALL_CARDS_MASK & ~dead_mask))
+    if num_cards == 0:
+        return np.zeros((1, 0), dtype=np.int64)
+    if math.comb(len(remaining_cards), num_cards) <= num_samples:
+        return np.array(list(itertools.combinations(remaining_cards, num_cards)),
+                        dtype=np.int64)
+
+    rng = np.random if rng is None else rng
+    # The first cards of random permutations of the remaining cards
+    order = np.argsort(rng.rand(num_samples, len(remaining_cards)), axis=1)
+    return remaining_cards[order[:, :num_cards]]
+
+
+def conflict_matrix():
+    """Return a bool matrix of the pairs of hand combinations sharing a card."""
+
+    global _conflict_matrix
+    if _conflict_matrix is None:
+        _conflict_matrix = (HAND_COMBO_MASKS[:, None] & HAND_COMBO_MASKS) != 0
+    return _conflict_matrix
+
+
+_conflict_matrix = None
+
+
+def _strengths(board):
+    """Get the strengths of all the hand combinations with a full board."""
+
+    cards = np.concatenate([HAND_COMBOS, np.broadcast_to(
+        board, (NUM_HAND_COMBOS, len(board)))], axis=1)
+    return get_evaluator().evaluate_batch(cards)
+
+
+def equity_matrix(board, num_samples=1000, rng=None):
+    """Get the showdown matrices of all the hand combinations on a board.
+
+    Return the matrices of the probabilities that hand i wins and ties against
+    hand j over the runouts of the board. They are zero if the hands share a
+    card or are blocked by the board.
+    """
+
+    board = list(board)
+    board_mask = card_mask(board)
+    valid = ~blocked_combos(board_mask)
+    win = np.zeros((NUM_HAND_COMBOS, NUM_HAND_COMBOS), dtype=np.int32)
+    tie = np.zeros((NUM_HAND_COMBOS, NUM_HAND_COMBOS), dtype=np.int32)
+    valid_list = []
+    for runout in runouts(board_mask, 5 - len(board), num_samples, rng):
+        strengths = _strengths(board + runout.tolist()).astype(np.int32)
+        hand_valid = valid & ~blocked_combos(card_mask(runout.tolist()))
+        valid_list.append(hand_valid)
+        # The blocked hands never win as rows and never lose as columns, so
+        #   that a single comparison counts the valid pairs only
+        rows = np.where(hand_valid, strengths, -1)
+        columns = np.where(hand_valid, strengths, np.iinfo(np.int32).max)
+        win += rows[:, None] > columns
+        tie += rows[:, None] == columns
+
+    # Count the runouts where both hands are valid, and the pairs sharing a
+    #   card never meet
+    valid_matrix = np.array(valid_list, dtype=np.float64)
+    count = valid_matrix.T @ valid_matrix
+    count[conflict_matrix()] = 0
+    win = np.divide(win, count, out=np.zeros(count.shape), where=count > 0)
+    tie = np.divide(tie, count, out=np.zeros(count.shape), where=count > 0)
+
+    return win, tie
+
+
+def hand_equity(hand, opponent_range, board, num_samples=1000, rng=None):
+    """Get the probabilities that a hand wins and ties against a range of the
+    opponent, a vector of the probs of the hand combinations, on a board."""
+
+    board = list(board)
+    dead_mask = card_mask(hand) | card_mask(board)
+    opponent_range = np.where(blocked_combos(dead_mask), 0, opponent_range)
+    win = tie = total = 0
+    for runout in runouts(dead_mask, 5 - len(board), num_samples, rng):
+        full_board = board + runout.tolist()
+        strength = get_evaluator().evaluate([*hand, *full_board])
+        strengths = _strengths(full_board)
+        weights = np.where(blocked_combos(card_mask(runout.tolist())),
+                           0, opponent_range)
+        win += weights[strength > strengths].sum()
+        tie += weights[strength == strengths].sum()
+        total += weights.sum()
+
+    if total == 0:
+        return 0, 0
+    return win / total, tie / total
+
+
+def fold_values(ranges, pot, folded_player):
+    """Get the payoffs of all the hand combinations of both players after a
+    player folds, weighted by the range of the opponent."""
+
+    payoff = pot[1] if folded_player == 1 else -pot[0]  # of the first player
+    not_conflict = ~conflict_matrix()
+    values_0 = payoff * (not_conflict @ ranges[1])
+    values_1 = -payoff * (not_conflict @ ranges[0])
+
+    return np.stack([values_0, values_1])
+
+
+def showdown_values(ranges, board, pot, num_samples=1000, rng=None):
+    """Get the expected payoffs of all the hand combinations of both players
+    at the showdown, weighted by the range of the opponent.
+
+    The winner gets the pot of the loser, and the result is an array of shape
+    (2, num_hands) for the counterfactual values of the players.
+    """
+
+    win, _ = equity_matrix(board, num_samples, rng)
+    values_0 = (win * pot[1] - win.T * pot[0]) @ ranges[1]
+    values_1 = (win * pot[0] - win.T * pot[1]) @ ranges[0]
+
+    return np.stack([values_0, values_1])
@@ -0,0 +1,241 @@
+import env.compiled_game as compiled_game
+
+import numpy as np
+import itertools
+import os
+
+# Card type
+HIGH_CARD = 0
+ONE_PAIR = 1
+TWO_PAIRS = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+
+# The cards are 0~51, the suit is card // 13 and the figure is card % 13 + 1
+#   with A = 1, so the rank with 2 = 0 and A = 12 is (card + 12) % 13
+RANK_KEYS = np.array([5 ** r for r in range(13)], dtype=np.int64)
+CARD_RANKS = np.array([(c + 12) % 13 for c in range(52)], dtype=np.int64)
+CARD_SUITS = np.array([c // 13 for c in range(52)], dtype=np.int64)
+
+
+def strength(card_type, ranks):
+    """Encode a card type and at most 5 ranks of kickers as an integer."""
+
+    value = card_type
+    for i in range(5):
+        value = value * 16 + (ranks[i] + 1 if i < len(ranks) else 0)
+    return value
+
+
+def card_type(value):
+    """Return the card type of an integer strength."""
+
+    return value >> 20
+
+
+def _straight(rank_set):
+    """Return the top rank of the best straight in a set of ranks, or None."""
+
+    for top in range(12, 2, -1):
+        # A can be the lowest card of 5, 4, 3, 2, A
+        if all((r if r >= 0 else 12) in rank_set for r in range(top - 4, top + 1)):
+            return top
+    return None
+
+
+def _rank_strength(counts):
+    """Get the strength of the best 5 cards without flush by rank counts."""
+
+    ranks = sorted((r for r in range(13) for _ in range(counts[r])), reverse=True)
+
+    def kickers(*excluded):
+        return [r for r in ranks if r not in excluded]
+
+    quads = [r for r in range(12, -1, -1) if counts[r] == 4]
+    trips = [r for r in range(12, -1, -1) if counts[r] == 3]
+    pairs = [r for r in range(12, -1, -1) if counts[r] == 2]
+    top = _straight(set(ranks))
+
+    if quads:
+        return strength(FOUR_OF_A_KIND, [quads[0], *kickers(quads[0])[:1]])
+    if trips and (len(trips) > 1 or pairs):
+        pair = max(trips[1:] + pairs)
+        return strength(FULL_HOUSE, [trips[0], pair])
+    if top is not None:
+        return strength(STRAIGHT, [top])
+    if trips:
+        return strength(THREE_OF_A_KIND, [trips[0], *kickers(trips[0])[:2]])
+    if len(pairs) >= 2:
+        return strength(TWO_PAIRS, [pairs[0], pairs[1],
+                                    *kickers(pairs[0], pairs[1])[:1]])
+    if pairs:
+        return strength(ONE_PAIR, [pairs[0], *kickers(pairs[0])[:3]])
+    return strength(HIGH_CARD, ranks[:5])
+
+
+def _flush_strength(mask):
+    """Get the strength of the best 5 cards of a suit by the mask of ranks."""
+
+    ranks = [r for r in range(12, -1, -1) if mask >> r & 1]
+    top = _straight(set(ranks))
+    if top is not None:
+        return strength(STRAIGHT_FLUSH, [top])
+    return strength(FLUSH, ranks[:5])
+
+
+class HandEvaluator(object):
+    """Lookup-table evaluator of 5 to 7 cards of Texas Hold'em.
+
+    The strength of the best 5 cards is an integer, which is larger for the
+    better hands and equal for the draws, so that the showdown is a single
+    comparison. Without a flush, the strength only depends on the counts of the
+    ranks, which are keyed by the sum of 5^rank and looked up in a sorted table.
+    With a flush, which rules out four of a kind and full house, the strength
+    is looked up by the 13-bit mask of the ranks of the suit.
+    """
+
+    def __init__(self):
+        """Build the lookup tables."""
+
+        rank_keys = []
+        rank_strengths = []
+        for num_cards in range(5, 8):
+            for ranks in itertools.combinations_with_replacement(range(13), num_cards):
+                counts = [ranks.count(r) for r in range(13)]
+                if max(counts) > 4:
+                    continue
+                rank_keys.append(sum(5 ** r for r in ranks))
+                rank_strengths.append(_rank_strength(counts))
+        order = np.argsort(rank_keys)
+        self.rank_keys = np.array(rank_keys, dtype=np.int64)[order]
+        self.rank_strengths = np.array(rank_strengths, dtype=np.int64)[order]
+
+        self.flush_strengths = np.array(
+            [_flush_strength(mask) if bin(mask).count('1') >= 5 else -1
+             for mask in range(1 << 13)], dtype=np.int64)
+
+    def save(self, file):
+        """Save the lookup tables as an .npz file."""
+
+        np.savez(file, rank_keys=self.rank_keys,
+                 rank_strengths=self.rank_strengths,
+                 flush_strengths=self.flush_strengths)
+
+    @classmethod
+    def load(cls, file):
+        """Load the lookup tables saved by 'save' without building them."""
+
+        result = cls.__new__(cls)
+        with np.load(file) as tables:
+            result.rank_keys = tables['rank_keys']
+            result.rank_strengths = tables['rank_strengths']
+            result.flush_strengths = tables['flush_strengths']
+
+        return result
+
+    @classmethod
+    def from_cache(cls, cache_dir=None):
+        """Load the evaluator from the on-disk cache, or build and save it if
+        there is none for the current code."""
+
+        cache_dir = compiled_game.CACHE_DIR if cache_dir is None else cache_dir
+        version = compiled_game.code_version(__file__)
+        file = os.path.join(cache_dir, 'hand_evaluator-%s.npz' % version)
+        if os.path.isfile(file):
+            return cls.load(file)
+
+        evaluator = cls()
+        # Save to a temporary file first, the same as the compiled games
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_file = '%s.tmp%d.npz' % (file[:-len('.npz')], os.getpid())
+        evaluator.save(temp_file)
+        os.replace(temp_file, file)
+        compiled_game.prune_cache('hand_evaluator', version, cache_dir)
+
+        return evaluator
+
+    def _build_lookups(self):
+        """Build the Python dict and lists of the tables for the scalar
+        evaluations, which are faster than indexing the arrays one by one."""
+
+        self._rank_dict = dict(zip(self.rank_keys.tolist(),
+                                   self.rank_strengths.tolist()))
+        self._flush_list = self.flush_strengths.tolist()
+        # Map the 13 bits of a suit in a card mask, A first, to the ranks and
+        #   the keys of the rank counts
+        self._suit_ranks = [((m >> 1) | (m & 1) << 12) for m in range(1 << 13)]
+        self._suit_keys = [sum(5 ** r for r in range(13) if m >> r & 1)
+                           for m in self._suit_ranks]
+
+    def evaluate(self, cards):
+        """Return the strength of the best 5 cards of a list of cards."""
+
+        if not hasattr(self, '_rank_dict'):
+            self._build_lookups()
+
+        masks = [0, 0, 0, 0]
+        key = 0
+        for c in cards:
+            rank = (c + 12) % 13
+            masks[c // 13] |= 1 << rank
+            key += 5 ** rank
+        for mask in masks:
+            if self._flush_list[mask] >= 0:
+                return self._flush_list[mask]
+        return self._rank_dict[key]
+
+    def evaluate_mask(self, mask):
+        """Return the strength of the best 5 cards of a 64-bit mask of cards."""
+
+        if not hasattr(self, '_rank_dict'):
+            self._build_lookups()
+
+        key = 0
+        for suit in range(4):
+            bits = mask >> (13 * suit) & 0x1fff
+            value = self._flush_list[self._suit_ranks[bits]]
+            if value >= 0:
+                return value
+            key += self._suit_keys[bits]
+        return self._rank_dict[key]
+
+    def evaluate_batch(self, cards):
+        """Return the strengths of an integer array of cards, one hand a row.
+
+        The rows with duplicate cards get arbitrary strengths instead of errors,
+        so that the hands blocked by the board can be evaluated and masked out.
+        """
+
+        cards = np.asarray(cards)
+        ranks = CARD_RANKS[cards]
+        suits = CARD_SUITS[cards]
+
+        # Without flush
+        keys = RANK_KEYS[ranks].sum(axis=-1)
+        index = np.searchsorted(self.rank_keys, keys)
+        strengths = self.rank_strengths[np.minimum(index, len(self.rank_keys) - 1)]
+
+        # With flush, at most one suit can have 5 cards out of 7
+        for suit in range(4):
+            masks = np.bitwise_or.reduce(
+                np.where(suits == suit, 1 << ranks, 0), axis=-1)
+            flush_strengths = self.flush_strengths[masks]
+            strengths = np.where(flush_strengths >= 0, flush_strengths, strengths)
+
+        return strengths
+
+
+def get_evaluator():
+    """Get the shared hand evaluator, which is loaded once per process."""
+
+    global _evaluator
+    if _evaluator is None:
+        _evaluator = HandEvaluator.from_cache()
+    return _evaluator
+
+
+_evaluator = None
@@ -0,0 +1,116 @@
+import env.compiled_game as compiled_game
+from env.texas_holdem.equity import conflict_matrix, equity_matrix
+from env.texas_holdem.texas_holdem_char import *
+import env.texas_holdem.equity as equity
+import env.texas_holdem.hand_evaluator as hand_evaluator
+import env.texas_holdem.texas_holdem_char as texas_holdem_char
+
+import numpy as np
+import os
+import shutil
+
+NUM_BOARDS = 2000  # Monte Carlo boards of the preflop equities
+NUM_PREFLOP_BUCKETS = 8
+
+
+class PreflopTable(object):
+    """Preflop equity table of the 169 hand classes of Texas Hold'em.
+
+    equity[i, j] is the equity, the probability of winning plus half of the
+    probability of a draw, of a hand of class i against a hand of class j,
+    averaged over the pairs of hands not sharing a card and over the boards.
+    strength[i] is the equity of class i against a random hand, and bucket[i]
+    is the bucket of class i in NUM_PREFLOP_BUCKETS buckets of about the same
+    number of hands sorted by the strengths. The arrays are saved as .npy
+    files under results/, which are memory-mapped on load.
+    """
+
+    ARRAYS = ['equity', 'strength', 'bucket']
+
+    def __init__(self, num_boards=NUM_BOARDS, rng=None):
+        """Compute the equities with Monte Carlo boards, which takes about
+        ten seconds."""
+
+        rng = np.random.RandomState(0) if rng is None else rng
+        win, tie = equity_matrix([], num_boards, rng)
+        valid = ~conflict_matrix()
+
+        # Average the equities of the hand combinations of the classes
+        one_hot = np.zeros((NUM_HAND_COMBOS, NUM_PREFLOP_CLASSES))
+        one_hot[np.arange(NUM_HAND_COMBOS), HAND_COMBO_CLASSES] = 1
+        total = one_hot.T @ valid @ one_hot
+        self.equity = one_hot.T @ (win + tie / 2) @ one_hot / total
+
+        # The strength against a random hand, weighted by the number of hands
+        #   of the classes, that are 6 for pairs, 4 for suited and 12 for offsuit
+        combos = one_hot.sum(axis=0)
+        self.strength = (self.equity * total) @ np.ones(NUM_PREFLOP_CLASSES) / \
+            (total @ np.ones(NUM_PREFLOP_CLASSES))
+        order = np.argsort(self.strength)
+        quantile = (np.cumsum(combos[order]) - combos[order] / 2) / combos.sum()
+        self.bucket = np.empty(NUM_PREFLOP_CLASSES, dtype=np.int64)
+        self.bucket[order] = (quantile * NUM_PREFLOP_BUCKETS).astype(np.int64)
+
+    def save(self, directory):
+        """Save the arrays as .npy files, which can be memory-mapped on load."""
+
+        os.makedirs(directory, exist_ok=True)
+        for name in PreflopTable.ARRAYS:
+            np.save(os.path.join(directory, name + '.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load a preflop table saved by 'save' without computing it."""
+
+        result = cls.__new__(cls)
+        for name in PreflopTable.ARRAYS:
+            setattr(result, name, np.load(os.path.join(directory, name + '.npy'),
+                                          mmap_mode=mmap_mode))
+
+        return result
+
+    @classmethod
+    def from_cache(cls, cache_dir=None):
+        """Load the preflop table from the on-disk cache, or compute and save
+        it if there is none for the current code."""
+
+        cache_dir = compiled_game.CACHE_DIR if cache_dir is None else cache_dir
+        # The table is computed by the equities of the hand combinations
+        version = compiled_game.code_version(
+            __file__, equity.__file__, hand_evaluator.__file__,
+            texas_holdem_char.__file__)
+        directory = os.path.join(cache_dir, 'preflop-%s' % version)
+        if os.path.isdir(directory):
+            return cls.load(directory)
+
+        table = cls()
+        # Save to a temporary directory first, the same as the compiled games
+        temp_directory = '%s.tmp%d' % (directory, os.getpid())
+        table.save(temp_directory)
+        try:
+            os.rename(temp_directory, directory)
+        except OSError:  # saved by another run
+            shutil.rmtree(temp_directory, ignore_errors=True)
+        compiled_game.prune_cache('preflop', version, cache_dir)
+
+        return cls.load(directory)
+
+
+def get_preflop_table():
+    """Get the shared preflop table, which is loaded once per process."""
+
+    global _preflop_table
+    if _preflop_table is None:
+        _preflop_table = PreflopTable.from_cache()
+    return _preflop_table
+
+
+_preflop_table = None
+
+
+if __name__ == '__main__':
+    # Generate the preflop table once, such like 'python -m env.texas_holdem.preflop'
+    table = get_preflop_table()
+    for hand_class in np.argsort(table.strength)[::-1]:
+        print('%s\t%.4f\t%d' % (preflop_class_string(hand_class),
+                                table.strength[hand_class], table.bucket[hand_class]))
@@ -1,10 +1,13 @@
 import env.environment as e
 from env.texas_holdem.texas_holdem_char import *
-from env.public_belief_state import PublicBeliefState
+from env.texas_holdem.equity import fold_values, showdown_values
+from env.texas_holdem.preflop import get_preflop_table
+from env.texas_holdem.abstraction import CardAbstraction, NUM_BUCKETS
+from env.public_belief_state import RangePublicBeliefState
+from env.history import History
 from util.step_record import StepRecord
 
 import numpy as np
-import copy
 import torch
 
 # Phase
@@ -33,6 +36,9 @@ class TexasHoldem(e.Environment):
 
         self.name = 'Texas Holdem'
         self.num_players = 2
+        # The bound of the legal actions, for the tables of the abstract info
+        #   states which are not listed
+        self.max_num_actions = len(INT2STRING_ACTION)
 
     def initial_state(self):
         """Get a new initial world state."""
@@ -57,74 +63,126 @@ class TexasHoldem(e.Environment):
 
         return self._initial_obs
 
+    def public_history(self):
+        """Get the public history after the preflop deal, in which the hands
+        are not dealt, as the root of the range public belief states. It is a
+        child of the initial history by an empty deal, so that its public
+        states are the same as those of the histories with the hands."""
+
+        if not hasattr(self, '_public_history'):
+            state = WorldState(
+                hand=[[], []], pot=[2, 1], pub=[], phase=PREFLOP,
+                status=[NONRESPONSE, NONRESPONSE], player=1
+            )
+            private_obs_0, private_obs_1, pub = state.card_observations()
+            obs = (private_obs_0, private_obs_1,
+                   PublicObservation(pot=state.pot, pub=pub))
+            initial_history = self.initial_history()
+            self._public_history = History(
+                env=self, parent=initial_history, record=StepRecord(
+                    initial_history[-1].next_state, Action(deal=[]), state, obs))
+
+        return self._public_history
+
     def initial_pbs(self):
-        """Get new initial public belief state."""
+        """Get new initial public belief state.
+
+        The joint distribution of the hands can not be enumerated, so it is a
+        range public belief state with uniform ranges of the 1326 hands.
+        """
 
         if not hasattr(self, '_initial_pbs'):
-            initial_history = self.initial_history()
-            public_state = initial_history.child(
-                initial_history.legal_actions()[0]).get_public_state()
-            prob_dict = {initial_history.child(a).to_string(): p for
-                         a, p in zip(*initial_history.chance_outcomes())}
-            self._initial_pbs = PublicBeliefState(public_state, prob_dict)
+            ranges = np.full((2, NUM_HAND_COMBOS), 1 / NUM_HAND_COMBOS)
+            self._initial_pbs = RangePublicBeliefState(
+                self.public_history(), ranges)
 
         return self._initial_pbs
 
+    def blocked_hands(self, history):
+        """Return a bool array of the hands blocked by the public cards."""
+
+        return blocked_combos(history[-1].next_state.pub_mask)
+
+    def hand_index(self, history, player):
+        """Get the index of the hand combination of a player in a history.
+
+        The public states are keyed on the canonical public cards, so the hand
+        is relabeled by the same suit permutation as the public cards.
+        """
+
+        state = history[-1].next_state
+        perm = board_suit_permutation(state.pub)
+        c0, c1 = (perm[c // 13] * 13 + c % 13 for c in state.hand[player])
+        return int(COMBO_INDEX[c0, c1])
+
     def step(self, state, action):
         """Get the step result given a world state and an action."""
 
         assert not state.is_terminal()
 
-        # Get next world state
-        next_state = copy.deepcopy(state)
+        # Get the fields of next world state, the world states are immutable
+        #   so that the unchanged fields are shared without copy
+        hand, pot, pub = state.hand, list(state.pot), state.pub
+        phase, status = state.phase, list(state.status)
+        hand_mask, pub_mask = state.hand_mask, state.pub_mask
+        card_obs = None  # the observations of the cards are only new on deals
         # Is chance
         if state.is_chance():
             if state.phase == PREFLOP:  # preflop
-                next_state.hand[0] = action.deal[:2]
-                next_state.hand[1] = action.deal[2:]
-                next_state.player = 1  # player 2's turn
+                hand = (action.deal[:2], action.deal[2:])
+                hand_mask = (card_mask(hand[0]), card_mask(hand[1]))
+                player = 1  # player 2's turn
             elif state.phase == FLOP:  # flop
-                next_state.pub += action.deal
-                next_state.player = 0  # player 1's turn
+                pub = pub + action.deal
+                pub_mask = pub_mask | action.mask
+                player = 0  # player 1's turn
             elif state.phase == TURN:  # turn
-                next_state.pub += action.deal
-                next_state.player = 0  # player 1's turn
+                pub = pub + action.deal
+                pub_mask = pub_mask | action.mask
+                player = 0  # player 1's turn
             else:  # river
-                next_state.pub += action.deal
-                next_state.player = 0  # player 1's turn
+                pub = pub + action.deal
+                pub_mask = pub_mask | action.mask
+                player = 0  # player 1's turn
         # Is player
         else:
+            card_obs = state.card_observations()
             current_player = state.player  # current player
             # Choose fold
             if action.action == FOLD:
-                next_state.status[current_player] = FOLDED
-                next_state.player = TERMINAL  # game over
+                status[current_player] = FOLDED
+                player = TERMINAL  # game over
             # Choose call
             elif action.action == CALL:
-                next_state.pot[current_player] = state.pot[1-current_player]
+                pot[current_player] = state.pot[1-current_player]
                 if state.status[1 - current_player] != NONRESPONSE:  # phase finish
-                    next_state.status = [NONRESPONSE, NONRESPONSE]
+                    status = [NONRESPONSE, NONRESPONSE]
                     if state.phase == RIVER:  # last phase
-                        next_state.player = TERMINAL  # game over
+                        player = TERMINAL  # game over
                     else:  # turn to next phase
-                        next_state.phase += 1
-                        next_state.player = CHANCE
+                        phase += 1
+                        player = CHANCE
                 else:  # phase will not finish
-                    next_state.status[current_player] = CALLED
-                    next_state.player = 1 - current_player  # opponent's turn
+                    status[current_player] = CALLED
+                    player = 1 - current_player  # opponent's turn
             # Choose raise
             else:
-                next_state.pot[current_player] = \
+                pot[current_player] = \
                     state.pot[1-current_player] + action.bet
                 if state.status[current_player] == NONRESPONSE:
-                    next_state.status[current_player] = CALLED
-                next_state.status[current_player] += 1  # raise times + 1
-                next_state.player = 1 - current_player
+                    status[current_player] = CALLED
+                status[current_player] += 1  # raise times + 1
+                player = 1 - current_player
+        next_state = WorldState(hand=hand, pot=pot, pub=pub, phase=phase,
+                                status=status, player=player,
+                                hand_mask=hand_mask, pub_mask=pub_mask,
+                                card_obs=card_obs)
 
-        # Get observation
-        obs = (PrivateObservation(hand=next_state.hand[0], player=0),
-               PrivateObservation(hand=next_state.hand[1], player=1),
-               PublicObservation(pot=next_state.pot, pub=next_state.pub))
+        # Get observation, the cards are canonicalized for every observer, so
+        #   that the suit-isomorphic histories share the info states
+        private_obs_0, private_obs_1, pub = next_state.card_observations()
+        obs = (private_obs_0, private_obs_1,
+               PublicObservation(pot=next_state.pot, pub=pub))
 
         # Get reward
         if not next_state.is_terminal():
@@ -139,10 +197,61 @@ class TexasHoldem(e.Environment):
 
         return StepRecord(state, action, next_state, obs, reward)
 
+    def preflop_equity(self, hand_0, hand_1):
+        """Get the preflop equity of a hand against another by the table."""
+
+        return float(get_preflop_table().equity[
+            preflop_class(hand_0), preflop_class(hand_1)])
+
+    def preflop_range_equity(self, hand, opponent_range):
+        """Get the preflop equity of a hand against a range of the opponent,
+        a vector of the probs of the hand combinations, by the table."""
+
+        opponent_range = np.where(blocked_combos(card_mask(hand)), 0, opponent_range)
+        equity = get_preflop_table().equity[preflop_class(hand)][HAND_COMBO_CLASSES]
+        return float(equity @ opponent_range / opponent_range.sum())
+
+    def preflop_bucket(self, hand):
+        """Get the preflop bucket of a hand by the table."""
+
+        return int(get_preflop_table().bucket[preflop_class(hand)])
+
+    def card_abstraction(self, num_buckets=NUM_BUCKETS):
+        """Get the card abstraction with the numbers of buckets of the streets,
+        which is clustered offline and cached under results/."""
+
+        if not hasattr(self, '_card_abstractions'):
+            self._card_abstractions = {}
+        num_buckets = tuple(num_buckets)
+        if num_buckets not in self._card_abstractions:
+            self._card_abstractions[num_buckets] = CardAbstraction.from_cache(num_buckets)
+
+        return self._card_abstractions[num_buckets]
+
+    def terminal_values(self, pbs, num_samples=1000, rng=None):
+        """Get the payoffs of all the hands of both players at a terminal range
+        public belief state, weighted by the range of the opponent. The
+        showdown equities are exact if there are at most num_samples runouts."""
+
+        state = pbs.history[-1].next_state
+        assert state.is_terminal()
+
+        if FOLDED in state.status:
+            return fold_values(pbs.ranges, state.pot, state.status.index(FOLDED))
+        return showdown_values(pbs.ranges, state.pub, state.pot, num_samples, rng)
+
     def get_tensor(self, pbs):
         """Get the tensor of a public belief state."""
 
         state = pbs.history_list[0][-1].next_state
+        if isinstance(pbs, RangePublicBeliefState):
+            # Get tensor such like [bet1, bet2, pub_hand (5 cards, -1 for not
+            #   dealt), round, status, turn, *range1, *range2]
+            pbs_list = [*state.pot, *state.pub, *[-1] * (5 - len(state.pub)),
+                        state.phase, *state.status, state.player]
+            return torch.cat([torch.tensor(pbs_list, dtype=torch.float64),
+                              torch.from_numpy(pbs.ranges.ravel())])
+
         # Get tensor such like [round, bet1, bet2, pub_hand, turn, *prob_dict]
         pbs_list = [*state.pot, *state.pub,
                     state.phase, *state.status, state.player,
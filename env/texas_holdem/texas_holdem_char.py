@@ -1,5 +1,8 @@
 import env.environment as e
+from env.texas_holdem.hand_evaluator import get_evaluator
 import numpy as np
+import itertools
+import math
 
 # Phase
 PREFLOP = 0
@@ -8,6 +11,7 @@ TURN = 2
 RIVER = 3
 INT2STRING_PHASE = {PREFLOP: 'preflop', FLOP: 'flop',
                     TURN: 'turn', RIVER: 'river'}
+NUM_DEAL_CARDS = {PREFLOP: 4, FLOP: 3, TURN: 1, RIVER: 1}  # dealt by chance
 
 # Player
 CHANCE = -1
@@ -36,30 +40,178 @@ CALL = 1
 RAISE = 2
 INT2STRING_ACTION = {FOLD: 'fold', CALL: 'call', RAISE: 'raise'}
 
-# Card type
-HIGH_CARD = 0
-ONE_PAIR = 1
-TWO_PAIRS = 2
-THREE_OF_A_KIND = 3
-STRAIGHT = 4
-FLUSH = 5
-FULL_HOUSE = 6
-FOUR_OF_A_KIND = 7
-STRAIGHT_FLUSH = 8
 
+def card_mask(cards):
+    """Return the 64-bit mask of a list of cards, the bit c for the card c."""
 
-class WorldState(e.WorldState):
-    """World state object of env: Texas Hold'em."""
+    mask = 0
+    for c in cards:
+        mask |= 1 << c
+    return mask
 
-    def __init__(self, hand, pot, pub, phase, status, player):
-        """Init the world state instance."""
 
-        self.hand = hand
-        self.pot = pot
-        self.pub = pub
+def mask_cards(mask):
+    """Return a sorted list of the cards in a 64-bit mask."""
+
+    return [c for c in range(52) if mask >> c & 1]
+
+
+SUIT_MASK = (1 << 13) - 1  # mask of the cards of suit 0
+ALL_CARDS_MASK = (1 << 52) - 1
+
+# Hand combinations of 2 cards for the ranges, 1326 in total
+HAND_COMBOS = np.array(list(itertools.combinations(range(52), 2)), dtype=np.int64)
+NUM_HAND_COMBOS = len(HAND_COMBOS)
+HAND_COMBO_MASKS = (np.uint64(1) << HAND_COMBOS[:, 0].astype(np.uint64)) | \
+    (np.uint64(1) << HAND_COMBOS[:, 1].astype(np.uint64))
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.int64)  # of two cards in any order
+COMBO_INDEX[HAND_COMBOS[:, 0], HAND_COMBOS[:, 1]] = np.arange(NUM_HAND_COMBOS)
+COMBO_INDEX[HAND_COMBOS[:, 1], HAND_COMBOS[:, 0]] = np.arange(NUM_HAND_COMBOS)
+
+# Preflop hand classes in a 13 x 13 grid of the ranks with 2 = 0 and A = 12,
+#   that is 'hi * 13 + lo' for suited hands, 'lo * 13 + hi' for offsuit hands
+#   and pairs on the diagonal, 169 in total
+NUM_PREFLOP_CLASSES = 169
+INT2STRING_RANK = '23456789TJQKA'
+
+
+def preflop_class(hand):
+    """Return the preflop hand class of a hand of 2 cards."""
+
+    (rank_0, suit_0), (rank_1, suit_1) = [((c + 12) % 13, c // 13) for c in hand]
+    hi, lo = max(rank_0, rank_1), min(rank_0, rank_1)
+    return hi * 13 + lo if suit_0 == suit_1 else lo * 13 + hi
+
+
+def preflop_class_string(hand_class):
+    """Return a string such like 'AKs', 'AKo' or 'AA' of a preflop class."""
+
+    row, column = divmod(hand_class, 13)
+    if row == column:
+        return INT2STRING_RANK[row] * 2
+    return INT2STRING_RANK[max(row, column)] + INT2STRING_RANK[min(row, column)] + \
+        ('s' if row > column else 'o')
+
+
+HAND_COMBO_CLASSES = np.array([preflop_class(hand) for hand in HAND_COMBOS],
+                              dtype=np.int64)
+
+
+def blocked_combos(mask):
+    """Return a bool array of the hand combinations sharing the cards of a
+    64-bit mask."""
+
+    return (HAND_COMBO_MASKS & np.uint64(mask)) != 0
+
+
+def _free_suits(seen):
+    """Return a sorted list of the suits not in the seen cards, which can
+    also be a 64-bit mask."""
+
+    if not isinstance(seen, int):
+        seen = card_mask(seen)
+    return [s for s in range(4) if not seen >> (13 * s) & SUIT_MASK]
+
+
+def _allowed_suits(suits, free_suits, num_new):
+    """Return the suits allowed for the next card of a canonical deal, that
+    are the suits already used and the smallest free suit not used yet."""
+
+    return suits | set(free_suits[num_new:num_new + 1])
+
+
+def canonicalize(cards, seen=()):
+    """Map a list of cards to the representative of its suit-isomorphic class.
+
+    The suits of the seen cards, which can also be a 64-bit mask, are kept, and
+    the other suits are relabeled as the smallest suits not seen in the order they first
+    appear in the cards.
+    The hand strengths only depend on whether the suits are equal, so the cards
+    of a class are equivalent. Return the representative and the size of the
+    class, that is the number of lists of cards mapped to it.
+    """
+
+    free_suits = _free_suits(seen)
+    suit_map = _suit_map(cards, free_suits)
+    representative = [suit_map.get(c // 13, c // 13) * 13 + c % 13 for c in cards]
+
+    return representative, math.perm(len(free_suits), len(suit_map))
+
+
+def _suit_map(cards, free_suits):
+    """Map the free suits of the cards to the smallest free suits in the
+    order they first appear, see canonicalize."""
+
+    suit_map = {}
+    for c in cards:
+        if c // 13 in free_suits and c // 13 not in suit_map:
+            suit_map[c // 13] = free_suits[len(suit_map)]
+    return suit_map
+
+
+def board_suit_permutation(pub):
+    """Return the permutation of the suits applied by canonicalize(pub) to
+    the public cards, as a list from the suit to the canonical suit. The
+    suits not in the public cards are mapped to the remaining suits in order,
+    so the permutation is the identity before the flop."""
+
+    suit_map = _suit_map(pub, list(range(4)))
+    rest = iter(s for s in range(4) if s not in suit_map.values())
+    return [suit_map[s] if s in suit_map else next(rest) for s in range(4)]
+
+
+class WorldState(e.WorldState):
+    """World state object of env: Texas Hold'em.
+
+    The hands and the public cards are kept as tuples in the order dealt, and
+    as 64-bit masks of cards, so that the dealt cards can be checked by bit
+    operations. The state is encoded by the masks and the small integer
+    fields, the order of the cards does not matter.
+    """
+
+    __slots__ = ('hand', 'pot', 'pub', 'phase', 'status', 'player',
+                 'hand_mask', 'pub_mask', '_card_obs')
+
+    def __init__(self, hand, pot, pub, phase, status, player,
+                 hand_mask=None, pub_mask=None, card_obs=None):
+        """Init the world state instance, the masks are computed from the
+        cards if not given, and card_obs can be shared by the world states
+        with the same cards, see card_observations."""
+
+        self.hand = (tuple(hand[0]), tuple(hand[1]))
+        self.pot = tuple(pot)
+        self.pub = tuple(pub)
         self.phase = phase
-        self.status = status
+        self.status = tuple(status)
         self.player = player
+        self.hand_mask = hand_mask if hand_mask is not None else \
+            (card_mask(hand[0]), card_mask(hand[1]))
+        self.pub_mask = pub_mask if pub_mask is not None else card_mask(pub)
+        if card_obs is not None:
+            self._card_obs = card_obs
+
+    @property
+    def encode(self):
+        return (self.hand_mask[0], self.hand_mask[1], self.pub_mask,
+                self.pot[0], self.pot[1], self.phase,
+                self.status[0], self.status[1], self.player)
+
+    def card_observations(self):
+        """Return the canonical private observations of the players and the
+        canonical public cards, which only change when the cards are dealt."""
+
+        if not hasattr(self, '_card_obs'):
+            self._card_obs = (PrivateObservation.of(self.hand[0], self.pub, 0),
+                              PrivateObservation.of(self.hand[1], self.pub, 1),
+                              tuple(canonicalize(self.pub)[0]))
+
+        return self._card_obs
+
+    @property
+    def dealt_mask(self):
+        """The 64-bit mask of the dealt cards."""
+
+        return self.hand_mask[0] | self.hand_mask[1] | self.pub_mask
 
     def legal_actions(self):
         """Return a list of actions that are legal on this state."""
@@ -67,57 +219,105 @@ class WorldState(e.WorldState):
         if self.player == TERMINAL:  # is terminal
             return []
         elif self.player == CHANCE:  # is chance
-            if self.phase == PREFLOP:  # preflop
-                return [Action(deal=[i, j, k, l])
-                        for i in range(52) for j in range(52)
-                        for k in range(52) for l in range(52)
-                        if len(set([i, j, k, l])) == 4]
-            elif self.phase == FLOP:  # flop
-                return [Action(deal=[i, j, k])
-                        for i in range(52) for j in range(52)
-                        for k in range(52) if len(set([i, j, k])) == 3]
-            elif self.phase == TURN:  # turn
-                return [Action(deal=[i]) for i in set(range(52)) - set(self.pub)]
-            else:  # river
-                return [Action(deal=[i]) for i in set(range(52)) - set(self.pub)]
+            return [action for action, _ in self.iter_chance_outcomes()]
         else:
             if self.status[self.player] == RAISED2TIMES:  # can't raise
-                return [Action(action=FOLD, player=self.player),
-                        Action(action=CALL, player=self.player)]
+                return PLAYER_ACTIONS[self.player][:2]
             else:  # can raise
                 if self.phase == PREFLOP or self.phase == FLOP:  # preflop or flop
-                    return [Action(action=FOLD, player=self.player),
-                            Action(action=CALL, player=self.player),
-                            Action(action=RAISE, bet=1, player=self.player)]
+                    return PLAYER_ACTIONS[self.player]
                 else:  # turn or river
-                    return [Action(action=FOLD, player=self.player),
-                            Action(action=CALL, player=self.player),
-                            Action(action=RAISE, bet=2, player=self.player)]
+                    return PLAYER_ACTIONS_LATE[self.player]
 
     def chance_outcomes(self):
         """Return a list of actions and the corresponding probs."""
 
         assert self.is_chance()
 
-        action_list = self.legal_actions()
-        dealed_card = [*self.hand[0], *self.hand[1], *self.pub]  # dealed cards
-
-        if self.phase == PREFLOP:  # preflop
-            prob_list = [1 for _ in action_list]
-        elif self.phase == FLOP:  # flop
-            prob_list = [1 if all([d not in dealed_card for d in a.deal])
-                         else 0 for a in action_list]
-        elif self.phase == TURN:  # turn
-            prob_list = [1 if all([d not in dealed_card for d in a.deal])
-                         else 0 for a in action_list]
-        else:  # river
-            prob_list = [1 if all([d not in dealed_card for d in a.deal])
-                         else 0 for a in action_list]
-        prob_list = np.array(prob_list)
-        prob_list = prob_list / np.sum(prob_list)
+        outcomes = list(self.iter_chance_outcomes())
+        action_list = [action for action, _ in outcomes]
+        prob_list = np.array([prob for _, prob in outcomes])
 
         return action_list, prob_list
 
+    def remaining_cards(self):
+        """Return a sorted list of the cards which are not dealt."""
+
+        return mask_cards(ALL_CARDS_MASK & ~self.dealt_mask)
+
+    def num_chance_outcomes(self):
+        """Return the number of the canonical deals, without enumerating them."""
+
+        assert self.is_chance()
+
+        # Only the number of the remaining cards of each suit matters
+        counts = [0, 0, 0, 0]
+        for c in self.remaining_cards():
+            counts[c // 13] += 1
+        free_suits = _free_suits(self.dealt_mask)
+
+        def count(num_cards, suits, num_new):
+            if num_cards == 0:
+                return 1
+            num_deals = 0
+            for s in _allowed_suits(suits, free_suits, num_new):
+                num_cards_of_suit = counts[s]
+                if num_cards_of_suit > 0:
+                    counts[s] -= 1
+                    num_deals += num_cards_of_suit * count(
+                        num_cards - 1, suits | {s}, num_new + (s not in suits))
+                    counts[s] += 1
+            return num_deals
+
+        return count(NUM_DEAL_CARDS[self.phase], set(range(4)) - set(free_suits), 0)
+
+    def iter_chance_outcomes(self):
+        """Generate the canonical deals of the remaining cards and the
+        corresponding probs lazily.
+
+        Only the deals whose new suits are the smallest unseen suits in the
+        order they appear are generated, and each one stands for all the deals
+        isomorphic to it under the permutations of the unseen suits, so its
+        prob is scaled by the size of its class.
+        """
+
+        assert self.is_chance()
+
+        remaining_cards = self.remaining_cards()
+        free_suits = _free_suits(self.dealt_mask)
+        num_deals = math.perm(len(remaining_cards), NUM_DEAL_CARDS[self.phase])
+
+        def deals(deal, suits, num_new):
+            if len(deal) == NUM_DEAL_CARDS[self.phase]:
+                yield _deal_action(deal), \
+                    math.perm(len(free_suits), num_new) / num_deals
+                return
+            allowed_suits = _allowed_suits(suits, free_suits, num_new)
+            for c in remaining_cards:
+                if c // 13 in allowed_suits and c not in deal:
+                    yield from deals(deal + [c], suits | {c // 13},
+                                     num_new + (c // 13 not in suits))
+
+        yield from deals([], set(range(4)) - set(free_suits), 0)
+
+    def sample_chance_outcome(self, rng=None):
+        """Sample a canonical deal from the remaining cards without enumerating
+        all the deals, rng is np.random by default."""
+
+        assert self.is_chance()
+
+        rng = np.random if rng is None else rng
+        # Draw the cards until they are not dealt, which is rarely redrawn
+        dealt_mask = self.dealt_mask
+        deal = []
+        while len(deal) < NUM_DEAL_CARDS[self.phase]:
+            c = int(rng.randint(52))
+            if not dealt_mask >> c & 1:
+                deal.append(c)
+                dealt_mask |= 1 << c
+        deal, _ = canonicalize(deal, self.dealt_mask)
+        return _deal_action(deal)
+
     @property
     def winner(self):
         """Return the winner for a terminal world state."""
@@ -130,23 +330,16 @@ class WorldState(e.WorldState):
         if self.status[1] == FOLDED:
             return 0
 
-        # Campare the hands
-        card_type_0 = CardType([*self.hand[0], *self.pub])
-        card_type_1 = CardType([*self.hand[1], *self.pub])
-
-        def campare(a, b, *keys):
-            if keys[0](a) > keys[0](b):
-                return 0
-            elif keys[0](a) < keys[0](b):
-                return 1
-            else:
-                if len(keys) == 1:
-                    return -1
-                else:
-                    return campare(a, b, *keys[1:])
-
-        return campare(card_type_0, card_type_1, lambda x: x.type,
-                       *[lambda x: x.key[i] for i in range(len(card_type_0.key))])
+        # Compare the strengths of the best 5 cards
+        evaluator = get_evaluator()
+        strength_0 = evaluator.evaluate_mask(self.hand_mask[0] | self.pub_mask)
+        strength_1 = evaluator.evaluate_mask(self.hand_mask[1] | self.pub_mask)
+        if strength_0 > strength_1:
+            return 0
+        elif strength_0 < strength_1:
+            return 1
+        else:
+            return -1
 
     def to_string(self):
         """Return a string representing this world state."""
@@ -161,104 +354,23 @@ class WorldState(e.WorldState):
              ', '.join(INT2STRING_STATUS[s] for s in self.status))
 
 
-class CardType(object):
-    """Record the card type of a player."""
-
-    def __init__(self, card_list):
-
-        def pattern(x): return x // 13
-        def figure(x): return (x + 12) % 13 + 2  # A = 14
-
-        pattern_list = list(map(pattern, card_list))
-        figure_list = list(map(figure, card_list))
-
-        card_list.sort(reverse=True)
-        pattern_list.sort(reverse=True)
-        figure_list.sort(reverse=True)
-
-        # Straight Flush
-        for x in card_list[3:]:
-            if x+1 in card_list and x+2 in card_list and x+3 in card_list:
-                if x+4 in card_list and pattern(x) == pattern(x+4):  # A~9
-                    self.type = STRAIGHT_FLUSH
-                    self.key = [figure(x+4)]
-                    return
-                # C10, D10, H10, S10
-                elif x-9 in card_list and x in [9, 22, 35, 48]:
-                    self.type = STRAIGHT_FLUSH
-                    self.key = [figure(x-9)]
-                    return
-
-        # Four of a Kind
-        for x in figure_list:
-            if figure_list.count(x) == 4:
-                self.type = FOUR_OF_A_KIND
-                self.key = [x, max([y for y in figure_list if y != x])]
-                return
-
-        # Full House
-        for x in figure_list:
-            if figure_list.count(x) == 3:
-                for y in figure_list:
-                    if y != x and figure_list.count(y) >= 2:
-                        self.type = FULL_HOUSE
-                        self.key = [x, y]
-                        return
-
-        # Flush
-        for x in pattern_list:
-            if pattern_list.count(x) >= 5:
-                self.type = FLUSH
-                same_list = [figure(y) for y in card_list if pattern(y) == x]
-                same_list.sort(reverse=True)
-                self.key = same_list[:5]
-                return
-
-        # Straight
-        for x in figure_list:
-            if x-1 in figure_list and x-2 in figure_list and x-3 in figure_list:
-                if x-4 in figure_list or x+9 in figure_list:  # A: 14
-                    self.type = STRAIGHT
-                    self.key = x
-                    return
-
-        # Three of a kind
-        for x in figure_list:
-            if figure_list.count(x) == 3:
-                self.type = THREE_OF_A_KIND
-                self.key = [x] + [y for y in figure_list if y != x][:2]
-                return
-
-        # Two pairs
-        for x in figure_list:
-            if figure_list.count(x) == 2:
-                for y in figure_list:
-                    if y != x and figure_list.count(y) == 2:
-                        self.type = TWO_PAIRS
-                        self.key = [x, y, max([z for z in figure_list if z != x and z != y])]
-
-        # One pair
-        for x in figure_list:
-            if figure_list.count(x) == 2:
-                self.type = ONE_PAIR
-                self.key = [x] + [y for y in figure_list if y != x][:3]
-
-        # High Card
-        self.type = HIGH_CARD
-        self.key = figure_list[:5]
-        return
-
-
 class Action(e.Action):
     """Action object of env: Texas Hold'em."""
 
+    __slots__ = ('deal', 'action', 'bet', 'player', 'mask')
+
     def __init__(self, deal=None, action=None, bet=0, player=-1):
         """Init the action instance."""
 
-        self.deal = deal  # list
+        self.deal = tuple(deal) if deal is not None else None
         self.action = action  # scalar
         self.bet = bet
         self.player = player
+        self.mask = card_mask(deal) if deal is not None else 0  # dealt cards
+
+    @property
+    def encode(self):
+        return (self.deal, self.action, self.bet)
 
     def to_string(self):
         """Return a string representing this action."""
@@ -269,30 +381,81 @@ class Action(e.Action):
             return INT2STRING_ACTION[self.action]
 
 
+# Interned actions, the player actions and single card deals are shared by all
+#   the world states, while the preflop and flop deals are too many to keep
+PLAYER_ACTIONS = tuple((Action(action=FOLD, player=player),
+                        Action(action=CALL, player=player),
+                        Action(action=RAISE, bet=1, player=player))
+                       for player in range(2))
+PLAYER_ACTIONS_LATE = tuple((Action(action=FOLD, player=player),
+                             Action(action=CALL, player=player),
+                             Action(action=RAISE, bet=2, player=player))
+                            for player in range(2))
+SINGLE_CARD_DEALS = tuple(Action(deal=[i]) for i in range(52))
+
+
+def _deal_action(deal):
+    """Get the action of the chance dealing a list of cards."""
+
+    return SINGLE_CARD_DEALS[deal[0]] if len(deal) == 1 else Action(deal=deal)
+
+
 class PrivateObservation(e.Observation):
-    """Private observation object of env: Texas Hold'em."""
+    """Private observation object of env: Texas Hold'em.
+
+    The hand and the public cards are seen together by the player, so that the
+    suits of them are canonicalized together, see PrivateObservation.of.
+    """
+
+    __slots__ = ('hand', 'player', 'pub')
 
-    def __init__(self, hand, player):
+    def __init__(self, hand, player, pub=()):
         """Init the private observation instance."""
 
         self.hand = hand
         self.player = player
+        self.pub = pub
+
+    @classmethod
+    def of(cls, hand, pub, player):
+        """Get the canonical private observation of a hand and public cards.
+
+        It is not interned, since there are millions of the deals, and it is
+        shared by the states of a deal, see WorldState.card_observations.
+        """
+
+        cards, _ = canonicalize([*hand, *pub])
+        return cls(hand=tuple(cards[:len(hand)]), player=player,
+                   pub=tuple(cards[len(hand):]))
+
+    @property
+    def encode(self):
+        return (tuple(self.hand), tuple(self.pub))
 
     def to_string(self):
         """Return a string representing this private observation."""
 
-        return ', '.join(INT2STRING_CARD[h] for h in self.hand)
+        if not self.pub:
+            return ', '.join(INT2STRING_CARD[h] for h in self.hand)
+        return '%s | %s' % (', '.join(INT2STRING_CARD[h] for h in self.hand),
+                            ', '.join(INT2STRING_CARD[p] for p in self.pub))
 
 
 class PublicObservation(e.Observation):
     """Public observation object of env: Texas Hold'em."""
 
+    __slots__ = ('pot', 'pub')
+
     def __init__(self, pot, pub):
         """Init the public observation instance."""
 
         self.pot = pot
         self.pub = pub
 
+    @property
+    def encode(self):
+        return (tuple(self.pot), tuple(self.pub))
+
     def to_string(self):
         """Return a string representing this public observation."""
 
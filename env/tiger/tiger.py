@@ -27,7 +27,7 @@ class Tiger(e.Environment):
     def initial_obs(self):
         """Get new initial observations."""
 
-        return Observation(-1)  # none
+        return Observation.interned(-1)  # none
 
     def step(self, world_state, action):
         """Get step result by given world state and action."""
@@ -40,7 +40,7 @@ class Tiger(e.Environment):
         # Chance node
         if world_state.is_chance():
             step_record.next_state = WorldState(action.encode)
-            step_record.obs = Observation(-1)  # none
+            step_record.obs = Observation.interned(-1)  # none
             step_record.reward = 0
 
             return step_record
@@ -50,12 +50,12 @@ class Tiger(e.Environment):
         if action.encode == 2:  # listen
             r = np.random.rand()
             if r < self.listen_coefficient:
-                step_record.obs = Observation(world_state.encode)
+                step_record.obs = Observation.interned(world_state.encode)
             else:
-                step_record.obs = Observation(1 - world_state.encode)
+                step_record.obs = Observation.interned(1 - world_state.encode)
         # When open the door, always get the correct obs
         else:
-            step_record.obs = Observation(world_state.encode)
+            step_record.obs = Observation.interned(world_state.encode)
 
         # Get reward
         if action.encode == 2:  # listen
@@ -66,12 +66,44 @@ class Tiger(e.Environment):
 
         # Get next world state
         if action.encode == 2:  # listen
-            step_record.next_state = WorldState(world_state.encode)
+            step_record.next_state = world_state  # immutable, no need to copy
         else:
             step_record.next_state = WorldState(-2)  # terminal
 
         return step_record
     
+    def encode_batch(self, states):
+        """Encode world states as an array of their scalar encodings."""
+
+        return np.array([s.encode for s in states], dtype=np.int64)
+
+    def decode_batch(self, states):
+        """Decode an array of scalar encodings to world states."""
+
+        return [WorldState(s) for s in np.asarray(states).tolist()]
+
+    def step_batch(self, states, actions):
+        """Get the step results of a batch of world states at once.
+
+        The states and the actions are arrays of their scalar encodings, and so
+        are the observations.
+        """
+
+        states = np.asarray(states)
+        actions = np.asarray(actions)
+        is_chance = states == -1
+        listen = ~is_chance & (actions == 2)
+
+        # When listen, get the correct obs with a listen coefficient probability
+        correct = np.random.rand(len(states)) < self.listen_coefficient
+        obs = np.where(is_chance, -1, np.where(listen & ~correct, 1 - states, states))
+
+        rewards = np.where(is_chance, 0, np.where(
+            listen, -1, np.where(actions == states, 20, -100)))
+        next_states = np.where(is_chance, actions, np.where(listen, states, -2))
+
+        return next_states, obs, rewards, next_states == -2
+
     def possible_states(self, obs):
         """Return a list of all possilble states corresponding to initial obs."""
 
@@ -9,6 +9,8 @@ class WorldState(e.WorldState):
     the chance node and -2 when the game is over.
     """
 
+    __slots__ = ('encode', 'player')
+
     __name_dict = {0: 'left', 1: 'right', -1: 'chance', -2: 'terminal'}
 
     def __init__(self, encode):
@@ -21,19 +23,17 @@ class WorldState(e.WorldState):
         """Return a list of actions that are legal on this state."""
 
         if self.player == -2:  # is terminal
-            return []
+            return ()
         elif self.player == -1:  # is chance
-            return [Action(0, -1), Action(1, -1)]
+            return CHANCE_ACTIONS
         else:
-            return [Action(0, 0), Action(1, 0), Action(2, 0)]
+            return PLAYER_ACTIONS
 
     def chance_outcomes(self):
         """Return a list of actions and the corresponding probs."""
 
         assert self.player == -1  # is chance
-        action_list = self.legal_actions()
-        prob_list = [1 / len(action_list) for _ in range(len(action_list))]
-        return action_list, prob_list
+        return CHANCE_ACTIONS, CHANCE_PROBS
 
     def to_string(self):
         """Return a string representing this world state."""
@@ -49,6 +49,8 @@ class Action(e.Action):
     dosn't include 'listen'.
     """
 
+    __slots__ = ('encode', 'player')
+
     __name_dict = {0: 'left', 1: 'right', 2: 'listen'}
 
     def __init__(self, encode, player=-1):
@@ -63,6 +65,12 @@ class Action(e.Action):
         return Action.__name_dict[self.encode]
 
 
+# Interned actions, the legal actions are shared by all the world states
+CHANCE_ACTIONS = (Action(0, -1), Action(1, -1))
+CHANCE_PROBS = (0.5, 0.5)
+PLAYER_ACTIONS = (Action(0, 0), Action(1, 0), Action(2, 0))
+
+
 class Observation(e.Observation):
     """Observation object of env: Tiger.
 
@@ -71,6 +79,8 @@ class Observation(e.Observation):
     no observation.
     """
 
+    __slots__ = ('encode',)
+
     __name_dict = {0: 'left', 1: 'right', -1: 'none'}
 
     def __init__(self, encode):
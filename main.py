@@ -22,6 +22,42 @@ def parse_args():
     parser.add_argument('--quiet', dest='quiet', action='store_true',
                         help='Flag of whether to print step messages')
 
+    # Arguments for the sizes of the poker games
+    parser.add_argument('--n_ranks', default=None, type=int,
+                        help='For KuhnPoker and LeducPoker, the num of ranks of the cards (default=3)')
+    parser.add_argument('--n_suits', default=None, type=int,
+                        help='For LeducPoker, the num of cards of each rank (default=2)')
+    parser.add_argument('--n_raises', default=None, type=int,
+                        help='For LeducPoker, the max num of raises per round (default=1)')
+    parser.add_argument('--n_rounds', default=None, type=int,
+                        help='For LeducPoker, the num of betting rounds (default=2)')
+
+    # Arguments for CFR
+    parser.add_argument('--n_buckets', default=None, type=str,
+                        help='For CFR, the nums of card buckets of the streets such like 8,50,50,50 (default=no abstraction)')
+    parser.add_argument('--cfr_variant', default='vanilla', type=str,
+                        choices=['vanilla', 'cfr+', 'linear', 'dcfr'],
+                        help='For CFR and VectorizedCFR, the regret and averaging discounts (default=vanilla)')
+    parser.add_argument('--dcfr_alpha', default=None, type=float,
+                        help='For dcfr, the discount exponent of the positive regrets (default=1.5)')
+    parser.add_argument('--dcfr_beta', default=None, type=float,
+                        help='For dcfr, the discount exponent of the negative regrets (default=0)')
+    parser.add_argument('--dcfr_gamma', default=None, type=float,
+                        help='For dcfr, the discount exponent of the average policy (default=2)')
+    parser.add_argument('--n_iterations', default=None, type=int,
+                        help='For CFR, VectorizedCFR and MCCFR, the num of iterations of an epoch (default=100, 10000 for MCCFR)')
+    parser.add_argument('--workers', default=1, type=int,
+                        help='For CFR and MCCFR, the num of processes of the iterations (default=1)')
+
+    # Arguments for MCCFR
+    parser.add_argument('--mccfr_sampling', default='external', type=str,
+                        choices=['external', 'outcome'],
+                        help='For MCCFR, the sampling scheme of the iterations (default=external)')
+    parser.add_argument('--mccfr_epsilon', default=0.6, type=float,
+                        help='For MCCFR, the exploration of the traverser in outcome sampling (default=0.6)')
+    parser.add_argument('--seed', default=None, type=int,
+                        help='For MCCFR, the seed of the sampling and of the workers (default=None)')
+
     # Arguments for POMCP
     parser.add_argument('--n_sims', default=1000, type=int,
                         help='For POMCP, this is the num of MC sims to do at each belief node')
@@ -57,8 +93,12 @@ def main():
     # Init the logger
     logger.init_logger(args['env'], args['solver'])
 
-    # Init the environment
-    env = getattr(env_module, args['env'])()
+    # Init the environment with the sizes given
+    env_params = {param: args[arg] for arg, param in [
+        ('n_ranks', 'num_ranks'), ('n_suits', 'num_suits'),
+        ('n_raises', 'num_raises'), ('n_rounds', 'num_rounds')]
+        if args[arg] is not None}
+    env = getattr(env_module, args['env'])(**env_params)
 
     # Init the solver
     solver = getattr(solver_module, args['solver'])(env, args)
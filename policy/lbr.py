@@ -1,3 +1,9 @@
+from env.texas_holdem.equity import hand_equity
+from env.texas_holdem.texas_holdem_char import COMBO_INDEX, NUM_HAND_COMBOS
+
+import numpy as np
+
+
 class LBRagent(object): # Only for Hold'em
     def __init__(self, game, idx, initial_infosate, opponent_policy):
         self.game = game
@@ -21,24 +27,25 @@ class LBRagent(object): # Only for Hold'em
                 self._histories[i] = self._histories[i].child(action)
             self._opponent_range = self._opponent_range / sum(self._opponent_range)
     
+    def _win_probability(self, histories, opponent_range):
+        # Equity of the showdown if both players call down, the probability of
+        #   winning plus half of a draw, against the opponent range over the
+        #   histories, the same as the preflop equity table
+        state = histories[0][-1].next_state
+        hand_range = np.zeros(NUM_HAND_COMBOS)
+        for history, p in zip(histories, opponent_range):
+            hand = history[-1].next_state.hand[1 - self._idx]
+            hand_range[COMBO_INDEX[hand[0], hand[1]]] += p
+        if not state.pub:  # look up the preflop equity table
+            return self.game.preflop_range_equity(state.hand[self._idx], hand_range)
+        win, tie = hand_equity(state.hand[self._idx], hand_range, state.pub)
+        return win + tie / 2
+
     def step(self, history):
         self._infostate = history.get_info_state()
         histories = self._infostate.get_all_histories()
         assert histories == self._histories
-        wp = 0
-        for i in range(len(self._histories)):
-            history = self._histories[i]
-            while not history.is_terminal():
-                if history.is_chance():
-                    action = np.random.choice(history.chance_outcomes()[
-                                          0], p=history.chance_outcomes()[1])
-                    history = history.child(action)
-                else:
-                    action = history.legal_actions()[1] # Call
-                    history = history.child(action)
-            u = history.get_return()
-            if (self._idx == 0 and u > 0) or (self._idx == 1 and u < 0):
-                wp += self._opponent_range[i]
+        wp = self._win_probability(self._histories, self._opponent_range)
         legal_actions = self._infostate.legal_actions()
         util = {action.to_string(): 0 for action in legal_actions} # u(fold) = 0
 
@@ -62,22 +69,9 @@ class LBRagent(object): # Only for Hold'em
 
                     fp += p * p_fold
                 
-                range_after = range_after / sum(range_after)
+                range_after = np.array(range_after) / sum(range_after)
 
-                wp = 0
-                for i in range(len(histories_after)):
-                    history = histories_after[i]
-                    while not history.is_terminal():
-                        if history.is_chance():
-                            action = np.random.choice(history.chance_outcomes()[
-                                                0], p=history.chance_outcomes()[1])
-                            history = history.child(action)
-                        else:
-                            action = history.legal_actions()[1] # Call
-                            history = history.child(action)
-                    u = history.get_return()
-                    if (self._idx == 0 and u > 0) or (self._idx == 1 and u < 0):
-                        wp += range_after[i]
+                wp = self._win_probability(histories_after, range_after)
                 
                 util[action.to_string()] = fp * sum(self._infostate.pot) + (1 - fp) * (wp * (sum(self._infostate.pot) + action.bet) - \
                                             (1 - wp) * (asked + action.bet) ) 
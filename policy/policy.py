@@ -11,42 +11,96 @@ class Policy(object):
 
 
 class TabularPolicy(Policy):
-    def __init__(self, game):
+    def __init__(self, game, use_cache=True, abstraction=None):
         all_players = list(range(game.num_players))
         super(TabularPolicy, self).__init__(game, all_players)
-        histories = game.get_all_histories()
 
+        self.abstraction = abstraction
         self.history_lookup = {}
+        self.info_states = {}  # only for the debugging output
         self.info_state_per_player = [[] for _ in all_players]
         self.legal_actions_list = []
 
-        for player in all_players:
-            for history in histories:
-                if player == history.current_player():
+        legal_actions_dict = {}
+        if abstraction is not None:
+            # The abstract info states are too many to list for the games such
+            #   as Texas Hold'em, so that they are added on the first visit
+            pass
+        elif use_cache:
+            # Read the info states from the cached compiled game
+            compiled_game = game.compile()
+            for key, player, legal_actions, string in zip(
+                    compiled_game.info_state_keys.tolist(),
+                    compiled_game.info_state_player.tolist(),
+                    compiled_game.info_state_legal_actions,
+                    compiled_game.info_state_strings):
+                legal_actions_dict[key] = legal_actions
+                self.info_states[key] = string
+                self.info_state_per_player[player].append(key)
+        else:
+            # Stream the game tree once and collect the info states of each player
+            for history in game.iter_histories(cache=False):
+                player = history.current_player()
+                if player in all_players:
                     legal_actions = history.legal_actions()
                     if len(legal_actions):
                         key = self._history_key(history, player)
-                        if key not in self.history_lookup:
-                            history_index = len(self.legal_actions_list)
-                            self.history_lookup[key] = history_index
-                            self.legal_actions_list.append(legal_actions)
+                        if key not in legal_actions_dict:
+                            legal_actions_dict[key] = legal_actions
+                            self.info_states[key] = history.get_info_state()[player]
                             self.info_state_per_player[player].append(key)
 
+        # Index the info states of the players one after another
+        for player in all_players:
+            for key in self.info_state_per_player[player]:
+                history_index = len(self.legal_actions_list)
+                self.history_lookup[key] = history_index
+                self.legal_actions_list.append(legal_actions_dict[key])
+
         self.action_probabilities_table = []
         for legal_actions in self.legal_actions_list:
             self.action_probabilities_table.append(
                 [1/len(legal_actions)]*len(legal_actions))
 
     def _history_key(self, history, player):
-        return history.get_info_state()[player].to_string()
+        if self.abstraction is not None:
+            return self.abstraction.info_state_key(history, player)
+        return history.get_info_state()[player].key
+
+    def history_index(self, history, player, key=None):
+        """Get the index of the info state of a history in the table, which is
+        added with the uniform policy if it is a new abstract info state. The
+        key of the info state is computed if it is not given."""
+
+        key = self._history_key(history, player) if key is None else key
+        if key not in self.history_lookup and self.abstraction is not None:
+            return self.add_info_state(
+                key, player, history.legal_actions(),
+                self.abstraction.info_state_string(history, player))
+
+        return self.history_lookup[key]
+
+    def add_info_state(self, key, player, legal_actions, string):
+        """Add an abstract info state with the uniform policy and return its
+        index in the table."""
+
+        self.history_lookup[key] = len(self.legal_actions_list)
+        self.info_states[key] = string
+        self.info_state_per_player[player].append(key)
+        self.legal_actions_list.append(legal_actions)
+        self.action_probabilities_table.append(
+            [1/len(legal_actions)]*len(legal_actions))
+        return self.history_lookup[key]
+
+    def key_string(self, key):
+        return str(self.info_states[key])
 
     def policy_for_key(self, key):
         policy_index = self.history_lookup[key]
         return self.action_probabilities_table[policy_index]
 
     def action_probabilities(self, history, player_id):
-        policy_index = self.history_lookup[self._history_key(
-            history, history.current_player())]
+        policy_index = self.history_index(history, history.current_player())
         policy = self.action_probabilities_table[policy_index]
         legal_actions = self.legal_actions_list[policy_index]
 
@@ -65,17 +119,20 @@ class TabularPolicy(Policy):
 
     def print(self):
         for key in self.history_lookup.keys():
-            print(key + ': ', self.action_probabilities_table[self.history_lookup[key]])
+            print(self.key_string(key) + ': ', self.action_probabilities_table[self.history_lookup[key]])
 
     def get_prob(self, history, action):
         if not history.is_chance():
-            return self.policy_for_key(self._history_key(history, history.current_player()))[history.legal_actions().index(action)]
+            return self.action_probabilities_table[self.history_index(
+                history, history.current_player())][history.legal_actions().index(action)]
         else:
             return history.chance_outcomes()[1][history.legal_actions().index(action)]
 
     def __copy__(self):
         result = TabularPolicy.__new__(TabularPolicy)
+        result.abstraction = self.abstraction
         result.history_lookup = self.history_lookup
+        result.info_states = self.info_states
         result.legal_actions_list = self.legal_actions_list
         result.info_state_per_player = self.info_state_per_player
         result.action_probabilities_table = self.action_probabilities_table
@@ -113,6 +170,7 @@ class TabularPolicy_Subgame(Policy):
 
         self.histories = histories
         self.history_lookup = {}
+        self.info_states = {}  # only for the debugging output
         self.info_state_per_player = [[] for _ in all_players]
         self.legal_actions_list = []
         self.history_depth = []
@@ -128,6 +186,7 @@ class TabularPolicy_Subgame(Policy):
                                    == len(self.history_depth))
                             history_index = len(self.legal_actions_list)
                             self.history_lookup[key] = history_index
+                            self.info_states[key] = history.get_info_state()[player]
                             self.legal_actions_list.append(legal_actions)
                             self.history_depth.append(depth)
                             self.info_state_per_player[player].append(key)
@@ -140,9 +199,9 @@ class TabularPolicy_Subgame(Policy):
         self.leaf_dict = {}
         for history, depth in histories:
             if depth < max_depth:
-                self.leaf_dict[history.to_string()] = False
+                self.leaf_dict[history.key] = False
             else:
-                self.leaf_dict[history.to_string()] = True
+                self.leaf_dict[history.key] = True
 
         self.action_probabilities_table = []
         for legal_actions in self.legal_actions_list:
@@ -156,7 +215,10 @@ class TabularPolicy_Subgame(Policy):
             return history.chance_outcomes()[1][history.legal_actions().index(action)]
 
     def _history_key(self, history, player):
-        return history.get_info_state()[player].to_string()
+        return history.get_info_state()[player].key
+
+    def key_string(self, key):
+        return str(self.info_states[key])
 
     def policy_for_key(self, key):
         policy_index = self.history_lookup[key]
@@ -176,6 +238,7 @@ class TabularPolicy_Subgame(Policy):
     def __copy__(self):
         result = TabularPolicy_Subgame.__new__(TabularPolicy_Subgame)
         result.history_lookup = self.history_lookup
+        result.info_states = self.info_states
         result.legal_actions_list = self.legal_actions_list
         result.info_state_per_player = self.info_state_per_player
         result.action_probabilities_table = self.action_probabilities_table
@@ -183,3 +246,58 @@ class TabularPolicy_Subgame(Policy):
         result.player_ids = self.player_ids
         result.leaf_dict = self.leaf_dict
         return result
+
+
+class RangePolicy(Policy):
+    """Policy on the public states of a game with private hands, such as Texas
+    Hold'em, used with the range public belief states. The policy of a public
+    state is an array of the probs of the legal actions for each hand of the
+    current player, of shape (num_hands, num_actions), and it is uniform for
+    the public states not in the table.
+    """
+
+    def __init__(self, game):
+        all_players = list(range(game.num_players))
+        super(RangePolicy, self).__init__(game, all_players)
+
+        self.game = game
+        self.public_states = {}  # only for the debugging output
+        self.range_table = {}
+
+    def set_policy(self, public_state, probs):
+        self.public_states[public_state.key] = public_state
+        self.range_table[public_state.key] = probs
+
+    def policy_for_key(self, key):
+        return self.range_table[key]
+
+    def action_probabilities(self, history, player_id):
+        legal_actions = history.legal_actions()
+        probs = self.range_table.get(history.get_public_state().key)
+        if probs is None:
+            return legal_actions, [1 / len(legal_actions)] * len(legal_actions)
+
+        hand = self.game.hand_index(history, history.current_player())
+        return legal_actions, probs[hand].tolist()
+
+    def set_subgame_policy(self, policy_sub):
+        self.public_states.update(policy_sub.public_states)
+        self.range_table.update(policy_sub.range_table)
+
+    def print(self):
+        for key, probs in self.range_table.items():
+            print(str(self.public_states[key]) + ': ', probs)
+
+    def get_prob(self, history, action):
+        if not history.is_chance():
+            legal_actions, policy = self.action_probabilities(
+                history, history.current_player())
+            return policy[legal_actions.index(action)]
+        else:
+            return history.chance_outcomes()[1][history.legal_actions().index(action)]
+
+    def __copy__(self):
+        result = RangePolicy(self.game)
+        result.public_states = dict(self.public_states)
+        result.range_table = dict(self.range_table)
+        return result
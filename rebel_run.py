@@ -5,8 +5,9 @@ import torch.nn as nn
 import random
 import tqdm
 
-from solver.cfr.cfr import DepthLimited_CFR
-from policy.policy import TabularPolicy
+from solver.cfr.cfr import DepthLimited_CFR, RangeDepthLimited_CFR
+from policy.policy import TabularPolicy, RangePolicy
+from env.public_belief_state import RangePublicBeliefState
 from policy.exploitability import exploitability
 from policy.lbr import LBRagent
 
@@ -84,11 +85,19 @@ class ReBeL(object):
         self.min_buffer_size = min_buffer_size
         self.lr = lr
         self.iteration_num = iteration_num
-        self.policy = TabularPolicy(self.game)
+        # The games with private hands are solved on the ranges of the hands
+        self.ranged = isinstance(self.current_pbs, RangePublicBeliefState)
+        if self.ranged:
+            self.policy = RangePolicy(self.game)
+        else:
+            self.policy = TabularPolicy(self.game)
         print("initial Table got!")
 
         dinp = self.game.get_tensor(self.current_pbs).size()[0]
-        dout = len(self.current_pbs.prob_dict)
+        if self.ranged:
+            dout = self.current_pbs.ranges.size
+        else:
+            dout = len(self.current_pbs.prob_dict)
         self.value_net = MLP(dinp, layers_sizes, dout)
         self.batch_size = batch_size
 
@@ -96,12 +105,16 @@ class ReBeL(object):
         self.optimizer = torch.optim.Adam(
             self.value_net.parameters(), lr=self.lr)
 
+    def subgame_solver(self, pbs):
+        solver = RangeDepthLimited_CFR if self.ranged else DepthLimited_CFR
+        return solver(self.game,
+                      self.value_net,
+                      pbs,
+                      max_depth=self.max_depth,
+                      iteration_num=self.iteration_num)
+
     def step(self):
-        solver = DepthLimited_CFR(self.game,
-                                  self.value_net,
-                                  self.current_pbs,
-                                  max_depth=self.max_depth,
-                                  iteration_num=self.iteration_num)
+        solver = self.subgame_solver(self.current_pbs)
         # if self.current_pbs != self.game.initial_pbs():
         #     #print("Ckpt")
         policy_sub = solver.train_policy()
@@ -134,37 +147,36 @@ class ReBeL(object):
             self.current_pbs = self.game.initial_pbs()
 
     def test_lbr(self, index=0, num_ep=100):  # index of LBRagent
+        # The LBR agent enumerates the histories of its info states, and the
+        #   range policy has no leaves and is keyed by the public states
+        if self.ranged:
+            raise NotImplementedError(
+                'LBR is not supported with the range public belief states')
         for episode in range(num_ep):
             print(episode)
             current_pbs = self.game.initial_pbs()
             # initial chance
             history = self.game.initial_history()
-            action = np.random.choice(history.chance_outcomes()[
-                                                0], p=history.chance_outcomes()[1])
+            action = history.sample_chance_outcome()
             # history after deal
             history = history.child(action)
             # use tabular_policy for now
             policy = self.policy
             test_agent = LBRagent(self.game, idx, history.get_info_state(), policy)
 
-            solver = DepthLimited_CFR(self.game,
-                                      self.value_net,
-                                      current_pbs,
-                                      max_depth=self.max_depth,
-                                      iteration_num=self.iteration_num)
+            solver = self.subgame_solver(current_pbs)
             policy_sub = solver.train_policy()
             while not history.is_terminal():
-                while not history.is_terminal() and not solver._current_policy.leaf_dict[history.to_string()]:
+                while not history.is_terminal() and not solver._current_policy.leaf_dict[history.key]:
                     action_ls = []
                     if history.current_player() == index:
                         action = test_agent.step(history)  #TODO: step
                         history = history.child(action)
                     elif history.is_chance():
-                        action = np.random.choice(history.chance_outcomes()[
-                                                0], p=history.chance_outcomes()[1])
+                        action = history.sample_chance_outcome()
                         history = history.child(action)
                     else:
-                        info_state = history.get_info_state()[history.current_player()].to_string()
+                        info_state = history.get_info_state()[history.current_player()].key
                         policy = policy_sub.policy_for_key(info_state)
                         i = np.random.choice(np.arange(len(policy)), p=policy)
                         action = history.legal_actions()[i]
@@ -177,11 +189,7 @@ class ReBeL(object):
                 belief_policy = solver.belief_policy
                 for action in action_ls:
                     current_pbs = current_pbs.child(action, belief_policy)
-                solver = DepthLimited_CFR(self.game,
-                                      self.value_net,
-                                      current_pbs,
-                                      max_depth=self.max_depth,
-                                      iteration_num=self.iteration_num)
+                solver = self.subgame_solver(current_pbs)
                 policy_sub = solver.train_policy() 
             reward_0 += history.get_return() * (2 * index - 1)
         return reward_0 / num_ep
@@ -195,11 +203,7 @@ class ReBeL(object):
     def compute_policy(self, policy, pbs): # search for every history
         if pbs.is_terminal():
             return
-        solver = DepthLimited_CFR(self.game,
-                                  self.value_net,
-                                  pbs,
-                                  max_depth=self.max_depth,
-                                  iteration_num=self.iteration_num)
+        solver = self.subgame_solver(pbs)
         policy_sub = solver.train_policy()
         policy.set_subgame_policy(policy_sub)
         for action in pbs.legal_actions():
@@ -214,14 +218,15 @@ class ReBeL(object):
 def main():
     agents = ReBeL(env)
     print("Yeah!")
-    expl = (agents.test_lbr(index=0) + agents.test_lbr(index=1)) / 2
-    print(expl)
+    if not agents.ranged:
+        expl = (agents.test_lbr(index=0) + agents.test_lbr(index=1)) / 2
+        print(expl)
     episode_num = 1000
     for ep in tqdm.tqdm(range(episode_num)):
         while not agents.current_pbs.is_terminal():
             agents.step()
         agents.reset_episode()
-        if (ep+1) % 50 == 0:
+        if (ep+1) % 50 == 0 and not agents.ranged:
             # expl = exploitability(agents.game, agents.policy)
             # print(expl) 
             expl = (agents.test_lbr(index=0) + agents.test_lbr(index=1)) / 2
@@ -1,7 +1,11 @@
 import solver.pomcp.pomcp
 import solver.mepop.mepop
 import solver.cfr.cfr
+import solver.cfr.vectorized_cfr
+import solver.cfr.mccfr
 
 POMCP = solver.pomcp.pomcp.POMCP
 MEPOP = solver.mepop.mepop.MEPOP
 CFR = solver.cfr.cfr.CFR
+VectorizedCFR = solver.cfr.vectorized_cfr.VectorizedCFR
+MCCFR = solver.cfr.mccfr.MCCFR
@@ -1,7 +1,9 @@
 from policy.policy import TabularPolicy
 from policy.policy import TabularPolicy_Subgame
+from policy.policy import RangePolicy
 from solver.solver import Solver
-from env.public_belief_state import PublicBeliefState
+from solver.cfr.parallel_cfr import ChanceSubtreePool
+from env.public_belief_state import PublicBeliefState, RangePublicBeliefState
 #from test.exploitability import BRPolicy
 from policy import exploitability as expl
 
@@ -9,6 +11,20 @@ import torch
 import numpy as np
 import collections
 import attr
+import os
+import time
+
+CURVE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'results', 'csv')
+
+# The discount exponents (alpha, beta, gamma) of the positive regrets, the
+#   negative regrets and the cumulative policy, where None is for no discount
+#   and beta = -inf floors the regrets at zero as CFR+
+CFR_VARIANTS = {
+    'vanilla': (None, None, None),
+    'cfr+': (None, -np.inf, 1.0),
+    'linear': (1.0, 1.0, 1.0),
+    'dcfr': (1.5, 0.0, 2.0),
+}
 
 
 @attr.s
@@ -29,32 +45,103 @@ def _update_current_policy(current_policy, info_state_nodes):
 
 
 def _regret_matching(cumulative_regrets, legal_actions):
-    regrets = cumulative_regrets.values()
+    # The regrets are indexed by the actions, so that they can be a dict or a
+    #   row of an array
+    regrets = [cumulative_regrets[i] for i in range(len(legal_actions))]
     sum_positive_regrets = sum((regret for regret in regrets if regret > 0))
     info_state_policy = {}
     if sum_positive_regrets > 0:
         for i in range(len(legal_actions)):
-            positive_action_regret = max(0.0, cumulative_regrets[i])
-            info_state_policy[i] = positive_action_regret / \
-                sum_positive_regrets
+            positive_action_regret = max(0.0, regrets[i])
+            info_state_policy[i] = float(positive_action_regret /
+                                         sum_positive_regrets)
     else:
         for i in range(len(legal_actions)):
             info_state_policy[i] = 1.0 / len(legal_actions)
     return info_state_policy
 
 
+def cfr_variant(args):
+    """Get the name and the discount exponents of the CFR variant of the
+    arguments, the exponents of DCFR can be given."""
+
+    variant = args.get('cfr_variant') or 'vanilla'
+    alpha, beta, gamma = CFR_VARIANTS[variant]
+    if variant == 'dcfr':
+        alpha, beta, gamma = [default if args.get(arg) is None else args[arg]
+                              for arg, default in [('dcfr_alpha', alpha),
+                                                   ('dcfr_beta', beta),
+                                                   ('dcfr_gamma', gamma)]]
+    return variant, (alpha, beta, gamma)
+
+
+def discount_weights(iteration, discount):
+    """Get the weights of the positive regrets, the negative regrets and the
+    cumulative policy at the end of an iteration counted from 1, which are
+    t^alpha / (t^alpha + 1), t^beta / (t^beta + 1) and (t / (t + 1))^gamma."""
+
+    alpha, beta, gamma = discount
+    weights = []
+    for exponent in (alpha, beta):
+        if exponent is None:
+            weights.append(1.0)
+        elif exponent == -np.inf:
+            weights.append(0.0)
+        else:
+            weights.append(iteration ** exponent / (iteration ** exponent + 1))
+    weights.append(1.0 if gamma is None else (iteration / (iteration + 1)) ** gamma)
+    return weights
+
+
+def _discount_info_state_nodes(info_state_nodes, weights):
+    positive_weight, negative_weight, policy_weight = weights
+    for info_state_node in info_state_nodes.values():
+        cumulative_regret = info_state_node.cumulative_regret
+        for action, regret in cumulative_regret.items():
+            cumulative_regret[action] = regret * (
+                positive_weight if regret > 0 else negative_weight)
+        cumulative_policy = info_state_node.cumulative_policy
+        for action in cumulative_policy:
+            cumulative_policy[action] *= policy_weight
+
+
+def save_exploitability_curve(name, curve, curve_dir=CURVE_DIR):
+    """Save the exploitability of the average policy against the iterations
+    and the time of solving, excluding the evaluations, as a .csv file."""
+
+    os.makedirs(curve_dir, exist_ok=True)
+    path = os.path.join(curve_dir, name + '.csv')
+    with open(path, 'w') as f:
+        f.write('iteration,time,exploitability\n')
+        for iteration, seconds, exploitability in curve:
+            f.write('%d,%f,%f\n' % (iteration, seconds, exploitability))
+
+    return path
+
+
+def _range_regret_matching(cumulative_regrets):
+    """Regret matching on an array of the regrets of the actions of each hand,
+    which is uniform for the hands without positive regrets."""
+
+    positive_regrets = np.maximum(cumulative_regrets, 0)
+    sum_positive_regrets = positive_regrets.sum(axis=1, keepdims=True)
+    uniform = np.full(positive_regrets.shape, 1 / positive_regrets.shape[1])
+    return np.divide(positive_regrets, sum_positive_regrets, out=uniform,
+                     where=sum_positive_regrets > 0)
+
+
 def _update_average_policy(average_policy, info_state_nodes):
     for info_state, info_state_node in info_state_nodes.items():
         info_state_policies_sum = info_state_node.cumulative_policy
         info_state_policy = average_policy.policy_for_key(info_state)
-        probabilities_sum = sum(info_state_policies_sum.values())
+        num_actions = len(info_state_policy)
+        probabilities_sum = sum(info_state_policies_sum[i] for i in range(num_actions))
         if probabilities_sum == 0:
-            num_actions = len(info_state_policy)
             for i in range(num_actions):
                 info_state_policy[i] = 1 / num_actions
         else:
-            for action, action_prob_sum in info_state_policies_sum.items():
-                info_state_policy[action] = action_prob_sum / probabilities_sum
+            for i in range(num_actions):
+                info_state_policy[i] = float(info_state_policies_sum[i] / probabilities_sum)
 
 
 class CFR(Solver):
@@ -67,48 +154,47 @@ class CFR(Solver):
         self._game = game
         self.name = args['solver']
         self.iterations = args['n_epochs']
+        self._num_iterations = args.get('n_iterations') or 100
         self._num_players = self._game.num_players
         self._root_node = self._game.initial_history()  # !!!
-        self._current_policy = TabularPolicy(self._game)
-        self._average_policy = self._current_policy.__copy__()
-
-        self._info_state_nodes = {}
-        self._initialize_info_states_nodes(self._root_node)
-
-    def _initialize_info_states_nodes(self, history):
-        if history.is_terminal():
-            return
-
-        if history.is_chance():
-            for action in history.legal_actions():
-                self._initialize_info_states_nodes(history.child(action))
-            return
-
-        current_player = history.current_player()
-        info_state = history.get_info_state()[current_player].to_string()
-
-        info_state_node = self._info_state_nodes.get(info_state)
-        if info_state_node is None:
-            legal_actions = history.legal_actions()
-            info_state_node = InfoStateNode(
-                legal_actions=legal_actions,
-                index_in_tabular_policy=self._current_policy.history_lookup[info_state]
+        # Key the info states by the card buckets and the betting sequences
+        #   for the games too large to list the info states, e.g. Texas Hold'em
+        self._abstraction = None
+        if args.get('n_buckets'):
+            self._abstraction = self._game.card_abstraction(
+                tuple(int(n) for n in args['n_buckets'].split(',')))
+        self._variant, self._discount = cfr_variant(args)
+        # The chance subtrees below the root are traversed by a process pool
+        #   if there are more than one workers
+        self._num_workers = args.get('workers') or 1
+        self.reset_for_epoch()
+
+    def _initialize_info_states_nodes(self):
+        # The tabular policy already lists every info state of the game, so
+        #   there is no need to traverse the game tree again
+        for info_state, index in self._current_policy.history_lookup.items():
+            self._info_state_nodes[info_state] = InfoStateNode(
+                legal_actions=self._current_policy.legal_actions_list[index],
+                index_in_tabular_policy=index
             )
-            self._info_state_nodes[info_state] = info_state_node
-
-        for action in info_state_node.legal_actions:
-            self._initialize_info_states_nodes(history.child(action))
 
     def current_policy(self):
+        if hasattr(self, '_pool'):  # the current policy is kept by the pool
+            self._pool.copy_policy(self._current_policy)
         return self._current_policy
 
     def average_policy(self):
+        # The rows are copied from the current policy, whose table is shared,
+        #   so that the current policy is not overwritten during the training
+        self._average_policy.action_probabilities_table = [
+            list(row) for row in self._current_policy.action_probabilities_table]
         _update_average_policy(self._average_policy, self._info_state_nodes)
         return self._average_policy
 
     def _compute_counterfactual_regret_for_player(self, history, reach_probabilities, player):
         if history.is_terminal():
-            return np.asarray([history.get_return(), -history.get_return()])
+            utility = self._game.terminal_return(history)
+            return np.asarray([utility, -utility])
 
         if history.is_chance():
             history_value = 0.0
@@ -121,14 +207,21 @@ class CFR(Solver):
             return history_value
 
         current_player = history.current_player()
-        info_state = history.get_info_state()[current_player].to_string()
+        info_state = self._current_policy._history_key(history, current_player)
 
         if all(reach_probabilities[:-1] == 0):
             return np.zeros(self._num_players)
 
         history_value = np.zeros(self._num_players)
         children_utilities = {}
-        info_state_node = self._info_state_nodes[info_state]
+        info_state_node = self._info_state_nodes.get(info_state)
+        if info_state_node is None:  # a new abstract info state
+            index = self._current_policy.history_index(
+                history, current_player, info_state)
+            info_state_node = self._info_state_nodes[info_state] = InfoStateNode(
+                legal_actions=self._current_policy.legal_actions_list[index],
+                index_in_tabular_policy=index
+            )
         info_state_policy = self._current_policy.action_probabilities_table[
             info_state_node.index_in_tabular_policy
         ]
@@ -165,7 +258,22 @@ class CFR(Solver):
                 info_state_policy[i]
         return history_value
 
+    def _chance_subtree_pool(self):
+        if not hasattr(self, '_pool'):
+            self._pool = ChanceSubtreePool(self, self._num_workers)
+        return self._pool
+
     def evaluate_and_update_policy(self):
+        self._iteration += 1
+        if self._num_workers > 1:
+            # The sums and the current policy are updated as arrays by the pool
+            pool = self._chance_subtree_pool()
+            for player in range(self._num_players):
+                pool.update(player)
+            if self._variant != 'vanilla':
+                pool.discount(discount_weights(self._iteration, self._discount))
+            return
+
         for player in range(self._num_players):
             self._compute_counterfactual_regret_for_player(
                 self._root_node,
@@ -174,28 +282,52 @@ class CFR(Solver):
             )
             _update_current_policy(self._current_policy,
                                    self._info_state_nodes)
+        # Discounting the positive regrets at once keeps the current policy,
+        #   so that it is done after the updates of both players
+        if self._variant != 'vanilla':
+            _discount_info_state_nodes(
+                self._info_state_nodes,
+                discount_weights(self._iteration, self._discount))
 
             # self.print_policy(self.current_policy())
 
     def print_policy(self, policy):
         policy_dict = {
-            key: policy.action_probabilities_table[policy.history_lookup[key]]
+            policy.key_string(key): policy.action_probabilities_table[policy.history_lookup[key]]
             for key in policy.history_lookup.keys()}
         print(policy_dict)
 
     def reset_for_epoch(self):
         """Initialize the solver before solving the game."""
-        self._current_policy = TabularPolicy(self._game)
+        self._current_policy = TabularPolicy(self._game, abstraction=self._abstraction)
         self._average_policy = self._current_policy.__copy__()
+        self._info_state_nodes = {}
+        self._initialize_info_states_nodes()
+        self._iteration = 0
+        if hasattr(self, '_pool'):  # the workers copied the old tables
+            self._pool.close()
+            del self._pool
 
     def train_policy(self):
         """Solve the entire game for one epoch."""
-        self.iterations = 100
+        self.iterations = self._num_iterations
         # print(self.current_policy().action_probabilities_table)
+        curve = []
+        seconds = 0.0
         for i in range(self.iterations):
+            start = time.time()
             self.evaluate_and_update_policy()
-            if i % 50 == 4:
-                print(expl.exploitability(self._game, self.average_policy()))
+            seconds += time.time() - start
+            # Evaluate at the powers of 2 for the exploitability curve, which
+            #   is only computed for the games without abstraction
+            if ((i + 1) & i == 0 or i + 1 == self.iterations) and \
+                    self._abstraction is None:
+                curve.append((i + 1, seconds, expl.exploitability(
+                    self._game, self.average_policy())))
+                print('iteration %d, time %.3fs, exploitability %f' % curve[-1])
+        if curve:
+            save_exploitability_curve('%s-%s-%s' % (
+                self._game.name.replace(' ', ''), self.name, self._variant), curve)
         print(self.average_policy().action_probabilities_table)
         self.average_policy().print()
         return self._average_policy
@@ -235,7 +367,7 @@ class DepthLimited_CFR(Solver):
             if history.is_terminal():
                 return
 
-            if self._current_policy.leaf_dict[history.to_string()]:
+            if self._current_policy.leaf_dict[history.key]:
                 return
 
             if history.is_chance():
@@ -244,7 +376,7 @@ class DepthLimited_CFR(Solver):
                 return
 
             current_player = history.current_player()
-            info_state = history.get_info_state()[current_player].to_string()
+            info_state = history.get_info_state()[current_player].key
 
             info_state_node = self._info_state_nodes.get(info_state)
             if info_state_node is None:
@@ -267,8 +399,8 @@ class DepthLimited_CFR(Solver):
 
     def set_leaf_values(self, pbs):
         history = pbs.history_list[0]
-        if self._current_policy.leaf_dict[history.to_string()]:  # is leaf
-            self.values_dict[pbs.public_state.to_string()] = self.value_net(
+        if self._current_policy.leaf_dict[history.key]:  # is leaf
+            self.values_dict[pbs.public_state.key] = self.value_net(
                 pbs.to_tensor()).tolist()  # !
         else:
             for action in pbs.legal_actions():
@@ -280,7 +412,7 @@ class DepthLimited_CFR(Solver):
         player = 0
         for history in self.initial_pbs.history_list:
             reach = np.ones(self._num_players+1)
-            reach[-1] = self.initial_pbs.prob_dict[history.to_string()]
+            reach[-1] = self.initial_pbs.prob_dict[history.key]
             value = self._compute_counterfactual_regret_for_player(
                 history,
                 reach_probabilities=reach,
@@ -294,25 +426,24 @@ class DepthLimited_CFR(Solver):
         initial_prob = []
         initial_history = []
         for history in self.initial_pbs.history_list:
-            prob = self.initial_pbs.prob_dict[history.to_string()]
+            prob = self.initial_pbs.prob_dict[history.key]
             initial_prob.append(prob)
             initial_history.append(history)
         index = np.random.choice(np.arange(len(initial_prob)), p=initial_prob)
         history = initial_history[index]
         random_player = np.random.randint(self._num_players)
         action_list = []
-        while not history.is_terminal() and not self._current_policy.leaf_dict[history.to_string()]:
+        while not history.is_terminal() and not self._current_policy.leaf_dict[history.key]:
             if history.current_player == random_player:
                 i = np.random.randint(len(history.legal_actions()))
                 action = history.legal_actions()[i]
                 history = history.child(action)
             elif history.is_chance():
-                action = np.random.choice(history.chance_outcomes()[
-                                          0], p=history.chance_outcomes()[1])
+                action = history.sample_chance_outcome()
                 history = history.child(action)
             else:
                 info_state = history.get_info_state(
-                )[history.current_player()].to_string()
+                )[history.current_player()].key
                 policy = self._current_policy.policy_for_key(info_state)
                 i = np.random.choice(np.arange(len(policy)), p=policy)
                 action = history.legal_actions()[i]
@@ -329,11 +460,12 @@ class DepthLimited_CFR(Solver):
 
     def _compute_counterfactual_regret_for_player(self, history, reach_probabilities, player):
         if history.is_terminal():
-            return np.asarray([history.get_return(), -history.get_return()])
+            utility = self._game.terminal_return(history)
+            return np.asarray([utility, -utility])
 
-        if self._current_policy.leaf_dict[history.to_string()]:
+        if self._current_policy.leaf_dict[history.key]:
             pub_s = history.get_public_state()
-            u = self.values_dict[pub_s.to_string()][pub_s.get_all_histories().index(history)]
+            u = self.values_dict[pub_s.key][pub_s.get_all_histories().index(history)]
             return np.asarray([u, -u])
 
         if history.is_chance():
@@ -347,14 +479,21 @@ class DepthLimited_CFR(Solver):
             return history_value
 
         current_player = history.current_player()
-        info_state = history.get_info_state()[current_player].to_string()
+        info_state = self._current_policy._history_key(history, current_player)
 
         if all(reach_probabilities[:-1] == 0):
             return np.zeros(self._num_players)
 
         history_value = np.zeros(self._num_players)
         children_utilities = {}
-        info_state_node = self._info_state_nodes[info_state]
+        info_state_node = self._info_state_nodes.get(info_state)
+        if info_state_node is None:  # a new abstract info state
+            index = self._current_policy.history_index(
+                history, current_player, info_state)
+            info_state_node = self._info_state_nodes[info_state] = InfoStateNode(
+                legal_actions=self._current_policy.legal_actions_list[index],
+                index_in_tabular_policy=index
+            )
         info_state_policy = self._current_policy.action_probabilities_table[
             info_state_node.index_in_tabular_policy
         ]
@@ -395,7 +534,7 @@ class DepthLimited_CFR(Solver):
         for player in range(self._num_players):
             for history in self.initial_pbs.history_list:
                 reach = np.ones(self._num_players+1)
-                reach[-1] = self.initial_pbs.prob_dict[history.to_string()]
+                reach[-1] = self.initial_pbs.prob_dict[history.key]
                 self._compute_counterfactual_regret_for_player(
                     history,
                     reach_probabilities=reach,
@@ -416,7 +555,7 @@ class DepthLimited_CFR(Solver):
 
     def print_policy(self, policy):
         policy_dict = {
-            key: policy.action_probabilities_table[policy.history_lookup[key]]
+            policy.key_string(key): policy.action_probabilities_table[policy.history_lookup[key]]
             for key in policy.history_lookup.keys()}
         print(policy_dict)
 
@@ -436,3 +575,179 @@ class DepthLimited_CFR(Solver):
                 self.belief_policy = self._current_policy.__copy__()
 
         return self.average_policy()
+
+
+class RangeDepthLimited_CFR(Solver):
+    """
+    Solver: RangeDepthLimited_CFR
+
+    Depth-limited CFR on the public tree below a range public belief state, as
+    DepthLimited_CFR for the games whose histories can not be listed, such as
+    Texas Hold'em. The policies, the regrets and the counterfactual values are
+    arrays over the hands of the players, and the subgame ends at max_depth or
+    at the next chance node, where the values are given by the value net.
+    """
+    online = False
+
+    def __init__(self, game, net, pbs, max_depth, iteration_num):
+        assert not pbs.is_terminal() and not pbs.is_chance()
+
+        self._game = game
+        self._num_players = self._game.num_players
+        self.max_depth = max_depth
+        self.initial_pbs = pbs
+        self.value_net = net
+        self.iteration_num = iteration_num
+
+        self._public_states = {}
+        self._legal_actions = {}
+        self._initialize_public_states(self.initial_pbs.history, 0)
+        self.reset_for_epoch()
+
+    def _is_leaf(self, history, depth):
+        return depth == self.max_depth or (depth > 0 and history.is_chance())
+
+    def _initialize_public_states(self, history, depth):
+        if history.is_terminal() or self._is_leaf(history, depth):
+            return
+
+        public_state = history.get_public_state()
+        legal_actions = history.legal_actions()
+        self._public_states[public_state.key] = public_state
+        self._legal_actions[public_state.key] = legal_actions
+        for action in legal_actions:
+            self._initialize_public_states(history.child(action), depth + 1)
+
+    def _leaf_values(self, history, ranges):
+        """Get the counterfactual values of the hands at a leaf by the value
+        net, which is given the normalized ranges."""
+
+        totals = ranges.sum(axis=1, keepdims=True)
+        pbs = RangePublicBeliefState(history, np.divide(
+            ranges, totals, out=np.zeros(ranges.shape), where=totals > 0))
+        with torch.no_grad():
+            values = self.value_net(pbs.to_tensor().float()).numpy()
+        # The values of a player are weighted by the reach of the opponent
+        return values.reshape(ranges.shape).astype(np.float64) * totals[::-1]
+
+    def _compute_counterfactual_values(self, history, ranges, policy, player,
+                                       depth=0):
+        """Get the counterfactual values of the hands of the players at a
+        history, given the reach probs of the hands, and update the regrets
+        and the policy sums of player, or of none if player is None."""
+
+        if history.is_terminal():
+            return self._game.terminal_values(
+                RangePublicBeliefState(history, ranges))
+
+        if self._is_leaf(history, depth):
+            return self._leaf_values(history, ranges)
+
+        current_player = history.current_player()
+        public_state = history.get_public_state().key
+        info_state_policy = policy.policy_for_key(public_state)
+        others = np.arange(self._num_players) != current_player
+
+        history_value = np.zeros(ranges.shape)
+        children_values = []
+        for i, action in enumerate(self._legal_actions[public_state]):
+            new_ranges = ranges.copy()
+            new_ranges[current_player] *= info_state_policy[:, i]
+            child_values = self._compute_counterfactual_values(
+                history.child(action), new_ranges, policy, player, depth + 1)
+            history_value[current_player] += info_state_policy[:, i] * \
+                child_values[current_player]
+            history_value[others] += child_values[others]
+            children_values.append(child_values[current_player])
+
+        if current_player == player:
+            self._cumulative_regret[public_state] += np.stack(
+                children_values, axis=1) - history_value[player][:, None]
+            self._cumulative_policy[public_state] += \
+                ranges[player][:, None] * info_state_policy
+        return history_value
+
+    def _update_current_policy(self):
+        for public_state, regrets in self._cumulative_regret.items():
+            self._current_policy.set_policy(self._public_states[public_state],
+                                            _range_regret_matching(regrets))
+
+    def current_policy(self):
+        return self._current_policy
+
+    def average_policy(self):
+        average_policy = RangePolicy(self._game)
+        for public_state, policy_sums in self._cumulative_policy.items():
+            probabilities_sum = policy_sums.sum(axis=1, keepdims=True)
+            uniform = np.full(policy_sums.shape, 1 / policy_sums.shape[1])
+            average_policy.set_policy(self._public_states[public_state], np.divide(
+                policy_sums, probabilities_sum, out=uniform,
+                where=probabilities_sum > 0))
+        return average_policy
+
+    def get_training_data(self):
+        """Get the tensor of the initial pbs and the counterfactual values of
+        the hands of both players by the average policy."""
+
+        values = self._compute_counterfactual_values(
+            self.initial_pbs.history, self.initial_pbs.ranges,
+            self.average_policy(), player=None)
+        label = torch.tensor(values.ravel(), dtype=torch.float32)
+        return (self.initial_pbs.to_tensor().float(), label)
+
+    def sample_pbs(self):
+        """Sample a leaf pbs of the subgame by the current policy, where a
+        random player explores with the uniform policy, and deal the chance
+        outcome if it is a chance node."""
+
+        random_player = np.random.randint(self._num_players)
+        pbs = self.initial_pbs
+        depth = 0
+        while not pbs.is_terminal() and not self._is_leaf(pbs.history, depth):
+            current_player = pbs.current_player()
+            info_state_policy = self._current_policy.policy_for_key(
+                pbs.public_state.key)
+            if current_player == random_player:
+                probs = np.full(info_state_policy.shape[1],
+                                1 / info_state_policy.shape[1])
+            else:
+                # The probs of the actions over the range of the player
+                probs = pbs.ranges[current_player] @ info_state_policy
+                probs /= probs.sum()
+            action = pbs.legal_actions()[np.random.choice(len(probs), p=probs)]
+            pbs = pbs.child(action, info_state_policy)
+            depth += 1
+        if pbs.is_chance():
+            pbs = pbs.child(pbs.history.sample_chance_outcome())
+        return pbs
+
+    def evaluate_and_update_policy(self):
+        for player in range(self._num_players):
+            self._compute_counterfactual_values(
+                self.initial_pbs.history, self.initial_pbs.ranges,
+                self._current_policy, player)
+            self._update_current_policy()
+
+    def reset_for_epoch(self):
+        """Initialize the solver before solving the game."""
+        num_hands = self.initial_pbs.ranges.shape[1]
+        self._current_policy = RangePolicy(self._game)
+        self._cumulative_regret = {}
+        self._cumulative_policy = {}
+        for public_state, legal_actions in self._legal_actions.items():
+            self._cumulative_regret[public_state] = np.zeros(
+                (num_hands, len(legal_actions)))
+            self._cumulative_policy[public_state] = np.zeros(
+                (num_hands, len(legal_actions)))
+        self._update_current_policy()
+
+    def train_policy(self):
+        """Solve the subgame, and sample the next pbs at a random iteration."""
+        t_samp = np.random.randint(self.iteration_num)
+        for i in range(self.iteration_num):
+            self.evaluate_and_update_policy()
+            if i == t_samp:
+                self.next_pbs = self.sample_pbs()
+                self.belief_policy = self._current_policy.__copy__()
+
+        return self.average_policy()
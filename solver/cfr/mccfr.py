@@ -0,0 +1,335 @@
+from policy.policy import TabularPolicy
+from solver.solver import Solver
+from solver.cfr.cfr import InfoStateNode, _regret_matching, _update_current_policy, \
+    _update_average_policy, save_exploitability_curve
+from solver.cfr.parallel_cfr import HogwildPool, shared_row
+from policy import exploitability as expl
+
+import multiprocessing
+import numpy as np
+import time
+
+
+class MCCFR(Solver):
+    """
+    Solver: MCCFR
+
+    Monte Carlo CFR on the histories of any environment, so that an iteration
+    visits a sampled part of the game tree instead of the whole tree. With
+    external sampling, the chance and the opponent actions are sampled and all
+    the actions of the traverser are expanded. With outcome sampling, a single
+    trajectory is sampled, where the traverser explores with epsilon, and the
+    regrets are weighted by the importance of the trajectory. The current
+    policy of an info state is computed by regret matching when it is visited,
+    and the chance outcomes are sampled by the environment, so that the lazy
+    deals of Texas Hold'em are never listed.
+
+    With more than one workers, the iterations are run by a Hogwild pool of
+    processes on the regrets and the policy sums in shared memory, and the
+    snapshots of the average policy are taken while the workers keep running.
+    """
+    online = False
+
+    def __init__(self, game, args):
+        self._game = game
+        self.name = args['solver']
+        self.iterations = args['n_epochs']
+        self._num_iterations = args.get('n_iterations') or 10000
+        self._num_players = self._game.num_players
+        self._root_node = self._game.initial_history()
+        self._sampling = args.get('mccfr_sampling') or 'external'
+        assert self._sampling in ('external', 'outcome')
+        self._epsilon = args.get('mccfr_epsilon', 0.6)
+        self._rng = np.random.RandomState(args.get('seed'))
+        self._abstraction = None
+        if args.get('n_buckets'):
+            self._abstraction = self._game.card_abstraction(
+                tuple(int(n) for n in args['n_buckets'].split(',')))
+        # The visited histories are kept for the games whose info states are
+        #   listed, and the larger games step on temporary histories
+        self._cache = self._abstraction is None
+        self._num_workers = args.get('workers') or 1
+        self.reset_for_epoch()
+
+    def _info_state_node(self, history, player):
+        """Get the node of the info state of a history, which is added on the
+        first visit."""
+
+        info_state = self._current_policy._history_key(history, player)
+        info_state_node = self._info_state_nodes.get(info_state)
+        if info_state_node is None:
+            index = self._current_policy.history_index(history, player, info_state)
+            if self._shared_tables is None:
+                info_state_node = InfoStateNode(
+                    legal_actions=self._current_policy.legal_actions_list[index],
+                    index_in_tabular_policy=index
+                )
+            else:
+                # The abstract info state is new to the Hogwild worker, whose
+                #   row in the shared arrays is found by its key
+                keys, regrets, policy_sums = self._shared_tables
+                row = shared_row(keys, info_state)
+                info_state_node = InfoStateNode(
+                    legal_actions=self._current_policy.legal_actions_list[index],
+                    index_in_tabular_policy=index,
+                    cumulative_regret=regrets[row],
+                    cumulative_policy=policy_sums[row]
+                )
+                self._new_info_states.append((info_state, player, index, row))
+            self._info_state_nodes[info_state] = info_state_node
+        return info_state_node
+
+    def _share_info_state_nodes(self, regrets, policy_sums, keys=None):
+        """Back the info state nodes by the rows of the arrays of the regrets
+        and the policy sums, which are indexed by the rows of the tabular
+        policy, or by the rows of the keys in the shared table of keys for the
+        abstract info states, and keep the sums so far."""
+
+        for info_state, index in self._current_policy.history_lookup.items():
+            row = index if keys is None else shared_row(keys, info_state)
+            info_state_node = self._info_state_nodes.get(info_state)
+            if info_state_node is not None:
+                for action, regret in info_state_node.cumulative_regret.items():
+                    regrets[row, action] = regret
+                for action, policy_sum in info_state_node.cumulative_policy.items():
+                    policy_sums[row, action] = policy_sum
+            self._info_state_nodes[info_state] = InfoStateNode(
+                legal_actions=self._current_policy.legal_actions_list[index],
+                index_in_tabular_policy=index,
+                cumulative_regret=regrets[row],
+                cumulative_policy=policy_sums[row]
+            )
+        if keys is not None:
+            self._shared_tables = (keys, regrets, policy_sums)
+
+    def _pop_new_info_states(self):
+        """Get the abstract info states added by a Hogwild worker since the
+        last call, with their players, legal actions, strings and rows."""
+
+        policy = self._current_policy
+        new_info_states = [
+            (info_state, player, policy.legal_actions_list[index],
+             policy.info_states[info_state], row)
+            for info_state, player, index, row in self._new_info_states]
+        self._new_info_states = []
+        return new_info_states
+
+    def _add_info_states(self, new_info_states):
+        """Add the abstract info states added by the Hogwild workers, with the
+        nodes backed by their rows in the shared arrays."""
+
+        if not new_info_states:
+            return
+        _, regrets, policy_sums = self._shared_tables
+        for info_state, player, legal_actions, string, row in new_info_states:
+            if info_state not in self._info_state_nodes:
+                index = self._current_policy.add_info_state(
+                    info_state, player, legal_actions, string)
+                self._info_state_nodes[info_state] = InfoStateNode(
+                    legal_actions=legal_actions,
+                    index_in_tabular_policy=index,
+                    cumulative_regret=regrets[row],
+                    cumulative_policy=policy_sums[row]
+                )
+
+    def _sample(self, probs):
+        """Sample an index by the probs."""
+
+        return min(int(np.searchsorted(np.cumsum(probs), self._rng.rand(), side='right')),
+                   len(probs) - 1)
+
+    def _external_sampling(self, history, player):
+        """Traverse a sampled subtree for player and return the sampled value
+        of player at the history."""
+
+        if history.is_terminal():
+            utility = self._game.terminal_return(history)
+            return utility if player == 0 else -utility
+
+        if history.is_chance():
+            action = history.sample_chance_outcome(self._rng)
+            return self._external_sampling(history.child(action, cache=self._cache), player)
+
+        current_player = history.current_player()
+        info_state_node = self._info_state_node(history, current_player)
+        legal_actions = info_state_node.legal_actions
+        policy = _regret_matching(info_state_node.cumulative_regret, legal_actions)
+        policy = [policy[i] for i in range(len(legal_actions))]
+
+        if current_player != player:
+            # The average policy of the opponent is updated on its samples
+            for i in range(len(legal_actions)):
+                info_state_node.cumulative_policy[i] += policy[i]
+            action = legal_actions[self._sample(policy)]
+            return self._external_sampling(history.child(action, cache=self._cache), player)
+
+        children_values = [
+            self._external_sampling(history.child(action, cache=self._cache), player)
+            for action in legal_actions]
+        history_value = sum(p * v for p, v in zip(policy, children_values))
+        for i in range(len(legal_actions)):
+            info_state_node.cumulative_regret[i] += children_values[i] - history_value
+        return history_value
+
+    def _outcome_sampling(self, history, player, reach_prob, opponent_reach_prob,
+                          sample_prob):
+        """Sample a trajectory for player and return the importance weighted
+        value of player at the history, given the reach probs of player, of the
+        opponent and the chance, and of the sampling policy."""
+
+        if history.is_terminal():
+            utility = self._game.terminal_return(history)
+            return utility if player == 0 else -utility
+
+        if history.is_chance():
+            # The chance prob is in both opponent_reach_prob and sample_prob,
+            #   so that it is left out
+            action = history.sample_chance_outcome(self._rng)
+            return self._outcome_sampling(history.child(action, cache=self._cache), player,
+                                          reach_prob, opponent_reach_prob, sample_prob)
+
+        current_player = history.current_player()
+        info_state_node = self._info_state_node(history, current_player)
+        legal_actions = info_state_node.legal_actions
+        num_actions = len(legal_actions)
+        policy = _regret_matching(info_state_node.cumulative_regret, legal_actions)
+        policy = [policy[i] for i in range(num_actions)]
+        if current_player == player:
+            sample_policy = [self._epsilon / num_actions + (1 - self._epsilon) * p
+                             for p in policy]
+        else:
+            sample_policy = policy
+
+        a = self._sample(sample_policy)
+        if current_player == player:
+            child_value = self._outcome_sampling(
+                history.child(legal_actions[a], cache=self._cache), player,
+                reach_prob * policy[a], opponent_reach_prob, sample_prob * sample_policy[a])
+        else:
+            child_value = self._outcome_sampling(
+                history.child(legal_actions[a], cache=self._cache), player,
+                reach_prob, opponent_reach_prob * policy[a], sample_prob * sample_policy[a])
+        # The value of the sampled action is weighted by its sampling prob, and
+        #   the others are 0
+        children_values = [0.0] * num_actions
+        children_values[a] = child_value / sample_policy[a]
+        history_value = policy[a] * children_values[a]
+
+        if current_player == player:
+            weight = opponent_reach_prob / sample_prob
+            for i in range(num_actions):
+                info_state_node.cumulative_regret[i] += weight * (
+                    children_values[i] - history_value)
+                info_state_node.cumulative_policy[i] += reach_prob * policy[i] / sample_prob
+        return history_value
+
+    def current_policy(self):
+        _update_current_policy(self._current_policy, self._info_state_nodes)
+        return self._current_policy
+
+    def average_policy(self):
+        self._average_policy.action_probabilities_table = [
+            list(row) for row in self._current_policy.action_probabilities_table]
+        _update_average_policy(self._average_policy, self._info_state_nodes)
+        return self._average_policy
+
+    def _sample_iteration(self):
+        for player in range(self._num_players):
+            if self._sampling == 'external':
+                self._external_sampling(self._root_node, player)
+            else:
+                self._outcome_sampling(self._root_node, player, 1.0, 1.0, 1.0)
+
+    def _hogwild_pool(self):
+        if not hasattr(self, '_pool'):
+            self._pool = HogwildPool(self, self._num_workers)
+        return self._pool
+
+    def _hogwild_run(self, chunks):
+        """Start the chunks of iterations on the Hogwild pool, and return the
+        iterator of the new abstract info states of each chunk."""
+
+        # The seeds of the tasks are drawn from the seeded random state
+        seeds = self._rng.randint(2 ** 31 - 1, size=len(chunks))
+        return self._hogwild_pool().run(chunks, seeds)
+
+    def _split_iterations(self, num_iterations):
+        """Split the iterations into a chunk for each worker."""
+
+        return [num_iterations // self._num_workers + (w < num_iterations % self._num_workers)
+                for w in range(min(num_iterations, self._num_workers))]
+
+    def _run_iterations(self, num_iterations):
+        if self._num_workers > 1:
+            for new_info_states in self._hogwild_run(self._split_iterations(num_iterations)):
+                self._add_info_states(new_info_states)
+        else:
+            for _ in range(num_iterations):
+                self._sample_iteration()
+
+    def evaluate_and_update_policy(self):
+        """Run a sampled iteration, or one on each worker."""
+        self._run_iterations(self._num_workers)
+
+    def reset_for_epoch(self):
+        """Initialize the solver before solving the game."""
+        self._current_policy = TabularPolicy(self._game, abstraction=self._abstraction)
+        self._average_policy = self._current_policy.__copy__()
+        self._info_state_nodes = {}
+        self._shared_tables = None
+        self._new_info_states = []
+        if hasattr(self, '_pool'):  # the workers share the old tables
+            self._pool.close()
+            del self._pool
+
+    def _snapshot(self, curve, iteration, seconds):
+        # The exploitability is only computed for the games without abstraction
+        if self._abstraction is None:
+            curve.append((iteration, seconds, expl.exploitability(
+                self._game, self.average_policy())))
+            print('iteration %d, time %.3fs, exploitability %f' % curve[-1])
+
+    def train_policy(self):
+        """Solve the entire game for one epoch."""
+        self.iterations = self._num_iterations
+        curve = []
+        # The snapshots of the average policy are taken at the powers of 2
+        snapshots = [2 ** k for k in range(self.iterations.bit_length())
+                     if 2 ** k < self.iterations] + [self.iterations]
+        if self._num_workers > 1:
+            # The snapshots are taken while the workers keep running, when the
+            #   iterations finished so far pass the powers of 2, so that the
+            #   iterations of a snapshot are those it reads and the time is the
+            #   wall time
+            pool = self._hogwild_pool()
+            chunks = []
+            for previous, iteration in zip([0] + snapshots, snapshots):
+                chunks += self._split_iterations(iteration - previous)
+            start = time.time()
+            first_iteration = pool.num_iterations()
+            results = self._hogwild_run(chunks)
+            snapshot = 0
+            while snapshot < len(snapshots):
+                try:
+                    self._add_info_states(results.next(timeout=0.01))
+                except multiprocessing.TimeoutError:
+                    pass
+                num_iterations = pool.num_iterations() - first_iteration
+                if num_iterations >= snapshots[snapshot]:
+                    while snapshot < len(snapshots) and snapshots[snapshot] <= num_iterations:
+                        snapshot += 1
+                    self._snapshot(curve, num_iterations, time.time() - start)
+            for new_info_states in results:
+                self._add_info_states(new_info_states)
+        else:
+            seconds = 0.0
+            for previous, iteration in zip([0] + snapshots, snapshots):
+                start = time.time()
+                self._run_iterations(iteration - previous)
+                seconds += time.time() - start
+                self._snapshot(curve, iteration, seconds)
+        if curve:
+            save_exploitability_curve('%s-%s-%s' % (
+                self._game.name.replace(' ', ''), self.name, self._sampling), curve)
+        self.average_policy().print()
+        return self._average_policy
@@ -0,0 +1,274 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import multiprocessing
+import weakref
+
+# The state of the worker processes, which is inherited from the parent by
+#   fork when the pool is created
+_worker_state = {}
+
+
+def shared_array(shape, dtype=np.float64):
+    """Create a zero array in a new block of shared memory.
+
+    Return the array and the shared memory, which is to be closed and unlinked
+    by the creator, and the array is shared with the processes forked later.
+    """
+
+    size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    memory = shared_memory.SharedMemory(create=True, size=size)
+    array = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    array[...] = 0
+    return array, memory
+
+
+def _release(pool, memories):
+    pool.terminate()
+    for memory in memories:
+        memory.close()
+        memory.unlink()
+
+
+def _init_subtree_worker():
+    # The policy of the worker is read from the shared memory, by the rows of
+    #   the table backed by the shared array
+    solver = _worker_state['solver']
+    policy = _worker_state['arrays'][0]
+    current_policy = solver._current_policy
+    table = current_policy.action_probabilities_table
+    for row, legal_actions in enumerate(current_policy.legal_actions_list):
+        table[row] = policy[row, :len(legal_actions)]
+
+
+def _compute_subtrees(task):
+    """Compute the regret and policy sums of a worker over its subtrees with
+    the current policy in the shared memory."""
+
+    worker, player = task
+    solver = _worker_state['solver']
+    _, regrets, policy_sums = _worker_state['arrays']
+    # The info state nodes are backed by the copies of the arrays of the
+    #   parent, which are private to the forked worker
+    cumulative_regret, cumulative_policy = _worker_state['sums']
+    cumulative_regret[...] = 0
+    cumulative_policy[...] = 0
+
+    root = solver._root_node
+    for action, action_prob in _worker_state['subtrees'][worker]:
+        reach_probabilities = np.ones(solver._num_players + 1)
+        reach_probabilities[-1] = action_prob
+        solver._compute_counterfactual_regret_for_player(
+            root.child(action), reach_probabilities, player)
+
+    regrets[worker] = cumulative_regret
+    policy_sums[worker] = cumulative_policy
+
+
+class ChanceSubtreePool(object):
+    """Process pool of full-width CFR on the chance subtrees below the root.
+
+    The outcomes of the chance at the root are dealt to the workers in turn.
+    The regrets and the policy sums of the info states are padded arrays with
+    the rows of the tabular policy, which back the info state nodes of the
+    solver. For the update of a player, every worker traverses its subtrees
+    with the current policy in shared memory and writes its sums into its
+    slice of the shared arrays, which are reduced by the parent process after
+    the workers finish, followed by the regret matching of the rows of the
+    player into the shared policy.
+    """
+
+    def __init__(self, solver, num_workers):
+        """Fork the workers with a copy of a CFR solver."""
+
+        root = solver._root_node
+        assert root.is_chance(), 'the root is not a chance node'
+        assert solver._abstraction is None, 'the info states are not listed'
+
+        self.num_workers = num_workers
+        current_policy = solver._current_policy
+        legal_actions_list = current_policy.legal_actions_list
+        self._num_actions = np.array([len(a) for a in legal_actions_list])
+        shape = (len(legal_actions_list), self._num_actions.max())
+        self._legal = np.arange(shape[1]) < self._num_actions[:, None]
+        self._player_rows = [np.array([current_policy.history_lookup[key] for key in keys],
+                                      dtype=np.int64)
+                             for keys in current_policy.info_state_per_player]
+        self._policy, policy_memory = shared_array(shape)
+        self._regrets, regrets_memory = shared_array((num_workers, *shape))
+        self._policy_sums, policy_sums_memory = shared_array((num_workers, *shape))
+
+        # Move the sums so far to the arrays, and back the info state nodes
+        #   by their rows
+        self.cumulative_regret = np.zeros(shape)
+        self.cumulative_policy = np.zeros(shape)
+        for info_state_node in solver._info_state_nodes.values():
+            row = info_state_node.index_in_tabular_policy
+            for action, regret in info_state_node.cumulative_regret.items():
+                self.cumulative_regret[row, action] = regret
+            for action, policy_sum in info_state_node.cumulative_policy.items():
+                self.cumulative_policy[row, action] = policy_sum
+            info_state_node.cumulative_regret = self.cumulative_regret[row]
+            info_state_node.cumulative_policy = self.cumulative_policy[row]
+        for row, probs in enumerate(current_policy.action_probabilities_table):
+            self._policy[row, :len(probs)] = probs
+
+        outcomes = list(zip(*root.chance_outcomes()))
+        _worker_state['solver'] = solver
+        _worker_state['arrays'] = (self._policy, self._regrets, self._policy_sums)
+        _worker_state['sums'] = (self.cumulative_regret, self.cumulative_policy)
+        _worker_state['subtrees'] = [outcomes[w::num_workers] for w in range(num_workers)]
+        self._pool = multiprocessing.get_context('fork').Pool(
+            num_workers, initializer=_init_subtree_worker)
+        _worker_state.clear()
+
+        self._finalizer = weakref.finalize(
+            self, _release, self._pool,
+            [policy_memory, regrets_memory, policy_sums_memory])
+
+    def update(self, player):
+        """Add the regrets and the policy sums of the info states of a player
+        over all the subtrees, and update the current policy of player by
+        regret matching."""
+
+        self._pool.map(_compute_subtrees,
+                       [(worker, player) for worker in range(self.num_workers)])
+
+        rows = self._player_rows[player]
+        self.cumulative_regret[rows] += self._regrets[:, rows].sum(axis=0)
+        self.cumulative_policy[rows] += self._policy_sums[:, rows].sum(axis=0)
+
+        positive_regrets = np.maximum(self.cumulative_regret[rows], 0)
+        sum_positive_regrets = positive_regrets.sum(axis=1, keepdims=True)
+        uniform = self._legal[rows] / self._num_actions[rows, None]
+        self._policy[rows] = np.divide(positive_regrets, sum_positive_regrets,
+                                       out=uniform, where=sum_positive_regrets > 0)
+
+    def discount(self, weights):
+        """Discount the regrets and the policy sums by the weights of the
+        positive regrets, the negative regrets and the policy sums."""
+
+        positive_weight, negative_weight, policy_weight = weights
+        self.cumulative_regret *= np.where(
+            self.cumulative_regret > 0, positive_weight, negative_weight)
+        self.cumulative_policy *= policy_weight
+
+    def copy_policy(self, current_policy):
+        """Copy the current policy in the shared memory to a tabular policy."""
+
+        table = current_policy.action_probabilities_table
+        for row, num_actions in enumerate(self._num_actions.tolist()):
+            table[row] = self._policy[row, :num_actions].tolist()
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+
+        self._finalizer()
+
+
+# The num of the rows of the shared arrays of the abstract info states, which
+#   are hashed to the rows by their keys since they are not listed
+MAX_ABSTRACT_INFO_STATES = 1 << 20
+
+
+def shared_row(keys, key):
+    """Get the row of a key in a shared table of keys by linear probing, where
+    0 is for the empty rows, and claim an empty row for a new key.
+
+    The workers claim the rows without locks, so that two new keys may claim
+    the same row at once, which is a lost update as in Hogwild.
+    """
+
+    capacity = len(keys)
+    row = key % capacity
+    for _ in range(capacity):
+        row_key = keys[row]
+        if row_key == 0:
+            keys[row] = key
+            row_key = keys[row]
+        if row_key == key:
+            return row
+        row = (row + 1) % capacity
+    raise RuntimeError('the shared table of %d info states is full' % capacity)
+
+
+def _init_sampling_worker():
+    # Every worker counts its iterations in its own slot of the progress
+    slots = _worker_state['slots']
+    with slots.get_lock():
+        _worker_state['slot'] = slots.value
+        slots.value += 1
+
+
+def _sample_iterations(task):
+    num_iterations, seed = task
+    solver = _worker_state['solver']
+    progress, slot = _worker_state['progress'], _worker_state['slot']
+    # The forked workers would sample the same trajectories with the copied
+    #   random state, so that every task has its own seed
+    solver._rng = np.random.RandomState(seed)
+    for _ in range(num_iterations):
+        solver._sample_iteration()
+        progress[slot] += 1
+    return solver._pop_new_info_states()
+
+
+class HogwildPool(object):
+    """Process pool of MCCFR in the Hogwild style.
+
+    The regrets and the policy sums of all the info states are two arrays in
+    shared memory, with the rows of the info states in the tabular policy, or
+    the rows hashed by the keys of the abstract info states, which are added
+    by the workers as they are visited. The workers run the tasks of sampled
+    iterations at the same time and add to the arrays without locks, since the
+    updates of a sampled iteration are sparse and a lost update is rare. The
+    parent process can read the arrays at any time, e.g. for the snapshots of
+    the average policy while the workers keep running, with the num of the
+    iterations finished so far counted by the workers in shared memory.
+    """
+
+    def __init__(self, solver, num_workers):
+        """Move the tables of an MCCFR solver to shared memory and fork the
+        workers with a copy of it."""
+
+        self.num_workers = num_workers
+        if solver._abstraction is None:
+            legal_actions_list = solver._current_policy.legal_actions_list
+            shape = (len(legal_actions_list), max(len(a) for a in legal_actions_list))
+            self.keys, keys_memory = None, None
+        else:
+            shape = (MAX_ABSTRACT_INFO_STATES, solver._game.max_num_actions)
+            self.keys, keys_memory = shared_array(shape[:1], np.int64)
+        self.regrets, regrets_memory = shared_array(shape)
+        self.policy_sums, policy_sums_memory = shared_array(shape)
+        solver._share_info_state_nodes(self.regrets, self.policy_sums, self.keys)
+        self.progress, progress_memory = shared_array((num_workers,), np.int64)
+
+        context = multiprocessing.get_context('fork')
+        _worker_state['solver'] = solver
+        _worker_state['progress'] = self.progress
+        _worker_state['slots'] = context.Value('i', 0)
+        self._pool = context.Pool(num_workers, initializer=_init_sampling_worker)
+        _worker_state.clear()
+
+        memories = [regrets_memory, policy_sums_memory, progress_memory]
+        if keys_memory is not None:
+            memories.append(keys_memory)
+        self._finalizer = weakref.finalize(self, _release, self._pool, memories)
+
+    def run(self, chunks, seeds):
+        """Run the chunks of sampled iterations as tasks with the seeds of
+        their random states, and return the iterator of the new abstract info
+        states of each task as it finishes."""
+
+        return self._pool.imap_unordered(_sample_iterations, zip(chunks, seeds))
+
+    def num_iterations(self):
+        """Get the num of the iterations finished by the workers so far."""
+
+        return int(self.progress.sum())
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+
+        self._finalizer()
@@ -0,0 +1,184 @@
+from policy.policy import TabularPolicy
+from solver.solver import Solver
+from solver.cfr.cfr import cfr_variant, discount_weights, save_exploitability_curve
+from policy import exploitability as expl
+
+import numpy as np
+import time
+
+
+class VectorizedCFR(Solver):
+    """
+    Solver: VectorizedCFR
+
+    CFR with alternating updates over the compiled game tree. The regrets, the
+    current policy and the cumulative policy are 2-D arrays of shape
+    (num_info_states, max_actions), padded by the legal action masks, and each
+    iteration is a top-down pass of the reach probs and a bottom-up pass of the
+    values level by level, so that it follows CFR iteration by iteration.
+    """
+    online = False
+
+    def __init__(self, game, args):
+        self._game = game
+        self.name = args['solver']
+        self.iterations = args['n_epochs']
+        self._num_iterations = args.get('n_iterations') or 100
+        self._num_players = self._game.num_players
+        self._compiled_game = self._game.compile()
+        self._variant, self._discount = cfr_variant(args)
+        self._init_tree()
+        self.reset_for_epoch()
+
+    def _init_tree(self):
+        """Precompute the index arrays of the passes."""
+
+        game = self._compiled_game
+        self._levels = game.level_offsets
+        self._parent = np.asarray(game.parent, dtype=np.int64)
+        self._chance_prob = np.asarray(game.chance_prob)
+        self._utility = np.asarray(game.utility)
+        self._num_actions = np.asarray(game.info_state_num_actions)
+        self._legal = np.arange(self._num_actions.max()) < self._num_actions[:, None]
+
+        # The info state and the action leading to each node, and the player
+        #   who chose it, where -1 is for the chance and the roots
+        has_parent = self._parent >= 0
+        parent = np.where(has_parent, self._parent, 0)
+        self._parent_player = np.where(has_parent, game.player[parent], -1)
+        self._parent_info_state = np.maximum(
+            np.where(has_parent, game.info_state[parent], 0), 0)
+        self._edge_action = np.where(self._parent_player >= 0, game.action, 0)
+
+        # The nodes of each player sorted by the info states, so that the sums
+        #   over the histories of an info state are contiguous
+        self._player_nodes = []
+        for player in range(self._num_players):
+            nodes = np.nonzero(game.player == player)[0]
+            nodes = nodes[np.argsort(game.info_state[nodes], kind='stable')]
+            info_states = np.asarray(game.info_state[nodes], dtype=np.int64)
+            starts = np.flatnonzero(np.r_[True, info_states[1:] != info_states[:-1]])
+            children = game.child_offsets[nodes][:, None] + \
+                np.arange(self._legal.shape[1])
+            legal = self._legal[info_states]
+            self._player_nodes.append((nodes, info_states[starts], starts,
+                                       np.where(legal, children, 0), legal))
+
+        # The rows of the info states in the tabular policies
+        rows = TabularPolicy(self._game).history_lookup
+        self._policy_rows = [rows[key] for key in game.info_state_keys.tolist()]
+
+    def _regret_matching(self):
+        positive_regrets = np.maximum(self._cumulative_regret, 0)
+        sum_positive_regrets = positive_regrets.sum(axis=1, keepdims=True)
+        uniform = self._legal / self._num_actions[:, None]
+        self._policy = np.divide(positive_regrets, sum_positive_regrets,
+                                 out=uniform, where=sum_positive_regrets > 0)
+
+    def _edge_probs(self):
+        """Get the prob of the action leading to each node by the policy."""
+
+        return np.where(self._parent_player >= 0, self._policy[
+            self._parent_info_state, self._edge_action], 1.0)
+
+    def _reach_probs(self, edge_probs):
+        """Top-down pass of the reach probs of the players and the chance."""
+
+        num_nodes = len(self._parent)
+        factors = np.empty((self._num_players + 1, num_nodes))
+        for player in range(self._num_players):
+            factors[player] = np.where(self._parent_player == player, edge_probs, 1.0)
+        factors[-1] = self._chance_prob
+
+        reach_probs = np.empty_like(factors)
+        reach_probs[:, :self._levels[1]] = factors[:, :self._levels[1]]
+        reach_probs[:-1, :self._levels[1]] = 1.0
+        for d in range(1, len(self._levels) - 1):
+            level = slice(self._levels[d], self._levels[d + 1])
+            reach_probs[:, level] = reach_probs[:, self._parent[level]] * factors[:, level]
+
+        return reach_probs
+
+    def _values(self, edge_probs):
+        """Bottom-up pass of the values of player 0."""
+
+        values = self._utility.copy()
+        weights = edge_probs * self._chance_prob
+        for d in range(len(self._levels) - 2, 0, -1):
+            begin, end = self._levels[d - 1], self._levels[d]
+            level = slice(self._levels[d], self._levels[d + 1])
+            values[begin:end] += np.bincount(
+                self._parent[level] - begin, weights[level] * values[level],
+                minlength=end - begin)
+
+        return values
+
+    def _update_regrets(self, player):
+        edge_probs = self._edge_probs()
+        reach_probs = self._reach_probs(edge_probs)
+        values = self._values(edge_probs)
+        if player != 0:
+            values = -values
+
+        nodes, info_states, starts, children, legal = self._player_nodes[player]
+        counterfactual_reach_probs = np.prod(np.delete(
+            reach_probs[:, nodes], player, axis=0), axis=0)
+        regrets = counterfactual_reach_probs[:, None] * \
+            (values[children] - values[nodes][:, None]) * legal
+        self._cumulative_regret[info_states] += np.add.reduceat(regrets, starts)
+        self._cumulative_policy[info_states] += np.add.reduceat(
+            reach_probs[player, nodes], starts)[:, None] * self._policy[info_states]
+
+    def _to_tabular_policy(self, probs):
+        policy = TabularPolicy(self._game)
+        for row, info_state_probs, num_actions in zip(
+                self._policy_rows, probs.tolist(), self._num_actions.tolist()):
+            policy.action_probabilities_table[row] = info_state_probs[:num_actions]
+        return policy
+
+    def current_policy(self):
+        return self._to_tabular_policy(self._policy)
+
+    def average_policy(self):
+        probabilities_sum = self._cumulative_policy.sum(axis=1, keepdims=True)
+        uniform = self._legal / self._num_actions[:, None]
+        return self._to_tabular_policy(np.divide(
+            self._cumulative_policy, probabilities_sum, out=uniform,
+            where=probabilities_sum > 0))
+
+    def evaluate_and_update_policy(self):
+        self._iteration += 1
+        for player in range(self._num_players):
+            self._update_regrets(player)
+            self._regret_matching()
+        if self._variant != 'vanilla':
+            positive_weight, negative_weight, policy_weight = discount_weights(
+                self._iteration, self._discount)
+            self._cumulative_regret *= np.where(
+                self._cumulative_regret > 0, positive_weight, negative_weight)
+            self._cumulative_policy *= policy_weight
+
+    def reset_for_epoch(self):
+        """Initialize the solver before solving the game."""
+        self._cumulative_regret = np.zeros(self._legal.shape)
+        self._cumulative_policy = np.zeros(self._legal.shape)
+        self._iteration = 0
+        self._regret_matching()
+
+    def train_policy(self):
+        """Solve the entire game for one epoch."""
+        self.iterations = self._num_iterations
+        curve = []
+        seconds = 0.0
+        for i in range(self.iterations):
+            start = time.time()
+            self.evaluate_and_update_policy()
+            seconds += time.time() - start
+            # Evaluate at the powers of 2 for the exploitability curve
+            if (i + 1) & i == 0 or i + 1 == self.iterations:
+                curve.append((i + 1, seconds, expl.exploitability(
+                    self._game, self.average_policy())))
+                print('iteration %d, time %.3fs, exploitability %f' % curve[-1])
+        save_exploitability_curve('%s-%s-%s' % (
+            self._game.name.replace(' ', ''), self.name, self._variant), curve)
+        return self.average_policy()
@@ -149,7 +149,7 @@ class POMCP(Solver):
                 and depth <= root.depth + self.max_depth:
             # For a new node, initialize its children, then choose a child as normal
             if not current_node.children:
-                legal_actions = working_state.legal_actions()
+                legal_actions = list(working_state.legal_actions())
                 # Reduce bias from move generation order.
                 np.random.shuffle(legal_actions)
                 current_node.children = [
@@ -0,0 +1,16 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env.compiled_game as compiled_game
+
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def cache_dir(tmp_path_factory):
+    """Keep the caches of the tests out of the cache of the repo."""
+
+    directory = tmp_path_factory.mktemp('cache')
+    cache_dir, compiled_game.CACHE_DIR = compiled_game.CACHE_DIR, str(directory)
+    yield directory
+    compiled_game.CACHE_DIR = cache_dir
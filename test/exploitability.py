@@ -29,7 +29,7 @@ class BRPolicy(TabularPolicy):
     def info_sets(self, history):
         infosets = collections.defaultdict(list)
         for s, p in self.decision_nodes(history):
-            infosets[s.get_info_state()[self._player_id].to_string()].append((s, p))
+            infosets[s.get_info_state()[self._player_id].key].append((s, p))
         return dict(infosets)
 
     def decision_nodes(self, parent_history):
@@ -52,7 +52,7 @@ class BRPolicy(TabularPolicy):
         if history.is_terminal():
             return history.get_return()*(1-2*self._player_id)
         elif history.current_player == self._player_id:
-            action = self.br_action(history.get_info_state()[self._player_id].to_string())
+            action = self.br_action(history.get_info_state()[self._player_id].key)
             return self.q_value(history, action)
         else:
             return sum(p * self.q_value(history, a) for a, p in self.transitions(history))
@@ -0,0 +1,76 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+from env.texas_holdem.abstraction import CardAbstraction, river_equities
+from env.texas_holdem.equity import conflict_matrix, equity_matrix
+from env.texas_holdem.texas_holdem_char import *
+from policy.policy import TabularPolicy
+import numpy as np
+
+
+def test_river_equities():
+    board = [0, 14, 28, 40, 51]
+    win, tie = equity_matrix(board)
+    valid = ~blocked_combos(card_mask(board))
+    opponents = valid & ~conflict_matrix()
+    expected = ((win + tie / 2) * opponents).sum(axis=1) / np.maximum(opponents.sum(axis=1), 1)
+    assert np.allclose(river_equities(board), np.where(valid, expected, 0))
+
+
+def test_abstract_tabular_policy():
+    abstraction = CardAbstraction((3, 4, 4, 4), num_boards=3, num_runouts=5)
+    assert abstraction.bucket([0, 13], []) == 2  # AA
+    assert abstraction.bucket([6, 14], []) == 0  # 72o
+    assert abstraction.bucket([0, 13], [26, 39, 1, 2, 3]) == 3  # quads
+
+    game = env_module.TexasHoldem()
+    policy = TabularPolicy(game, abstraction=abstraction)
+    np.random.seed(0)
+    for _ in range(20):
+        history = game.initial_history()
+        while not history.is_terminal():
+            if history.is_chance():
+                action = history.sample_chance_outcome()
+            else:
+                legal_actions, probs = policy.action_probabilities(history, None)
+                assert len(legal_actions) == len(probs)
+                action = legal_actions[np.random.randint(len(legal_actions))]
+            history = history.child(action)
+    # The abstract info states of the different deals are shared
+    assert len(policy.history_lookup) < 100
+    assert all(len(p) == len(a) for p, a in zip(
+        policy.action_probabilities_table, policy.legal_actions_list))
+
+
+def test_abstraction_buckets_of_isomorphic_boards(tmp_path):
+    abstraction = CardAbstraction((3, 4, 4, 4), num_boards=3, num_runouts=5)
+    rng = np.random.RandomState(0)
+    suits = rng.permutation(4)
+    for num_cards in [3, 4, 5]:
+        cards = rng.choice(52, num_cards + 2, replace=False)
+        permuted = suits[cards // 13] * 13 + cards % 13
+        assert abstraction.bucket(cards[:2], cards[2:].tolist()) == \
+            abstraction.bucket(permuted[:2], permuted[2:].tolist())
+
+    # The buckets of the representative boards are saved with the centroids
+    abstraction.save(str(tmp_path))
+    loaded = CardAbstraction.load(str(tmp_path), num_runouts=5)
+    assert len(loaded._canonical_buckets) == 2  # of the flop and the turn
+    board = cards[2:6].tolist()
+    assert np.array_equal(loaded.board_buckets(board), abstraction.board_buckets(board))
+
+
+def test_abstract_info_state_key_of_flat_history():
+    from env.history import History
+
+    abstraction = CardAbstraction((3, 4, 4, 4), num_boards=3, num_runouts=5)
+    game = env_module.TexasHoldem()
+    history = game.initial_history().child(Action(deal=[0, 1, 13, 14]))
+    history = history.child(history.legal_actions()[2])
+    history = history.child(history.legal_actions()[1])
+    history = history.child(Action(deal=[2, 3, 4]))
+    flat_history = History(history.records(), game)
+    for player in [0, 1]:
+        assert abstraction.info_state_key(history, player) == \
+            abstraction.info_state_key(flat_history, player)
@@ -0,0 +1,94 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+from env.texas_holdem.texas_holdem_char import Action, FLOP, TURN, canonicalize
+import numpy as np
+import collections
+import itertools
+
+
+def test_texas_holdem_chance_outcomes_are_lazy():
+    game = env_module.TexasHoldem()
+    state = game.initial_state()
+    # Suit-isomorphic deals are merged, which are about 1/18 of all deals
+    assert state.num_chance_outcomes() < 52 * 51 * 50 * 49 // 10
+
+    rng = np.random.RandomState(0)
+    action = game.sample_chance_outcome(state, rng)
+    assert len(set(action.deal)) == 4
+
+    # Deal until the turn, where the outcomes are few enough to list
+    state = game.step(state, action).next_state
+    while not (state.is_chance() and state.phase == TURN):
+        if state.is_chance():
+            state = game.step(state, state.sample_chance_outcome(rng)).next_state
+        else:
+            state = game.step(state, state.legal_actions()[1]).next_state
+    action_list, prob_list = state.chance_outcomes()
+    assert len(action_list) == state.num_chance_outcomes() <= 52 - 7
+    assert [a for a, _ in state.iter_chance_outcomes()] == action_list
+    assert np.isclose(sum(prob_list), 1)
+    dealed_card = [*state.hand[0], *state.hand[1], *state.pub]
+    for _ in range(100):
+        assert state.sample_chance_outcome(rng).deal[0] not in dealed_card
+
+
+def test_texas_holdem_canonical_deals_cover_all_deals():
+    game = env_module.TexasHoldem()
+    state = game.initial_state()
+    rng = np.random.RandomState(1)
+    while not (state.is_chance() and state.phase == FLOP):
+        if state.is_chance():
+            state = game.step(state, state.sample_chance_outcome(rng)).next_state
+        else:
+            state = game.step(state, state.legal_actions()[1]).next_state
+
+    # Count the class sizes by canonicalizing all the deals of the flop
+    dealed_card = [*state.hand[0], *state.hand[1]]
+    class_sizes = collections.Counter(
+        tuple(canonicalize(list(deal), dealed_card)[0]) for deal in
+        itertools.permutations(state.remaining_cards(), 3))
+    num_deals = sum(class_sizes.values())
+    outcomes = {tuple(action.deal): prob
+                for action, prob in state.iter_chance_outcomes()}
+    assert len(outcomes) == state.num_chance_outcomes() == len(class_sizes)
+    for deal, class_size in class_sizes.items():
+        assert np.isclose(outcomes[deal], class_size / num_deals)
+
+
+def test_texas_holdem_isomorphic_histories_share_info_states():
+    game = env_module.TexasHoldem()
+    history = game.initial_history()
+    # Swap the suits of the hand of player 2, which player 1 can not tell
+    history_a = history.child(Action(deal=[0, 1, 13, 14]))
+    history_b = history.child(Action(deal=[0, 1, 26, 27]))
+    assert history_a.get_info_state()[0] == history_b.get_info_state()[0]
+    assert history_a.get_info_state()[1] == history_b.get_info_state()[1]
+    assert history_a.get_public_state() == history_b.get_public_state()
+
+
+def test_texas_holdem_card_observations_are_not_interned():
+    from env.environment import _interned
+
+    game = env_module.TexasHoldem()
+    rng = np.random.RandomState(0)
+    num_interned = len(_interned)
+    for _ in range(10):
+        history = game.initial_history()
+        while not history.is_terminal():
+            if history.is_chance():
+                history = history.child(history.sample_chance_outcome(rng))
+            else:
+                history = history.child(history.legal_actions()[1])
+    assert len(_interned) == num_interned
+
+
+def test_sample_chance_outcome_follows_chance_outcomes():
+    game = env_module.LeducPoker()
+    history = game.initial_history()
+    action_list, _ = history.chance_outcomes()
+    samples = [history.sample_chance_outcome(np.random.RandomState(i))
+               for i in range(100)]
+    assert all(action in action_list for action in samples)
+    assert history[-1].next_state.num_chance_outcomes() == len(action_list)
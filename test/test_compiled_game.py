@@ -0,0 +1,71 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+from env.compiled_game import CompiledGame
+from policy.policy import TabularPolicy
+
+import numpy as np
+
+
+def test_compiled_game_matches_histories():
+    game = env_module.LeducPoker()
+    compiled = CompiledGame(game)
+    histories = game.get_all_histories()
+    assert compiled.num_nodes == len(histories)
+    assert [h.key for h in compiled.histories] == [h.key for h in histories]
+
+    for node in range(compiled.num_nodes):
+        for child in compiled.children(node):
+            assert compiled.parent[child] == node
+            assert compiled.depth[child] == compiled.depth[node] + 1
+    assert not compiled.is_leaf().any()
+
+    policy = TabularPolicy(game)
+    assert sorted(compiled.info_state_keys) == sorted(policy.history_lookup)
+    terminal = compiled.player == -2
+    assert np.allclose(compiled.utility[terminal], [
+        h.get_return() for h in np.array(histories, dtype=object)[terminal]])
+
+
+def test_compiled_subtree_save_and_load(tmp_path):
+    game = env_module.KuhnPoker()
+    pbs = game.initial_pbs()
+    compiled = CompiledGame(game, roots=pbs.history_list, max_depth=1,
+                            root_probs=[pbs.prob_dict[h.key] for h in pbs.history_list])
+    assert compiled.is_leaf().sum() == 2 * len(pbs.history_list)
+
+    compiled.save(str(tmp_path))
+    loaded = CompiledGame.load(str(tmp_path))
+    for name in CompiledGame.NODE_ARRAYS + CompiledGame.TABLE_ARRAYS:
+        assert np.array_equal(getattr(loaded, name), getattr(compiled, name))
+    assert isinstance(loaded.parent, np.memmap)
+
+
+def test_compiled_game_cache(tmp_path):
+    game = env_module.KuhnPoker()
+    compiled = CompiledGame.from_cache(game, cache_dir=str(tmp_path))
+    assert compiled.histories is not None
+    cached = CompiledGame.from_cache(game, cache_dir=str(tmp_path))
+    assert cached.histories is None
+    assert np.array_equal(cached.info_state_keys, compiled.info_state_keys)
+    assert cached.info_state_strings == compiled.info_state_strings
+
+    # Changing a parameter of the env invalidates the cache
+    game.name = 'KuhnPoker2'
+    CompiledGame.from_cache(game, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_compiled_game_cache_prunes_old_versions(tmp_path):
+    game = env_module.LeducPoker()
+    (tmp_path / 'LeducPoker-0123456789abcdef-0123456789abcdef').mkdir()
+    (tmp_path / 'LeducPoker-0123456789abcdef-0123456789abcdef.tmp1').mkdir()
+    (tmp_path / 'KuhnPoker-0123456789abcdef-0123456789abcdef').mkdir()
+    CompiledGame.from_cache(game, cache_dir=str(tmp_path))
+
+    # Only the stale version of the env is removed
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert len(names) == 3
+    assert 'LeducPoker-0123456789abcdef-0123456789abcdef' not in names
+    assert 'LeducPoker-0123456789abcdef-0123456789abcdef.tmp1' in names
@@ -0,0 +1,82 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+from env.texas_holdem.equity import *
+from env.texas_holdem.texas_holdem_char import *
+import numpy as np
+
+
+def test_equity_matrix_matches_runouts():
+    board = [0, 14, 28, 42]
+    win, tie = equity_matrix(board)
+    total = win + win.T + tie
+    assert np.allclose(total[total > 0], 1)
+    assert (total[blocked_combos(card_mask(board))] == 0).all()
+
+    # Count the river cards for a pair of hands one by one
+    evaluator = get_evaluator()
+    hand_0, hand_1 = [10, 11], [20, 33]
+    results = [np.sign(evaluator.evaluate([*hand_0, *board, c]) -
+                       evaluator.evaluate([*hand_1, *board, c]))
+               for c in range(52) if c not in board + hand_0 + hand_1]
+    i, j = COMBO_INDEX[10, 11], COMBO_INDEX[20, 33]
+    assert np.isclose(win[i, j], results.count(1) / len(results))
+    assert np.isclose(tie[i, j], results.count(0) / len(results))
+
+    # A single hand against a range is the row of the matrix
+    opponent_range = np.random.RandomState(0).rand(NUM_HAND_COMBOS)
+    hand_win, hand_tie = hand_equity(hand_0, opponent_range, board)
+    weights = np.where(blocked_combos(card_mask(hand_0 + board)), 0, opponent_range)
+    assert np.isclose(hand_win, win[i] @ weights / weights.sum())
+    assert np.isclose(hand_tie, tie[i] @ weights / weights.sum())
+
+
+def test_terminal_values_are_zero_sum():
+    import env as env_module
+
+    game = env_module.TexasHoldem()
+    pbs = game.initial_pbs()
+    while not pbs.is_terminal():
+        if pbs.is_chance():
+            pbs = pbs.child(pbs.history.sample_chance_outcome(np.random.RandomState(0)))
+        else:
+            policy = np.ones((NUM_HAND_COMBOS, len(pbs.legal_actions())))
+            pbs = pbs.child(pbs.legal_actions()[1], policy)  # call
+    values = game.terminal_values(pbs)
+    assert np.isclose(values[0] @ pbs.ranges[0] + values[1] @ pbs.ranges[1], 0)
+
+
+def test_preflop_table():
+    import env as env_module
+
+    game = env_module.TexasHoldem()
+    aces, kings, seven_two = [0, 13], [12, 25], [6, 14]
+    assert preflop_class_string(preflop_class(aces)) == 'AA'
+    assert preflop_class_string(preflop_class(seven_two)) == '72o'
+    assert abs(game.preflop_equity(aces, kings) - 0.82) < 0.02
+    assert abs(game.preflop_equity(aces, kings) + game.preflop_equity(kings, aces) - 1) < 1e-9
+    uniform = np.full(NUM_HAND_COMBOS, 1 / NUM_HAND_COMBOS)
+    assert abs(game.preflop_range_equity(aces, uniform) - 0.85) < 0.01
+    assert game.preflop_bucket(aces) > game.preflop_bucket(seven_two)
+
+
+def test_lbr_win_probability_preflop_matches_hand_equity():
+    import env as env_module
+    from env.texas_holdem.texas_holdem_char import Action
+    from policy.lbr import LBRagent
+
+    game = env_module.TexasHoldem()
+    agent = LBRagent.__new__(LBRagent)
+    agent.game, agent._idx = game, 0
+    aces = [0, 13]
+    opponent_hands = [[12, 25], [6, 14], [4, 30]]
+    histories = [game.initial_history().child(Action(deal=aces + hand))
+                 for hand in opponent_hands]
+    opponent_range = [0.5, 0.3, 0.2]
+
+    hand_range = np.zeros(NUM_HAND_COMBOS)
+    for hand, p in zip(opponent_hands, opponent_range):
+        hand_range[COMBO_INDEX[hand[0], hand[1]]] = p
+    win, tie = hand_equity(aces, hand_range, [], num_samples=4000,
+                           rng=np.random.RandomState(0))
+    assert abs(agent._win_probability(histories, opponent_range) - (win + tie / 2)) < 0.02
@@ -0,0 +1,61 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+from env.texas_holdem.hand_evaluator import *
+from env.texas_holdem.texas_holdem_char import INT2STRING_CARD
+import numpy as np
+import itertools
+
+
+def _cards(string):
+    """Get the cards of a string such like 'CA D10 HK'."""
+
+    string2card = {v: k for k, v in INT2STRING_CARD.items()}
+    return [string2card[s] for s in string.split()]
+
+
+def test_card_types():
+    evaluator = get_evaluator()
+    hands = ['C10 CJ CQ CK CA D2 H3',  # straight flush
+             'C9 C10 CJ CQ CK D2 H3',
+             'CA C2 C3 C4 C5 D9 H9',  # the lowest straight flush
+             'C9 D9 H9 S9 CK D2 H3',  # four of a kind
+             'C9 D9 H9 SK CK D2 H3',  # full house
+             'C9 D9 H9 S2 CK D2 H3',
+             'C2 C5 C7 C9 CJ D9 H9',  # flush
+             'C9 D10 HJ SQ CK D2 H2',  # straight
+             'CA D2 H3 S4 C5 DK HK',  # the lowest straight
+             'C9 D9 H9 S2 CK DQ H3',  # three of a kind
+             'C9 D9 HK SK CA D2 H3',  # two pairs
+             'C9 D9 HK SK CQ D2 H3',
+             'C9 D9 HK SA CQ D2 H3',  # one pair
+             'C9 D10 HK SA CQ D2 H3']  # high card
+    types = [STRAIGHT_FLUSH] * 3 + [FOUR_OF_A_KIND] + [FULL_HOUSE] * 2 + \
+        [FLUSH] + [STRAIGHT] * 2 + [THREE_OF_A_KIND] + [TWO_PAIRS] * 2 + \
+        [ONE_PAIR, HIGH_CARD]
+    strengths = [evaluator.evaluate(_cards(hand)) for hand in hands]
+    assert [card_type(s) for s in strengths] == types
+    assert strengths == sorted(strengths, reverse=True)
+    assert len(set(strengths)) == len(strengths)
+
+
+def test_seven_cards_are_the_best_five_cards():
+    evaluator = get_evaluator()
+    rng = np.random.RandomState(0)
+    hands = np.array([rng.choice(52, 7, replace=False) for _ in range(2000)])
+    strengths = evaluator.evaluate_batch(hands)
+    for hand, value in zip(hands.tolist(), strengths.tolist()):
+        assert evaluator.evaluate(hand) == value
+    for hand, value in zip(hands[:200].tolist(), strengths[:200].tolist()):
+        assert value == max(evaluator.evaluate(list(five))
+                            for five in itertools.combinations(hand, 5))
+
+
+def test_evaluate_mask():
+    from env.texas_holdem.texas_holdem_char import card_mask
+
+    evaluator = get_evaluator()
+    rng = np.random.RandomState(1)
+    for _ in range(2000):
+        hand = rng.choice(52, 7, replace=False).tolist()
+        assert evaluator.evaluate_mask(card_mask(hand)) == evaluator.evaluate(hand)
@@ -0,0 +1,127 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+
+
+def test_persistent_history_matches_flat_history():
+    game = env_module.LeducPoker()
+    for history in game.get_all_histories():
+        flat = list(history)
+        assert len(history) == len(flat)
+        assert history[-1] is flat[-1]
+        assert all(history[i] is flat[i] for i in range(-len(flat), len(flat)))
+        assert history[1:] == flat[1:]
+        assert history.get_return() == sum(record.reward for record in flat)
+
+
+def test_persistent_history_info_state():
+    game = env_module.KuhnPoker()
+    for history in game.get_all_histories():
+        if len(history) < 2:
+            continue
+        parent = history._parent
+        for player in [0, 1]:
+            info_state = history.get_info_state()[player]
+            assert info_state[:-2] == list(parent.get_info_state()[player])
+        assert history.get_public_state()[:-1] == list(parent.get_public_state())
+
+
+def test_indexed_histories_match_full_scan():
+    game = env_module.KuhnPoker()
+    histories = game.get_all_histories()
+    for history in histories:
+        public_state = history.get_public_state()
+        assert public_state.get_all_histories() == \
+            [h for h in histories if h.get_public_state() == public_state]
+        for player in [0, 1]:
+            info_state = history.get_info_state()[player]
+            assert info_state.get_all_histories() == \
+                [h for h in histories if h.get_info_state()[player] == info_state]
+
+
+def test_iter_histories_orders_and_depths():
+    game = env_module.LeducPoker()
+    bfs_keys = [h.key for h in game.iter_histories(order='bfs')]
+    dfs_keys = [h.key for h in game.iter_histories(order='dfs', cache=False)]
+    assert sorted(bfs_keys) == sorted(dfs_keys)
+    assert bfs_keys == [h.key for h in game.get_all_histories()]
+
+    shallow = game.get_all_histories(max_depth=3)
+    assert all(len(h) <= 3 for h in shallow)
+    assert len(shallow) < len(game.get_all_histories())
+
+
+def test_states_and_observations_are_immutable_and_hashable():
+    import copy
+    import pickle
+    import pytest
+
+    game = env_module.LeducPoker()
+    histories = game.get_all_histories()
+    assert len({h[-1].next_state for h in histories}) == \
+        len({h[-1].next_state.to_string() for h in histories})
+    for record in histories[-1]:
+        for item in [record.next_state, record.action, *record.obs]:
+            if item is None:
+                continue
+            assert not hasattr(item, '__dict__')
+            assert pickle.loads(pickle.dumps(item)) == item
+            assert hash(copy.deepcopy(item)) == hash(item)
+    with pytest.raises(AttributeError):
+        histories[-1][-1].next_state.player = 0
+
+
+def test_persistent_history_is_not_changed_as_a_list():
+    import pytest
+
+    game = env_module.KuhnPoker()
+    root = game.initial_history()
+    history = root.child(root.legal_actions()[0])
+    for change in [lambda h: h.append(h[-1]), lambda h: h.extend([h[-1]]),
+                   lambda h: h.pop(), lambda h: h.insert(0, h[-1]),
+                   lambda h: h.__setitem__(0, h[-1]), lambda h: h.__iadd__([h[-1]])]:
+        with pytest.raises(TypeError):
+            change(history)
+    assert len(history) == 2
+    assert history + [] == list(history)
+    assert history[-1] in history and history.index(history[-1]) == 1
+
+
+def test_keys_are_hashed_from_the_encodings():
+    game = env_module.LeducPoker()
+    histories = game.get_all_histories()
+    assert len({h.key for h in histories}) == len({h.to_string() for h in histories})
+    for player in [0, 1]:
+        info_states = [h.get_info_state()[player] for h in histories]
+        assert len({s.key for s in info_states}) == len({s.to_string() for s in info_states})
+    public_states = [h.get_public_state() for h in histories]
+    assert len({s.key for s in public_states}) == len({s.to_string() for s in public_states})
+
+
+
+def test_keys_do_not_build_strings(monkeypatch):
+    from env.history import History
+    from env.leduc_poker import leduc_poker_char
+
+    def to_string(self):
+        raise AssertionError('a string is built for a key')
+
+    for cls in [leduc_poker_char.WorldState, leduc_poker_char.Action,
+                leduc_poker_char.PrivateObservation, leduc_poker_char.PublicObservation]:
+        monkeypatch.setattr(cls, 'to_string', to_string)
+    game = env_module.LeducPoker()
+    history = game.initial_history()
+    while not history.is_terminal():
+        history = history.child(history.legal_actions()[-1], cache=False)
+        history.get_info_state()
+        history.get_public_state()
+        history.action_key()
+
+    # The keys of the flat histories are hashed from scratch in the same way
+    flat = History(history.records(), game)
+    assert flat.key == history.key
+    assert flat.action_key() == history.action_key()
+    for player in [0, 1]:
+        assert flat.get_info_state()[player].key == history.get_info_state()[player].key
+    assert flat.get_public_state().key == history.get_public_state().key
@@ -0,0 +1,81 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+from solver.cfr.mccfr import MCCFR
+from policy.exploitability import exploitability
+from policy.policy import TabularPolicy
+
+
+def test_mccfr_converges_on_kuhn_poker():
+    game = env_module.KuhnPoker()
+    uniform = exploitability(game, TabularPolicy(game))
+    for sampling, iterations, bound in [('external', 500, 0.05),
+                                        ('outcome', 2000, 0.1)]:
+        solver = MCCFR(game, {'solver': 'MCCFR', 'n_epochs': 1,
+                              'mccfr_sampling': sampling, 'seed': 0})
+        for _ in range(iterations):
+            solver.evaluate_and_update_policy()
+        assert exploitability(game, solver.average_policy()) < min(bound, uniform)
+        policy = solver.current_policy()
+        assert all(abs(sum(row) - 1) < 1e-9 for row in policy.action_probabilities_table)
+
+
+def test_hogwild_mccfr():
+    game = env_module.KuhnPoker()
+    solver = MCCFR(game, {'solver': 'MCCFR', 'n_epochs': 1, 'workers': 2})
+    solver._run_iterations(1000)
+    pool = solver._hogwild_pool()
+    # The tables of the info states are the rows of the shared arrays
+    assert pool.policy_sums.sum() > 0
+    assert exploitability(game, solver.average_policy()) < 0.05
+    solver.reset_for_epoch()
+    assert not hasattr(solver, '_pool')
+
+
+def test_hogwild_mccfr_train_policy(monkeypatch):
+    import solver.cfr.mccfr as mccfr
+
+    curves = []
+    monkeypatch.setattr(mccfr, 'save_exploitability_curve',
+                        lambda name, curve: curves.append(curve))
+    game = env_module.KuhnPoker()
+    solver = MCCFR(game, {'solver': 'MCCFR', 'n_epochs': 1, 'workers': 2,
+                          'n_iterations': 5, 'seed': 0})
+    policy = solver.train_policy()
+    # The snapshots are taken while the workers keep running, at the num of
+    #   the iterations finished so far
+    iterations = [iteration for iteration, _, _ in curves[0]]
+    assert iterations == sorted(set(iterations)) and iterations[-1] == 5
+    assert curves[0][-1][-1] == exploitability(game, policy)
+
+    # The seeds of the workers are drawn from the seed of the solver
+    tables = []
+    for _ in range(2):
+        solver = MCCFR(game, {'solver': 'MCCFR', 'n_epochs': 1, 'workers': 2, 'seed': 0})
+        list(solver._hogwild_run([200]))
+        tables.append(solver.average_policy().action_probabilities_table)
+        solver.reset_for_epoch()
+    assert tables[0] == tables[1]
+
+
+def test_hogwild_mccfr_with_abstraction():
+    from env.texas_holdem.abstraction import CardAbstraction
+    import numpy as np
+
+    game = env_module.TexasHoldem()
+    game._card_abstractions = {
+        (3, 4, 4, 4): CardAbstraction((3, 4, 4, 4), num_boards=3, num_runouts=5)}
+    solver = MCCFR(game, {'solver': 'MCCFR', 'n_epochs': 1, 'workers': 2,
+                          'n_buckets': '3,4,4,4', 'seed': 0})
+    solver._run_iterations(4)
+    pool = solver._hogwild_pool()
+    # The abstract info states added by the workers are hashed to the rows
+    #   of the shared arrays, and added to the tables of the parent
+    rows = np.flatnonzero(pool.keys)
+    assert set(pool.keys[rows].tolist()) == set(solver._info_state_nodes)
+    assert pool.policy_sums[rows].sum() > 0
+    policy = solver.average_policy()
+    assert len(policy.action_probabilities_table) == len(rows)
+    assert all(abs(sum(row) - 1) < 1e-9 for row in policy.action_probabilities_table)
+    solver.reset_for_epoch()
@@ -0,0 +1,22 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+from solver.cfr.cfr import CFR
+
+import numpy as np
+
+
+def test_parallel_cfr_matches_serial():
+    game = env_module.LeducPoker()
+    serial = CFR(game, {'solver': 'CFR', 'n_epochs': 1})
+    parallel = CFR(game, {'solver': 'CFR', 'n_epochs': 1, 'workers': 2})
+    for _ in range(3):
+        serial.evaluate_and_update_policy()
+        parallel.evaluate_and_update_policy()
+    parallel._chance_subtree_pool().close()
+
+    expected = serial.average_policy().action_probabilities_table
+    result = parallel.average_policy().action_probabilities_table
+    for row, expected_row in zip(result, expected):
+        assert np.allclose(row, expected_row, atol=1e-12)
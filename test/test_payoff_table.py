@@ -0,0 +1,22 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+import numpy as np
+
+
+def test_payoff_table_matches_returns():
+    for game, num_sequences in [(env_module.KuhnPoker(), 5), (env_module.LeducPoker(), 17),
+                                (env_module.LeducPoker(num_ranks=2, num_raises=2, num_rounds=3), 249)]:
+        table = game.payoff_table()
+        assert len(table.sequences) == num_sequences
+        terminals = [h for h in game.get_all_histories() if h.is_terminal()]
+        for history in terminals:
+            assert game.terminal_return(history) == history.get_return()
+
+        # Evaluate all the terminals at once
+        states = [h[-1].next_state for h in terminals]
+        values = table.values([s.hand for s in states],
+                              [getattr(s, 'pub', ()) for s in states],
+                              [table.sequence_id(h) for h in terminals])
+        assert np.array_equal(values, [h.get_return() for h in terminals])
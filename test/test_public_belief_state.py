@@ -0,0 +1,88 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+from env.texas_holdem.texas_holdem_char import *
+import numpy as np
+
+
+def test_texas_holdem_range_public_belief_state():
+    game = env_module.TexasHoldem()
+    pbs = game.initial_pbs()
+    assert pbs.ranges.shape == (2, NUM_HAND_COMBOS)
+    assert game.get_tensor(pbs).shape == (11 + 2 * NUM_HAND_COMBOS,)
+
+    # The range of the acting player is multiplied by the policy column
+    rng = np.random.RandomState(0)
+    policy = rng.dirichlet(np.ones(len(pbs.legal_actions())), NUM_HAND_COMBOS)
+    child = pbs.child(pbs.legal_actions()[1], policy)
+    expected = pbs.ranges[1] * policy[:, 1]
+    assert np.allclose(child.ranges[1], expected / expected.sum())
+    assert np.allclose(child.ranges[0], pbs.ranges[0])
+
+    # The hands blocked by the public cards are masked out after the flop
+    policy = np.ones((NUM_HAND_COMBOS, len(child.legal_actions())))
+    child = child.child(child.legal_actions()[1], policy)
+    assert child.is_chance()
+    flop = child.child(Action(deal=[0, 13, 26]))
+    blocked = (HAND_COMBOS == 0).any(1) | (HAND_COMBOS == 13).any(1) | \
+        (HAND_COMBOS == 26).any(1)
+    assert (flop.ranges[:, blocked] == 0).all()
+    assert np.allclose(flop.ranges.sum(1), 1)
+    assert np.isclose(flop.ranges[0, COMBO_INDEX[1, 2]],
+                      1 / (NUM_HAND_COMBOS - blocked.sum()))
+
+
+def test_texas_holdem_depth_limited_subgame():
+    from solver.cfr.cfr import RangeDepthLimited_CFR
+    import torch
+
+    np.random.seed(0)
+    game = env_module.TexasHoldem()
+    pbs = game.initial_pbs()
+    net = torch.nn.Linear(game.get_tensor(pbs).shape[0], pbs.ranges.size)
+    solver = RangeDepthLimited_CFR(game, net, pbs, max_depth=2, iteration_num=4)
+    policy = solver.train_policy()
+    assert len(policy.range_table) == 3
+    for probs in policy.range_table.values():
+        assert probs.shape[0] == NUM_HAND_COMBOS
+        assert np.allclose(probs.sum(1), 1)
+
+    # The policy of the public state is looked up by the hand of a history
+    history = game.initial_history().child(Action(deal=[0, 1, 13, 14]))
+    legal_actions, probs = policy.action_probabilities(history, 1)
+    assert legal_actions == history.legal_actions()
+    assert np.allclose(probs, policy.policy_for_key(
+        history.get_public_state().key)[COMBO_INDEX[13, 14]])
+
+    tensor, label = solver.get_training_data()
+    assert tensor.shape == game.get_tensor(pbs).shape
+    assert label.shape == (2 * NUM_HAND_COMBOS,)
+    assert not solver.next_pbs.is_chance()
+
+
+def test_texas_holdem_hand_index_after_flop():
+    from policy.policy import RangePolicy
+
+    # The flop of the world history is canonical with the hands, but not on
+    #   its own, so the hand is relabeled like the canonical public cards
+    game = env_module.TexasHoldem()
+    history = game.initial_history().child(Action(deal=[0, 1, 13, 14]))
+    pbs = game.initial_pbs()
+    for _ in range(2):
+        history = history.child(history.legal_actions()[1])
+        pbs = pbs.child(pbs.legal_actions()[1], np.ones(
+            (NUM_HAND_COMBOS, len(pbs.legal_actions()))))
+    history = history.child(Action(deal=[26, 27, 28]))
+    pbs = pbs.child(Action(deal=[0, 1, 2]))
+    assert history.get_public_state().key == pbs.history.get_public_state().key
+    assert game.hand_index(history, 0) == COMBO_INDEX[13, 14]
+    assert game.hand_index(history, 1) == COMBO_INDEX[26, 27]
+    assert pbs.ranges[0, COMBO_INDEX[13, 14]] > 0
+
+    rng = np.random.RandomState(0)
+    probs = rng.dirichlet(np.ones(len(pbs.legal_actions())), NUM_HAND_COMBOS)
+    policy = RangePolicy(game)
+    policy.set_policy(pbs.history.get_public_state(), probs)
+    _, action_probs = policy.action_probabilities(history, 0)
+    assert np.allclose(action_probs, probs[COMBO_INDEX[13, 14]])
@@ -0,0 +1,76 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+import numpy as np
+
+
+def _flatten(obs):
+    """Flatten the encodings of the observations to a list of scalars."""
+
+    if isinstance(obs, (list, tuple)):
+        return [x for o in obs for x in _flatten(o)]
+    return _flatten(obs.encode) if hasattr(obs, 'encode') else [obs]
+
+
+def _check_step_batch(game, num_steps=2000, deterministic=lambda a: True):
+    """Compare step_batch with step on the states of random playouts."""
+
+    np.random.seed(0)
+    state = game.initial_state()
+    for _ in range(num_steps):
+        if state.is_terminal():
+            state = game.initial_state()
+        if state.is_chance():
+            actions, _ = state.chance_outcomes()
+            index = np.random.randint(len(actions))
+            action, encode = actions[index], index
+        else:
+            action = state.legal_actions()[
+                np.random.randint(len(state.legal_actions()))]
+            encode = action.encode
+        step_record = game.step(state, action)
+
+        states = game.encode_batch([state])
+        next_states, obs, rewards, terminal = game.step_batch(
+            states, np.array([encode]))
+        assert game.decode_batch(states)[0] == state
+        assert game.decode_batch(next_states)[0] == step_record.next_state
+        assert rewards[0] == step_record.reward
+        assert terminal[0] == step_record.next_state.is_terminal()
+        if deterministic(encode):
+            assert _flatten(step_record.obs) == np.ravel(obs[0]).tolist()
+        state = step_record.next_state
+
+
+def test_step_batch_matches_step():
+    _check_step_batch(env_module.KuhnPoker())
+    _check_step_batch(env_module.LeducPoker())
+    _check_step_batch(env_module.KuhnPoker(num_ranks=5))
+    _check_step_batch(env_module.LeducPoker(num_ranks=4, num_suits=3, num_raises=2,
+                                            num_rounds=3))
+    _check_step_batch(env_module.Tiger(), deterministic=lambda a: a != 2)
+    _check_step_batch(env_module.RockSample(), deterministic=lambda a: a <= 4)
+
+
+def test_step_batch_of_many_states():
+    game = env_module.LeducPoker()
+    histories = [h for h in game.get_all_histories() if not h.is_terminal()]
+    actions = [0 if h.is_chance() else 1 for h in histories]
+    next_states, _, rewards, terminal = game.step_batch(
+        game.encode_batch([h[-1].next_state for h in histories]), actions)
+    for history, action, next_state, reward, is_terminal in \
+            zip(histories, actions, game.decode_batch(next_states), rewards, terminal):
+        legal_actions = history.chance_outcomes()[0] if history.is_chance() \
+            else history.legal_actions()
+        step_record = game.step(history[-1].next_state, legal_actions[action])
+        assert next_state == step_record.next_state
+        assert reward == step_record.reward
+        assert is_terminal == next_state.is_terminal()
+
+
+def test_flat_tuple_encodings():
+    for game in [env_module.KuhnPoker(), env_module.LeducPoker()]:
+        states = {h[-1].next_state for h in game.get_all_histories()}
+        assert all(type(s.encode) is tuple and
+                   all(type(x) is int for x in s.encode) for s in states)
@@ -0,0 +1,79 @@
+import sys
+sys.path.append(sys.path[0] + '/..')
+
+import env as env_module
+from solver.cfr.cfr import CFR, CFR_VARIANTS, discount_weights
+from solver.cfr.vectorized_cfr import VectorizedCFR
+from policy.exploitability import exploitability
+
+import numpy as np
+
+
+def test_vectorized_cfr_matches_cfr():
+    for game, iterations in [(env_module.KuhnPoker(), 20),
+                             (env_module.LeducPoker(), 5)]:
+        args = {'solver': 'CFR', 'n_epochs': 1}
+        cfr, vectorized_cfr = CFR(game, args), VectorizedCFR(game, args)
+        for _ in range(iterations):
+            cfr.evaluate_and_update_policy()
+            vectorized_cfr.evaluate_and_update_policy()
+
+        expected = cfr.average_policy().action_probabilities_table
+        result = vectorized_cfr.average_policy().action_probabilities_table
+        assert len(result) == len(expected)
+        for row, expected_row in zip(result, expected):
+            assert np.allclose(row, expected_row, atol=1e-12)
+
+
+def test_cfr_variants():
+    assert discount_weights(1, CFR_VARIANTS['cfr+']) == [1.0, 0.0, 0.5]
+    assert discount_weights(3, CFR_VARIANTS['linear']) == [0.75, 0.75, 0.75]
+
+    game = env_module.KuhnPoker()
+    exploitabilities = {}
+    for variant in CFR_VARIANTS:
+        args = {'solver': 'CFR', 'n_epochs': 1, 'cfr_variant': variant}
+        cfr, vectorized_cfr = CFR(game, args), VectorizedCFR(game, args)
+        for _ in range(20):
+            cfr.evaluate_and_update_policy()
+            vectorized_cfr.evaluate_and_update_policy()
+
+        expected = cfr.average_policy()
+        result = vectorized_cfr.average_policy()
+        for row, expected_row in zip(result.action_probabilities_table,
+                                     expected.action_probabilities_table):
+            assert np.allclose(row, expected_row, atol=1e-12)
+        exploitabilities[variant] = exploitability(game, result)
+
+    for variant in ['cfr+', 'linear', 'dcfr']:
+        assert exploitabilities[variant] < exploitabilities['vanilla']
+
+
+def test_vectorized_cfr_train_policy(monkeypatch):
+    import solver.cfr.vectorized_cfr as vectorized_cfr
+
+    curves = []
+    monkeypatch.setattr(vectorized_cfr, 'save_exploitability_curve',
+                        lambda name, curve: curves.append(curve))
+    game = env_module.KuhnPoker()
+    solver = VectorizedCFR(game, {'solver': 'VectorizedCFR', 'n_epochs': 1,
+                                  'n_iterations': 5})
+    policy = solver.train_policy()
+    assert [iteration for iteration, _, _ in curves[0]] == [1, 2, 4, 5]
+    assert curves[0][-1][-1] == exploitability(game, policy)
+
+
+def test_cfr_reset_for_epoch():
+    game = env_module.KuhnPoker()
+    args = {'solver': 'CFR', 'n_epochs': 1, 'cfr_variant': 'linear'}
+    cfr, fresh_cfr = CFR(game, args), CFR(game, args)
+    for _ in range(3):
+        cfr.evaluate_and_update_policy()
+    cfr.reset_for_epoch()
+    for _ in range(3):
+        cfr.evaluate_and_update_policy()
+        fresh_cfr.evaluate_and_update_policy()
+
+    assert cfr._iteration == 3
+    assert cfr.average_policy().action_probabilities_table == \
+        fresh_cfr.average_policy().action_probabilities_table